@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Archive superseded ISMS documents into 06_Archive/Previous_Versions
+Uses Graph's server-side copy (or move) so no file content passes through
+this machine: copies are started through $batch and their asynchronous
+monitors polled together; moves are a batched rename into the archive.
+Archived copies are named after their ISMS-POL/PRO/TRN ID with the next
+free version number, e.g. ISMS_POL_009_Remote_Working_Policy_v3.html
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from typing import Dict, List, Any, Optional, Tuple
+
+from graph_auth import get_token_provider
+from graph_batch import send_batch
+from graph_pager import iter_items
+from graph_resolver import GraphResolver
+from graph_transport import GRAPH_URL, get_transport
+from isms_schema import DOCUMENT_ID_PATTERN
+from portal_stats import library_path
+
+load_dotenv()
+
+# Configuration from .env
+TENANT_ID = os.getenv('SHP_TENANT_ID')
+CLIENT_ID = os.getenv('SHP_ID_APP')
+CLIENT_SECRET = os.getenv('SHP_ID_APP_SECRET')
+SITE_URL = os.getenv('SHP_SITE_URL')
+
+ARCHIVE_FOLDER = '06_Archive/Previous_Versions'
+
+# Copy monitor polling: first interval, backoff cap and overall limit (seconds)
+POLL_INTERVAL = float(os.getenv('SHP_ARCHIVE_POLL_INTERVAL', '1'))
+MAX_POLL_INTERVAL = 10.0
+POLL_TIMEOUT = float(os.getenv('SHP_ARCHIVE_TIMEOUT', '600'))
+MONITOR_WORKERS = 8
+
+DOCUMENT_ID = re.compile(DOCUMENT_ID_PATTERN, re.I)
+ARCHIVED_VERSION = re.compile(r'_v(\d+)$')
+ITEM_SELECT = ['id', 'name', 'file', 'folder', 'parentReference']
+
+
+def document_id(name: str) -> Optional[Tuple[str, int]]:
+    """('POL', 9) for ISMS_POL_009_..., or None for names without an ISMS ID"""
+    match = DOCUMENT_ID.match(name)
+    return (match.group(1).upper(), int(match.group(2))) if match else None
+
+
+def format_id(doc_id: Tuple[str, int]) -> str:
+    return f"ISMS-{doc_id[0]}-{doc_id[1]:03d}"
+
+
+def archive_name(name: str, version: int) -> str:
+    """Versioned archive name: the original stem plus _v<version>"""
+    stem, dot, suffix = name.rpartition('.')
+    if not dot:
+        stem, suffix = name, ''
+    stem = ARCHIVED_VERSION.sub('', stem)
+    return f"{stem}_v{version}{dot}{suffix}"
+
+
+class DocumentArchiver:
+    """Copy or move documents of one drive into the archive folder, server-side"""
+
+    def __init__(self, drive_id: str, tokens, archive_folder: str = ARCHIVE_FOLDER,
+                 poll_interval: float = POLL_INTERVAL, timeout: float = POLL_TIMEOUT):
+        self.drive_id = drive_id
+        self.tokens = tokens
+        self.archive_folder = archive_folder.strip('/')
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.http = get_transport()
+
+    def _path_url(self, path: str) -> str:
+        return f"/drives/{self.drive_id}/root:/{quote(path.strip('/'))}?$select={','.join(ITEM_SELECT)}"
+
+    def select(self, sources: List[str], ids: List[Tuple[str, int]] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Resolve the archive folder and the documents to archive
+
+        Sources are library paths of documents or folders (folders are
+        searched recursively). Returns (archive folder, documents); only
+        documents with an ISMS ID, in `ids` if given, are selected.
+        """
+        batch_requests = [{'id': 'archive', 'method': 'GET', 'url': self._path_url(self.archive_folder)}]
+        batch_requests += [{'id': str(index), 'method': 'GET', 'url': self._path_url(source)}
+                           for index, source in enumerate(sources)]
+        responses = send_batch(batch_requests, self.tokens.auth_headers())
+
+        archive = responses.get('archive', {})
+        if archive.get('status') != 200:
+            raise RuntimeError(f"Archive folder {self.archive_folder} not found - run setup_sharepoint_graph.py first")
+
+        documents = []
+        folders = []
+        for index, source in enumerate(sources):
+            response = responses.get(str(index), {})
+            if response.get('status') != 200:
+                print(f"⚠️  {source} not found (HTTP {response.get('status')})")
+                continue
+            item = response['body']
+            (folders if 'folder' in item else documents).append(item)
+
+        while folders:
+            folder = folders.pop()
+            url = f"{GRAPH_URL}/drives/{self.drive_id}/items/{folder['id']}/children"
+            for child in iter_items(url, self.tokens, select=ITEM_SELECT):
+                (folders if 'folder' in child else documents).append(child)
+
+        archive_id = archive['body']['id']
+        selected = []
+        for item in documents:
+            doc_id = document_id(item['name'])
+            if doc_id is None or (ids and doc_id not in ids):
+                continue
+            if (item.get('parentReference') or {}).get('id') == archive_id:
+                continue
+            selected.append(item)
+        return archive['body'], selected
+
+    def plan(self, archive: Dict[str, Any], documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Assign each document its next free archive version"""
+        latest: Dict[Tuple[str, int], int] = {}
+        url = f"{GRAPH_URL}/drives/{self.drive_id}/items/{archive['id']}/children"
+        for item in iter_items(url, self.tokens, select=['name']):
+            doc_id = document_id(item['name'])
+            version = ARCHIVED_VERSION.search(item['name'].rpartition('.')[0] or item['name'])
+            if doc_id and version:
+                latest[doc_id] = max(latest.get(doc_id, 0), int(version.group(1)))
+
+        operations = []
+        for item in sorted(documents, key=lambda item: library_path(item)):
+            doc_id = document_id(item['name'])
+            latest[doc_id] = latest.get(doc_id, 0) + 1
+            operations.append({'id': format_id(doc_id), 'item_id': item['id'], 'source': library_path(item),
+                               'name': archive_name(item['name'], latest[doc_id])})
+        return operations
+
+    def archive(self, archive: Dict[str, Any], operations: List[Dict[str, Any]], move: bool = False) -> List[Dict[str, Any]]:
+        """Run the copies (or moves) in $batch groups; fills in each operation's status"""
+        destination = {'driveId': self.drive_id, 'id': archive['id']}
+        batch_requests = []
+        for index, operation in enumerate(operations):
+            if move:
+                batch_requests.append({
+                    'id': str(index), 'method': 'PATCH',
+                    'url': f"/drives/{self.drive_id}/items/{operation['item_id']}",
+                    'headers': {'Content-Type': 'application/json'},
+                    'body': {'parentReference': destination, 'name': operation['name']}
+                })
+            else:
+                batch_requests.append({
+                    'id': str(index), 'method': 'POST',
+                    'url': f"/drives/{self.drive_id}/items/{operation['item_id']}/copy"
+                           f"?@microsoft.graph.conflictBehavior=fail",
+                    'headers': {'Content-Type': 'application/json'},
+                    'body': {'parentReference': destination, 'name': operation['name']}
+                })
+        responses = send_batch(batch_requests, self.tokens.auth_headers()) if batch_requests else {}
+
+        monitors = {}
+        for index, operation in enumerate(operations):
+            response = responses.get(str(index), {})
+            status = response.get('status')
+            headers = {key.lower(): value for key, value in (response.get('headers') or {}).items()}
+            if move and status == 200:
+                operation['status'] = 'moved'
+            elif not move and status == 202 and headers.get('location'):
+                monitors[index] = headers['location']
+            else:
+                error = (response.get('body') or {}).get('error', {}) if isinstance(response.get('body'), dict) else {}
+                operation['status'] = 'failed'
+                operation['detail'] = f"HTTP {status} {error.get('code', '')}".strip()
+
+        for index, result in self.wait(monitors).items():
+            operation = operations[index]
+            if result.get('status') == 'completed':
+                operation['status'] = 'copied'
+            else:
+                operation['status'] = 'failed'
+                operation['detail'] = (result.get('error') or {}).get('code') or result.get('status', 'unknown')
+        return operations
+
+    def _poll(self, url: str) -> Dict[str, Any]:
+        # Monitor URLs are pre-authenticated; they must not get the bearer token
+        response = self.http.get(url)
+        failed = {'status': 'failed', 'error': {'code': f"HTTP {response.status_code}"}}
+        if not 200 <= response.status_code < 300:
+            return failed  # expired or unknown monitor: it will never complete
+        try:
+            status = response.json()
+        except ValueError:
+            return failed
+        if 'status' not in status:
+            # A finished copy can also redirect to the new item itself
+            return {'status': 'completed', 'resourceId': status['id']} if 'id' in status else failed
+        return status
+
+    def wait(self, monitors: Dict[Any, str]) -> Dict[Any, Dict[str, Any]]:
+        """Poll copy monitors together until each completes, fails or times out"""
+        results = {}
+        pending = dict(monitors)
+        interval = self.poll_interval
+        deadline = time.monotonic() + self.timeout
+        with ThreadPoolExecutor(max_workers=MONITOR_WORKERS) as executor:
+            while pending:
+                keys = list(pending)
+                for key, status in zip(keys, executor.map(self._poll, [pending[key] for key in keys])):
+                    if status.get('status') in ('completed', 'failed'):
+                        results[key] = status
+                        del pending[key]
+                if not pending:
+                    break
+                if time.monotonic() + interval > deadline:
+                    for key in pending:
+                        results[key] = {'status': 'timedOut'}
+                    break
+                time.sleep(interval)
+                interval = min(interval * 2, MAX_POLL_INTERVAL)
+        return results
+
+
+def main():
+    """Archive documents into the Previous_Versions folder"""
+    parser = argparse.ArgumentParser(description="Archive ISMS documents server-side into 06_Archive")
+    parser.add_argument('paths', nargs='+', help="library paths of documents or folders (e.g. 01_Policies)")
+    parser.add_argument('--id', dest='ids', action='append', default=[], metavar='ISMS-POL-009',
+                        help="only archive documents with this ISMS ID (repeatable)")
+    parser.add_argument('--move', action='store_true', help="move the documents instead of copying them")
+    parser.add_argument('--dest', default=ARCHIVE_FOLDER, help=f"archive folder (default {ARCHIVE_FOLDER})")
+    parser.add_argument('--dry-run', action='store_true', help="show the archive names without archiving")
+    args = parser.parse_args()
+
+    ids = []
+    for value in args.ids:
+        doc_id = document_id(value)
+        if doc_id is None:
+            print(f"❌ Not an ISMS document ID: {value}")
+            sys.exit(1)
+        ids.append(doc_id)
+
+    if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET, SITE_URL]):
+        print("❌ Missing SharePoint configuration in .env file")
+        sys.exit(1)
+
+    tokens = get_token_provider(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
+    archiver = DocumentArchiver(GraphResolver(SITE_URL, tokens).drive_id, tokens, args.dest)
+
+    try:
+        archive, documents = archiver.select(args.paths, ids)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    operations = archiver.plan(archive, documents)
+    if not operations:
+        print("ℹ️  No ISMS documents to archive")
+        return
+
+    verb = 'Moving' if args.move else 'Copying'
+    print(f"🗄️  {verb if not args.dry_run else 'Would archive'} {len(operations)} document(s) into {args.dest}...")
+    started = time.perf_counter()
+    if not args.dry_run:
+        archiver.archive(archive, operations, args.move)
+
+    for operation in operations:
+        status = operation.get('status', 'planned')
+        icon = {'copied': '✅', 'moved': '✅', 'planned': '📋'}.get(status, '❌')
+        detail = f" ({operation['detail']})" if operation.get('detail') else ''
+        print(f"  {icon} {operation['id']}: {operation['source']} -> {operation['name']} {status}{detail}")
+
+    if args.dry_run:
+        return
+    failed = sum(1 for operation in operations if operation['status'] == 'failed')
+    print(f"\n✅ Archived {len(operations) - failed} document(s), {failed} failed "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"🚦 Graph traffic: {archiver.http.stats.summary()}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
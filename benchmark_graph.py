@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+End-to-end provisioning and upload benchmark against the Graph stand-in
+Runs the setup steps (auth, site info, folders, lists, uploads, records)
+against graph_standin.py with simulated round-trip time and throttling,
+at increasing folder and item counts, and saves per-step wall time,
+request counts, bytes and p50/p95 latency as JSON for comparison
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from graph_standin import GraphStandIn
+
+STEPS = ['auth', 'site_info', 'folders', 'lists', 'uploads', 'records']
+RESULTS_DIR = Path('bench_results')
+
+# Step metrics compared against a baseline; lower is better for all of them
+COMPARED_METRICS = ['wall_seconds', 'requests', 'p95_ms']
+
+
+class StepRecorder:
+    """Transport observer that attributes every exchange to the current step"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.step: Optional[str] = None
+        self.samples: Dict[str, List[Dict[str, Any]]] = {}
+
+    def __call__(self, method: str, url: str, response, elapsed: float, **details: Any):
+        # graph_* modules read their endpoints on import, after the stand-in's env is set
+        from graph_trace import _body_size
+
+        request = getattr(response, 'request', None)
+        sent = _body_size(getattr(request, 'body', None) if hasattr(request, 'body')
+                          else getattr(request, 'content', None))
+        received = int(response.headers.get('Content-Length') or 0) if response is not None else 0
+        status = response.status_code if response is not None else 'error'
+        with self._lock:
+            self.samples.setdefault(self.step or 'other', []).append({
+                'status': status, 'seconds': elapsed, 'sent': sent, 'received': received
+            })
+
+    @contextlib.contextmanager
+    def measure(self, step: str, results: Dict[str, Any], http, quiet: bool = True):
+        """Time a step and summarise the requests made inside it"""
+        self.step = step
+        throttle_before = http.stats.snapshot()
+        output = io.StringIO()
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+                yield
+        finally:
+            from graph_trace import percentile
+
+            wall = time.perf_counter() - started
+            self.step = None
+            throttle_after = http.stats.snapshot()
+            samples = self.samples.pop(step, [])
+            latencies = [sample['seconds'] * 1000 for sample in samples]
+            statuses: Dict[str, int] = {}
+            for sample in samples:
+                statuses[str(sample['status'])] = statuses.get(str(sample['status']), 0) + 1
+            results[step] = {
+                'wall_seconds': round(wall, 4),
+                'requests': len(samples),
+                'bytes_sent': sum(sample['sent'] for sample in samples),
+                'bytes_received': sum(sample['received'] for sample in samples),
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'statuses': statuses,
+                'retries': throttle_after['retries'] - throttle_before['retries'],
+                'throttle_wait_seconds': round(throttle_after['throttle_wait'] - throttle_before['throttle_wait'], 3)
+            }
+
+
+def synthetic_folders(base: List[str], count: int) -> List[str]:
+    """The real folder tree plus Bench_NNNN leaves until there are `count` folders"""
+    folders = list(base)
+    leaves = [folder_path for folder_path in base
+              if not any(other.startswith(folder_path + '/') for other in base)]
+    number = 1
+    while len(folders) < count:
+        folders.append(f"{leaves[(number - 1) % len(leaves)]}/Bench_{number:04d}")
+        number += 1
+    return folders[:max(count, 1)]
+
+
+def synthetic_rows(count: int):
+    courses = ['Security Awareness', 'Phishing Simulation', 'Data Protection', 'Incident Response']
+    statuses = ['Completed', 'In Progress', 'Not Started', 'Expired']
+    for index in range(count):
+        yield index + 2, {
+            'Staff Member': f"Staff {index:05d}",
+            'Training Course': courses[index % len(courses)],
+            'Completion Date': f"2025-{(index % 12) + 1:02d}-{(index % 28) + 1:02d}",
+            'Score': str(50 + index % 51),
+            'Status': statuses[index % len(statuses)]
+        }
+
+
+def synthetic_documents(directory: Path, count: int, large: int) -> List[Path]:
+    """Small HTML documents plus `large` files above the upload session threshold"""
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = directory / f"ISMS_BENCH_{index:03d}.html"
+        path.write_bytes((f"<h1>Benchmark document {index}</h1>" + "<p>Lorem ipsum</p>" * 2000).encode('utf-8'))
+        paths.append(path)
+    for index in range(large):
+        path = directory / f"ISMS_BENCH_LARGE_{index:02d}.bin"
+        path.write_bytes(os.urandom(6 * 1024 * 1024 + index))
+        paths.append(path)
+    return paths
+
+
+def run_scenario(standin: GraphStandIn, folder_count: int, item_count: int, documents: int,
+                 large_documents: int, async_folders: int, work_dir: Path, quiet: bool) -> Dict[str, Any]:
+    """Run every step once against a freshly reset stand-in"""
+    from build_portal import render_target
+    from graph_auth import TokenProvider
+    from graph_manifest import UploadManifest
+    from graph_transport import get_transport
+    from graph_upload import GraphUploader
+    from import_training_records import TrainingRecordImporter
+    from isms_schema import FOLDER_STRUCTURE, TRAINING_RECORDS_LIST
+    import setup_sharepoint_graph
+    from setup_sharepoint_graph import expand_folder_tree
+
+    standin.reset()
+    scenario_dir = work_dir / f"f{folder_count}-i{item_count}"
+    shutil.rmtree(scenario_dir, ignore_errors=True)
+    scenario_dir.mkdir(parents=True)
+    for cached in ('resolver.json', 'upload_manifest.json', 'upload_sessions.json'):
+        (Path(os.environ['SHP_CACHE_DIR']) / cached).unlink(missing_ok=True)
+
+    http = get_transport()
+    recorder = StepRecorder()
+    http.add_observer(recorder)
+    steps: Dict[str, Any] = {}
+    record_counts = {'created': 0}
+    folders = synthetic_folders(FOLDER_STRUCTURE, folder_count)
+    setup = setup_sharepoint_graph.SharePointSetup(folders, folder_concurrency=async_folders)
+    started = time.perf_counter()
+
+    try:
+        with recorder.measure('auth', steps, http, quiet):
+            # A fresh provider so every scenario pays for a real token request
+            setup.tokens = TokenProvider(setup.tenant_id, setup.client_id, setup.client_secret,
+                                         cache_dir=scenario_dir)
+            setup.tokens.get_token()
+
+        with recorder.measure('site_info', steps, http, quiet):
+            setup.get_site_info()
+
+        with recorder.measure('folders', steps, http, quiet):
+            setup.create_folder_structure()
+
+        with recorder.measure('lists', steps, http, quiet):
+            setup.create_lists()
+
+        document_paths = synthetic_documents(scenario_dir / 'documents', documents, large_documents)
+        with recorder.measure('uploads', steps, http, quiet):
+            setup.upload_welcome_document()
+            uploader = GraphUploader(setup.drive_id, setup.tokens, manifest=UploadManifest())
+            uploader.upload_bytes(render_target('sharepoint').encode('utf-8'), 'ISMS_Portal_Home.html', 'text/html')
+            uploader.upload_many([(path, f"01_Policies/Core_Policies/{path.name}") for path in document_paths])
+
+        with recorder.measure('records', steps, http, quiet):
+            list_id = setup.resolver.list_id(TRAINING_RECORDS_LIST['displayName'])
+            importer = TrainingRecordImporter(setup.site_id, list_id, setup.tokens)
+            record_counts = importer.run(synthetic_rows(item_count), scenario_dir / 'records.results.csv')
+        if record_counts['created'] != item_count:
+            # Otherwise the records step would be timing rejected rows, not list item creation
+            raise RuntimeError(f"Only {record_counts['created']} of {item_count} training records were created "
+                               f"(see {scenario_dir / 'records.results.csv'})")
+    finally:
+        http.remove_observer(recorder)
+
+    total = {
+        'wall_seconds': round(time.perf_counter() - started, 4),
+        'requests': sum(step['requests'] for step in steps.values()),
+        'bytes_sent': sum(step['bytes_sent'] for step in steps.values()),
+        'bytes_received': sum(step['bytes_received'] for step in steps.values())
+    }
+    return {
+        'folders': len(expand_folder_tree(folders)),
+        'items': item_count,
+        'items_created': record_counts['created'],
+        'documents': documents + large_documents + 2,
+        'steps': steps,
+        'total': total,
+        'server': dict(standin.stats)
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return regressions of more than `tolerance` against a baseline run"""
+    regressions = []
+    previous = {(s['folders'], s['items']): s for s in baseline.get('scenarios', [])}
+    for scenario in results['scenarios']:
+        old = previous.get((scenario['folders'], scenario['items']))
+        if not old:
+            continue
+        for step, metrics in scenario['steps'].items():
+            old_metrics = old['steps'].get(step)
+            if not old_metrics:
+                continue
+            for metric in COMPARED_METRICS:
+                before, after = old_metrics.get(metric, 0), metrics.get(metric, 0)
+                if before and after > before * (1 + tolerance):
+                    regressions.append(f"{scenario['folders']} folders/{scenario['items']} items "
+                                       f"{step}.{metric}: {before} -> {after} (+{100 * (after / before - 1):.0f}%)")
+    return regressions
+
+
+def print_summary(results: Dict[str, Any]):
+    for scenario in results['scenarios']:
+        print(f"\n📊 {scenario['folders']} folders, {scenario['items']} items, "
+              f"{scenario['documents']} documents: {scenario['total']['wall_seconds']:.2f}s, "
+              f"{scenario['total']['requests']} requests")
+        print(f"   {'step':<10} {'wall s':>8} {'reqs':>6} {'sent KB':>9} {'recv KB':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for step in STEPS:
+            metrics = scenario['steps'].get(step)
+            if metrics:
+                print(f"   {step:<10} {metrics['wall_seconds']:>8.2f} {metrics['requests']:>6} "
+                      f"{metrics['bytes_sent'] / 1024:>9.1f} {metrics['bytes_received'] / 1024:>9.1f} "
+                      f"{metrics['p50_ms']:>8.1f} {metrics['p95_ms']:>8.1f}")
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def main():
+    """Benchmark provisioning and uploads against the local Graph stand-in"""
+    parser = argparse.ArgumentParser(description="Benchmark provisioning and upload throughput offline")
+    parser.add_argument('--folders', type=_int_list, default=[19, 100, 500],
+                        help="comma-separated folder counts, one scenario each (default 19,100,500)")
+    parser.add_argument('--items', type=_int_list, default=[50, 500, 2000],
+                        help="comma-separated training record counts, paired with --folders")
+    parser.add_argument('--documents', type=int, default=10, help="small documents uploaded per scenario")
+    parser.add_argument('--large-documents', type=int, default=1, help="6 MB documents (upload sessions)")
+    parser.add_argument('--async-folders', type=int, default=0, metavar='N',
+                        help="create folders with N concurrent requests instead of $batch")
+    parser.add_argument('--rtt', type=float, default=40.0, help="simulated round-trip time in ms")
+    parser.add_argument('--jitter', type=float, default=10.0, help="random extra latency up to this many ms")
+    parser.add_argument('--throttle-rate', type=float, default=0.02, help="probability of a 429 per request")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds on 429s")
+    parser.add_argument('--seed', type=int, default=1, help="seed for injected faults")
+    parser.add_argument('--out', help="results file (default bench_results/benchmark-<time>.json)")
+    parser.add_argument('--compare', metavar='FILE', help="baseline results to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument('--verbose', action='store_true', help="show the output of each step")
+    args = parser.parse_args()
+
+    if len(args.items) < len(args.folders):
+        args.items += [args.items[-1]] * (len(args.folders) - len(args.items))
+
+    standin = GraphStandIn(latency=args.rtt, jitter=args.jitter, throttle_rate=args.throttle_rate,
+                           retry_after=args.retry_after, seed=args.seed).start()
+    work_dir = Path(tempfile.mkdtemp(prefix='isms-bench-'))
+
+    # The graph_* modules read these at import, so set them before the first import
+    os.environ.update(standin.env())
+    os.environ.update({
+        'SHP_TENANT_ID': 'benchmark-tenant', 'SHP_ID_APP': 'benchmark-client',
+        'SHP_ID_APP_SECRET': 'benchmark-secret',
+        'SHP_SITE_URL': 'https://contoso.sharepoint.com/sites/InformationSecurityManagement',
+        'SHP_CACHE_DIR': str(work_dir / 'cache')
+    })
+
+    from graph_transport import get_transport
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'config': {key: value for key, value in vars(args).items() if key not in ('out', 'compare', 'verbose')},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'http2': get_transport().http2},
+        'scenarios': []
+    }
+
+    try:
+        for folder_count, item_count in zip(args.folders, args.items):
+            print(f"🏁 Running {folder_count} folders / {item_count} items...")
+            results['scenarios'].append(run_scenario(
+                standin, folder_count, item_count, args.documents, args.large_documents,
+                args.async_folders, work_dir, quiet=not args.verbose))
+    finally:
+        standin.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_summary(results)
+
+    out_path = Path(args.out) if args.out else RESULTS_DIR / f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {out_path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s) against {args.compare}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Build the portal homepage from one templated source
+Renders portal/portal.html with the shared content in portal/portal.json
+for each target (the SharePoint upload and the static index.html), and
+only rebuilds targets whose inputs changed since the last build. With live
+library stats (portal_stats.py) the document tiles show real counts and a
+recently updated list is added
+"""
+
+import sys
+import json
+import html
+import hashlib
+import argparse
+from pathlib import Path
+from datetime import datetime
+from string import Template
+from urllib.parse import quote
+from typing import Dict, List, Any, Optional, Tuple
+
+PORTAL_DIR = Path(__file__).resolve().parent / 'portal'
+ROOT_DIR = PORTAL_DIR.parent
+TEMPLATE_FILE = PORTAL_DIR / 'portal.html'
+STYLESHEET_FILE = PORTAL_DIR / 'portal.css'
+CONTENT_FILE = PORTAL_DIR / 'portal.json'
+SEARCH_SCRIPT_FILE = PORTAL_DIR / 'portal_search.js'
+BUILD_STATE_FILE = ROOT_DIR / 'build' / '.portal_build.json'
+
+INDENT = ' ' * 12
+
+
+def load_content() -> Dict[str, Any]:
+    with open(CONTENT_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class LinkResolver:
+    """Turn content links into hrefs for one target
+
+    Links are written once as {"library": path}, {"site": path},
+    {"mailto": address} or {"url": href}. The SharePoint page sits in the
+    library root, so library paths stay relative; the static page links to
+    the library through absolute site URLs and opens them in a new tab.
+    """
+
+    def __init__(self, target: Dict[str, Any]):
+        self.absolute = target.get('links') == 'absolute'
+        self.site_url = target.get('site_url', '').rstrip('/')
+        self.library = target.get('library', 'Shared Documents')
+        self.view_id = target.get('view_id')
+
+    def href(self, link: Dict[str, str]) -> str:
+        if 'mailto' in link:
+            subject = f"?subject={quote(link['subject'])}" if link.get('subject') else ''
+            return f"mailto:{link['mailto']}{subject}"
+        if 'url' in link:
+            return link['url']
+        if 'site' in link:
+            if self.absolute:
+                return f"{self.site_url}/{quote(link['site'])}"
+            return f"../{quote(link['site'])}"
+        return self.library_href(link['library'])
+
+    def library_href(self, path: str) -> str:
+        path = path.strip('/')
+        if not self.absolute:
+            return path
+        library_url = f"{self.site_url}/{quote(self.library)}"
+        if '.' in path.rsplit('/', 1)[-1]:
+            return f"{library_url}/{quote(path)}"
+
+        # Folders open in the library view rather than as a raw URL
+        site_path = self.site_url.split('://', 1)[-1].partition('/')[2]
+        folder = quote(f"/{site_path}/{self.library}/{path}", safe='')
+        view = f"&viewid={self.view_id}" if self.view_id else ''
+        return f"{library_url}/Forms/AllItems.aspx?id={folder}{view}"
+
+    def attributes(self, link: Dict[str, str]) -> str:
+        """Extra anchor attributes: external targets open in a new tab"""
+        if self.absolute and 'mailto' not in link:
+            return ' target="_blank"'
+        return ''
+
+
+def _anchor_open(links: LinkResolver, link: Dict[str, str], css_class: str) -> str:
+    class_attr = f' class="{css_class}"' if css_class else ''
+    return f'<a href="{html.escape(links.href(link))}"{class_attr}{links.attributes(link)}>'
+
+
+def render_cards(entries: List[Dict[str, Any]], links: LinkResolver) -> str:
+    parts = []
+    for entry in entries:
+        parts.append(
+            f"{INDENT}{_anchor_open(links, entry['link'], 'card')}\n"
+            f"{INDENT}    <div class=\"card-icon\">{entry['icon']}</div>\n"
+            f"{INDENT}    <h3>{html.escape(entry['title'])}</h3>\n"
+            f"{INDENT}    <p>{html.escape(entry['text'])}</p>\n"
+            f"{INDENT}</a>"
+        )
+    return '\n'.join(parts)
+
+
+def library_sections(content: Dict[str, Any]) -> List[str]:
+    """Library folders whose tiles show a live document count"""
+    return [entry['link']['library'] for entry in content['library_tiles']
+            if 'count_text' in entry and 'library' in entry['link']]
+
+
+def tile_text(entry: Dict[str, Any], stats: Optional[Dict[str, Any]]) -> str:
+    """Live count text for a tile, or its static text without an exact count"""
+    folder = (stats or {}).get('folders', {}).get(entry['link'].get('library', '').strip('/'))
+    if folder is None or folder.get('partial') or 'count_text' not in entry:
+        return entry['text']
+    count = folder['documents']
+    return entry['count_text'].format(count=count, s='' if count == 1 else 's')
+
+
+def render_tiles(entries: List[Dict[str, Any]], links: LinkResolver,
+                 stats: Optional[Dict[str, Any]] = None) -> str:
+    parts = []
+    for entry in entries:
+        css_class = ' '.join(filter(None, ['doc-tile', entry.get('class')]))
+        parts.append(
+            f"{INDENT}{_anchor_open(links, entry['link'], css_class)}\n"
+            f"{INDENT}    <div class=\"doc-icon\">{entry['icon']}</div>\n"
+            f"{INDENT}    <h4>{html.escape(entry['title'])}</h4>\n"
+            f"{INDENT}    <p>{html.escape(tile_text(entry, stats))}</p>\n"
+            f"{INDENT}</a>"
+        )
+    return '\n'.join(parts)
+
+
+def render_announcements(entries: List[Dict[str, Any]], links: LinkResolver) -> str:
+    parts = []
+    for entry in entries:
+        parts.append(
+            f"{INDENT}<div class=\"notice\">\n"
+            f"{INDENT}    <h4>{html.escape(entry['title'])}</h4>\n"
+            f"{INDENT}    <p>{html.escape(entry['text'])}</p>\n"
+            f"{INDENT}    {_anchor_open(links, entry['link'], '')}{html.escape(entry['link_text'])}</a>\n"
+            f"{INDENT}</div>"
+        )
+    return '\n'.join(parts)
+
+
+def render_recent(section: Dict[str, Any], links: LinkResolver,
+                  stats: Optional[Dict[str, Any]]) -> str:
+    """Recently updated documents block; empty without live stats"""
+    documents = (stats or {}).get('recent')
+    if not section or not documents:
+        return ''
+
+    outer = ' ' * 8
+    items = []
+    for document in documents:
+        title = Path(document['name']).stem.replace('_', ' ')
+        modified = document.get('lastModifiedDateTime') or ''
+        try:
+            modified = datetime.fromisoformat(modified.replace('Z', '+00:00')).strftime('%d %b %Y')
+        except ValueError:
+            pass
+        link = {'library': document['path']}
+        items.append(f"{INDENT}    <li>{_anchor_open(links, link, '')}{html.escape(title)}</a> "
+                     f"<span>{html.escape(modified)}</span></li>")
+    return (f"\n\n{outer}<div class=\"recent\">\n"
+            f"{INDENT}<h3>{html.escape(section['title'])}</h3>\n"
+            f"{INDENT}<ul>\n" + '\n'.join(items) + f"\n{INDENT}</ul>\n"
+            f"{outer}</div>")
+
+
+def search_manifest(name: str, content: Dict[str, Any]) -> Optional[Path]:
+    """The target's search manifest if it has search and search_index.py has built it"""
+    section = content.get('search')
+    if not (section and content['targets'][name].get('search')):
+        return None
+    manifest = output_path(name, content).parent / section.get('index', 'search/index.json')
+    return manifest if manifest.exists() else None
+
+
+def render_search(section: Dict[str, Any], manifest: Optional[Path]) -> str:
+    """Search box and its script; empty until the target's index has been built"""
+    if not section or manifest is None:
+        return ''
+
+    outer = ' ' * 8
+    script = SEARCH_SCRIPT_FILE.read_text(encoding='utf-8').rstrip('\n')
+    return (f"\n\n{outer}<!-- Search -->\n"
+            f"{outer}<div class=\"search\">\n"
+            f"{INDENT}<input type=\"search\" id=\"search-box\" autocomplete=\"off\" "
+            f"placeholder=\"{html.escape(section['placeholder'])}\" aria-label=\"{html.escape(section['placeholder'])}\" "
+            f"data-index=\"{html.escape(section.get('index', 'search/index.json'))}\">\n"
+            f"{INDENT}<ul id=\"search-results\" class=\"search-results\" hidden></ul>\n"
+            f"{outer}</div>\n"
+            f"{outer}<script>\n"
+            + '\n'.join(f"{outer}{line}" if line else '' for line in script.split('\n')) +
+            f"\n{outer}</script>")
+
+
+def render_contacts(entries: List[Dict[str, Any]], links: LinkResolver) -> str:
+    parts = []
+    for entry in entries:
+        if 'link' in entry:
+            label = entry['link'].get('mailto') or entry.get('text') or links.href(entry['link'])
+            value = f"{_anchor_open(links, entry['link'], '')}{html.escape(label)}</a>"
+        else:
+            value = html.escape(entry['text'])
+        parts.append(f"{INDENT}    {entry['label']}: {value}")
+    return ' |\n'.join(parts)
+
+
+def render_target(name: str, content: Dict[str, Any] = None, stats: Dict[str, Any] = None) -> str:
+    """Render the portal page for one target, with live library stats if given"""
+    content = content or load_content()
+    target = content['targets'][name]
+    links = LinkResolver(target)
+    css = STYLESHEET_FILE.read_text(encoding='utf-8').rstrip('\n')
+
+    return Template(TEMPLATE_FILE.read_text(encoding='utf-8')).substitute(
+        title=html.escape(content['title']),
+        css='\n'.join(f"        {line}" if line else '' for line in css.split('\n')),
+        hero_title=html.escape(content['hero']['title']),
+        hero_text=html.escape(content['hero']['text']),
+        search=render_search(content.get('search'), search_manifest(name, content)),
+        quick_actions=render_cards(content['quick_actions'], links),
+        announcements=render_announcements(content['announcements'], links),
+        library_tiles=render_tiles(content['library_tiles'], links, stats),
+        recent_documents=render_recent(content.get('recent_documents'), links, stats),
+        essential_reading=render_cards(content['essential_reading'], links),
+        footer_contacts=render_contacts(content['footer']['contacts'], links),
+        copyright=html.escape(content['footer']['copyright'])
+    )
+
+
+def input_hash(name: str, content: Dict[str, Any], stats: Dict[str, Any] = None) -> str:
+    """Hash of everything that affects one target's output"""
+    digest = hashlib.sha256()
+    for source in (TEMPLATE_FILE, STYLESHEET_FILE, SEARCH_SCRIPT_FILE, Path(__file__).resolve()):
+        digest.update(source.read_bytes())
+    shared = {key: value for key, value in content.items() if key != 'targets'}
+    digest.update(json.dumps(shared, sort_keys=True).encode('utf-8'))
+    digest.update(json.dumps(content['targets'][name], sort_keys=True).encode('utf-8'))
+    # The search box only appears once the index exists
+    digest.update(b'search' if search_manifest(name, content) else b'')
+    if stats:
+        live = {key: value for key, value in stats.items() if key != 'fetched_at'}
+        digest.update(json.dumps(live, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def output_path(name: str, content: Dict[str, Any] = None) -> Path:
+    content = content or load_content()
+    return ROOT_DIR / content['targets'][name]['output']
+
+
+def build(targets: List[str] = None, force: bool = False,
+          stats: Dict[str, Any] = None) -> Dict[str, Tuple[Path, bool]]:
+    """Render targets whose inputs changed; returns {target: (path, rebuilt)}"""
+    content = load_content()
+    state = {}
+    if BUILD_STATE_FILE.exists():
+        with open(BUILD_STATE_FILE, encoding='utf-8') as f:
+            state = json.load(f)
+
+    results = {}
+    for name in targets or sorted(content['targets']):
+        path = output_path(name, content)
+        digest = input_hash(name, content, stats)
+        if not force and state.get(name) == digest and path.exists():
+            results[name] = (path, False)
+            continue
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(render_target(name, content, stats), encoding='utf-8')
+        state[name] = digest
+        results[name] = (path, True)
+
+    BUILD_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(BUILD_STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    return results
+
+
+def main():
+    """Render the portal page targets"""
+    parser = argparse.ArgumentParser(description="Build the ISMS portal homepage from portal/")
+    parser.add_argument('targets', nargs='*', help="targets to build (default: all)")
+    parser.add_argument('--force', action='store_true', help="rebuild even if the inputs are unchanged")
+    parser.add_argument('--live', action='store_true',
+                        help="fill in document counts and recent documents from SharePoint")
+    args = parser.parse_args()
+
+    content = load_content()
+    known = content['targets']
+    unknown = [name for name in args.targets if name not in known]
+    if unknown:
+        print(f"❌ Unknown target(s): {', '.join(unknown)} (known: {', '.join(sorted(known))})")
+        sys.exit(1)
+
+    stats = None
+    if args.live:
+        # Graph access is only needed for live builds
+        from portal_stats import load_live_stats
+        stats = load_live_stats(library_sections(content))
+        if stats is None:
+            sys.exit(1)
+
+    for name, (path, rebuilt) in build(args.targets, args.force, stats).items():
+        if rebuilt:
+            print(f"✅ {name} -> {path.relative_to(ROOT_DIR)}")
+        else:
+            print(f"⏭️  {name} unchanged, skipped")
+
+
+if __name__ == '__main__':
+    main()
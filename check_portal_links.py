@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Check the links on the portal pages against the document library
+Renders the pages in memory (with live stats, so the Recently Updated
+links are included) without touching the built output, extracts every href, maps library and list links to
+Graph lookups and resolves them through $batch, several envelopes at a
+time. Links that resolved recently are trusted from the cache; a link whose
+path is gone but whose cached item still exists is reported as moved
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+from dotenv import load_dotenv
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from build_portal import library_sections, load_content, render_target
+from graph_auth import get_token_provider
+from graph_batch import send_batch
+from graph_cache import CACHE_DIR, load_json, save_json
+from graph_resolver import GraphResolver
+from portal_stats import LibraryStats, library_path
+
+load_dotenv()
+
+# Configuration from .env
+TENANT_ID = os.getenv('SHP_TENANT_ID')
+CLIENT_ID = os.getenv('SHP_ID_APP')
+CLIENT_SECRET = os.getenv('SHP_ID_APP_SECRET')
+SITE_URL = os.getenv('SHP_SITE_URL')
+
+LINK_CACHE = CACHE_DIR / 'link_check.json'
+
+# Links that resolved within this many seconds are not looked up again
+LINK_CACHE_TTL = int(os.getenv('SHP_LINK_CACHE_TTL', '3600'))
+LINK_CHECK_CONCURRENCY = int(os.getenv('SHP_LINK_CHECK_CONCURRENCY', '4'))
+
+# (kind, path): kind is 'library' (a path in the document library) or 'list'
+Reference = Tuple[str, str]
+
+
+class _LinkScan(HTMLParser):
+    """Collect the href of every anchor in a page"""
+
+    def __init__(self):
+        super().__init__()
+        self.hrefs: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.hrefs.append(href)
+
+
+def extract_links(page: str) -> List[str]:
+    scan = _LinkScan()
+    scan.feed(page)
+    return scan.hrefs
+
+
+def link_reference(href: str, target: Dict[str, Any]) -> Optional[Reference]:
+    """What a href points at on the site, or None for mail and external links
+
+    Relative hrefs come from the SharePoint page, which sits in the library
+    root; absolute ones from the static page, which links through site URLs
+    and library views (Forms/AllItems.aspx?id=<server-relative folder>).
+    """
+    if href.startswith(('mailto:', '#', 'javascript:')):
+        return None
+    parts = urlsplit(href)
+
+    if target.get('links') == 'absolute':
+        site_url = target['site_url'].rstrip('/')
+        if not href.startswith(f"{site_url}/"):
+            return None
+        site_path = urlsplit(site_url).path
+        library = target.get('library', 'Shared Documents')
+        path = unquote(parts.path)[len(site_path):].strip('/')
+        if path == f"{library}/Forms/AllItems.aspx":
+            folder = parse_qs(parts.query).get('id', [''])[0]
+            prefix = f"{site_path}/{library}/"
+            return ('library', folder[len(prefix):].strip('/')) if folder.startswith(prefix) else None
+        if path.startswith(f"{library}/"):
+            return 'library', path[len(library) + 1:]
+    else:
+        if parts.scheme or parts.netloc:
+            return None
+        path = unquote(parts.path)
+        if not path.startswith('../'):
+            return 'library', path.strip('/')
+        path = path[len('../'):]
+
+    segments = path.split('/')
+    if segments[0] == 'Lists' and len(segments) > 1:
+        return 'list', segments[1]
+    return None
+
+
+class LinkChecker:
+    """Resolve library and list references for one site in $batch groups"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, site_id: str, drive_id: str, tokens, ttl: int = LINK_CACHE_TTL,
+                 concurrency: int = LINK_CHECK_CONCURRENCY, cache_file=LINK_CACHE):
+        self.site_id = site_id
+        self.drive_id = drive_id
+        self.tokens = tokens
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.cache_file = cache_file
+        self.entries = load_json(self.cache_file, {}).get(self.drive_id, {})
+
+    def _url(self, reference: Reference) -> str:
+        kind, path = reference
+        if kind == 'list':
+            return f"/sites/{self.site_id}/lists/{quote(path)}?$select=id,displayName"
+        return f"/drives/{self.drive_id}/root:/{quote(path)}?$select=id,name"
+
+    def check(self, references: Iterable[Reference]) -> Dict[Reference, Dict[str, Any]]:
+        """Return {reference: {'status': 'ok'|'moved'|'broken'|'error', ...}}"""
+        now = time.time()
+        results = {}
+        pending = []
+        for reference in dict.fromkeys(references):
+            entry = self.entries.get(':'.join(reference))
+            if entry and now - entry.get('checked_at', 0) < self.ttl:
+                results[reference] = {'status': 'ok', 'cached': True}
+            else:
+                pending.append(reference)
+
+        headers = self.tokens.auth_headers()
+        batch_requests = [{'id': str(index), 'method': 'GET', 'url': self._url(reference)}
+                          for index, reference in enumerate(pending)]
+        responses = send_batch(batch_requests, headers, self.concurrency) if batch_requests else {}
+
+        # Paths that are gone but resolved before: look their items up by ID
+        missing = []
+        for index, reference in enumerate(pending):
+            key = ':'.join(reference)
+            response = responses.get(str(index), {})
+            status = response.get('status')
+            if status == 200:
+                self.entries[key] = {'id': response.get('body', {}).get('id'), 'checked_at': now}
+                results[reference] = {'status': 'ok'}
+            elif status == 404 and reference[0] == 'library' and self.entries.get(key, {}).get('id'):
+                missing.append(reference)
+            elif status == 404:
+                self.entries.pop(key, None)
+                results[reference] = {'status': 'broken'}
+            else:
+                results[reference] = {'status': 'error', 'detail': f"HTTP {status}"}
+
+        batch_requests = [{'id': str(index), 'method': 'GET',
+                           'url': (f"/drives/{self.drive_id}/items/{self.entries[':'.join(reference)]['id']}"
+                                   f"?$select=id,name,parentReference")}
+                          for index, reference in enumerate(missing)]
+        responses = send_batch(batch_requests, headers, self.concurrency) if batch_requests else {}
+        for index, reference in enumerate(missing):
+            response = responses.get(str(index), {})
+            self.entries.pop(':'.join(reference), None)
+            if response.get('status') == 200:
+                results[reference] = {'status': 'moved', 'moved_to': library_path(response['body'])}
+            else:
+                results[reference] = {'status': 'broken'}
+
+        self._save()
+        return results
+
+    def _save(self):
+        with self._lock:
+            cache = load_json(self.cache_file, {})
+            cache[self.drive_id] = self.entries
+            try:
+                save_json(self.cache_file, cache)
+            except OSError as e:
+                print(f"⚠️  Could not write link check cache: {e}")
+
+
+def page_links(targets: List[str] = None, stats: Dict[str, Any] = None) -> Dict[str, List[Tuple[str, Reference]]]:
+    """Render the target pages in memory and return {target: [(href, reference), ...]}
+
+    Nothing is written: the built pages and the build state stay as they are.
+    """
+    content = load_content()
+    links = {}
+    for name in targets or sorted(content['targets']):
+        target = content['targets'][name]
+        hrefs = extract_links(render_target(name, content, stats))
+        links[name] = [(href, link_reference(href, target)) for href in dict.fromkeys(hrefs)]
+    return links
+
+
+def check_links(checker: LinkChecker, targets: List[str] = None,
+                stats: Dict[str, Any] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Check every site link on the target pages; returns the problems per target"""
+    links = page_links(targets, stats)
+    results = checker.check(reference for pairs in links.values() for _, reference in pairs if reference)
+    problems = {}
+    for name, pairs in links.items():
+        problems[name] = [dict(results[reference], href=href, kind=reference[0], path=reference[1])
+                          for href, reference in pairs
+                          if reference and results[reference]['status'] != 'ok']
+    return problems
+
+
+def print_problems(problems: Dict[str, List[Dict[str, Any]]]) -> int:
+    """Print broken and moved links; returns how many there were"""
+    total = 0
+    for name, entries in problems.items():
+        for entry in entries:
+            total += 1
+            if entry['status'] == 'moved':
+                print(f"🔀 {name}: {entry['path']} moved to {entry['moved_to']}")
+            elif entry['status'] == 'broken':
+                print(f"❌ {name}: {entry['path']} not found ({entry['kind']})")
+            else:
+                print(f"⚠️  {name}: {entry['path']} could not be checked ({entry.get('detail')})")
+    return total
+
+
+def main():
+    """Check the portal page links against the SharePoint site"""
+    parser = argparse.ArgumentParser(description="Check portal page links against the document library")
+    parser.add_argument('targets', nargs='*', help="targets to check (default: all)")
+    parser.add_argument('--concurrency', type=int, default=LINK_CHECK_CONCURRENCY,
+                        help=f"$batch envelopes in flight at once (default {LINK_CHECK_CONCURRENCY})")
+    parser.add_argument('--refresh', action='store_true', help="ignore cached results and look every link up")
+    args = parser.parse_args()
+
+    if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET, SITE_URL]):
+        print("❌ Missing SharePoint configuration in .env file")
+        sys.exit(1)
+
+    tokens = get_token_provider(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
+    resolver = GraphResolver(SITE_URL, tokens)
+    checker = LinkChecker(resolver.site_id, resolver.drive_id, tokens,
+                          ttl=0 if args.refresh else LINK_CACHE_TTL, concurrency=args.concurrency)
+
+    started = time.perf_counter()
+    # Live stats put the Recently Updated links on the page, so they get checked too
+    stats = LibraryStats(resolver.drive_id, tokens).get(library_sections(load_content()), refresh=args.refresh)
+    problems = check_links(checker, args.targets or None, stats)
+    count = print_problems(problems)
+    elapsed = time.perf_counter() - started
+    if count:
+        print(f"\n❌ {count} link problem(s) found in {elapsed:.1f}s")
+    else:
+        print(f"✅ All links resolve ({elapsed:.1f}s)")
+    sys.exit(1 if count else 0)
+
+
+if __name__ == '__main__':
+    main()
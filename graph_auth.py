@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Client-credentials token provider for Microsoft Graph
+Caches access tokens on disk per tenant/client/scope and refreshes them in
+the background before they expire, so concurrent workers share one token
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from graph_cache import CACHE_DIR, load_json, save_json
+from graph_transport import LOGIN_URL, get_transport
+
+GRAPH_SCOPE = 'https://graph.microsoft.com/.default'
+
+# Refresh this many seconds before expiry; tokens inside the skew window are never used
+REFRESH_MARGIN = int(os.getenv('SHP_TOKEN_REFRESH_MARGIN', '300'))
+EXPIRY_SKEW = 60
+
+# Providers for several tenants share one cache file
+_cache_lock = threading.Lock()
+
+
+class TokenProvider:
+    """Thread-safe access token source with an on-disk cache"""
+
+    def __init__(self, tenant_id: str, client_id: str, client_secret: str,
+                 scope: str = GRAPH_SCOPE, cache_dir: Path = CACHE_DIR,
+                 refresh_margin: int = REFRESH_MARGIN):
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.cache_file = Path(cache_dir) / 'tokens.json'
+        self.refresh_margin = refresh_margin
+        # Keyed by login endpoint too, so stand-in tokens never reach real Azure AD
+        self.key = hashlib.sha256(f"{LOGIN_URL}|{tenant_id}|{client_id}|{scope}".encode('utf-8')).hexdigest()
+        # Refreshes run on timer threads, which don't see the caller's use_transport()
+        self.http = get_transport()
+
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._timer = None
+
+    def get_token(self) -> str:
+        """Return a valid access token, fetching one only when needed"""
+        now = time.time()
+        if self._token and now < self._expires_at - self.refresh_margin:
+            return self._token
+
+        with self._lock:
+            now = time.time()
+            if not self._token:
+                self._load_cached()
+
+            if self._token and now < self._expires_at - self.refresh_margin:
+                return self._token
+
+            if self._token and now < self._expires_at - EXPIRY_SKEW:
+                # Still usable: hand it out and refresh behind the caller
+                self._refresh_in_background()
+                return self._token
+
+            self._fetch()
+            return self._token
+
+    async def get_token_async(self) -> str:
+        """Async variant that never blocks the event loop on a token fetch"""
+        if self._token and time.time() < self._expires_at - self.refresh_margin:
+            return self._token
+        return await asyncio.to_thread(self.get_token)
+
+    def auth_headers(self) -> Dict[str, str]:
+        return {'Authorization': f'Bearer {self.get_token()}'}
+
+    def _fetch(self):
+        """Request a new token from Azure AD (caller holds the lock)"""
+        url = f"{LOGIN_URL}/{self.tenant_id}/oauth2/v2.0/token"
+        data = {
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'scope': self.scope,
+            'grant_type': 'client_credentials'
+        }
+        response = self.http.post(url, data=data)
+        response.raise_for_status()
+        payload = response.json()
+
+        self._token = payload.get('access_token')
+        self._expires_at = time.time() + int(payload.get('expires_in', 3599))
+        self._save_cached()
+        self._schedule_refresh()
+
+    def _refresh(self):
+        try:
+            with self._lock:
+                # Another thread may have fetched a new token while this one waited
+                if not (self._token and time.time() < self._expires_at - self.refresh_margin):
+                    self._fetch()
+        except Exception as e:
+            print(f"⚠️  Background token refresh failed: {e}")
+        finally:
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        if self._refreshing:
+            return
+        self._refreshing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _schedule_refresh(self):
+        if self._timer:
+            self._timer.cancel()
+        delay = max(0.0, self._expires_at - self.refresh_margin - time.time())
+        self._timer = threading.Timer(delay, self._refresh_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _load_cached(self):
+        entry = load_json(self.cache_file, {}).get(self.key)
+        if entry and time.time() < entry.get('expires_at', 0) - EXPIRY_SKEW:
+            self._token = entry['access_token']
+            self._expires_at = entry['expires_at']
+            self._schedule_refresh()
+
+    def _save_cached(self):
+        now = time.time()
+        with _cache_lock:
+            cache = load_json(self.cache_file, {})
+            cache = {key: entry for key, entry in cache.items() if entry.get('expires_at', 0) > now}
+            cache[self.key] = {'access_token': self._token, 'expires_at': self._expires_at}
+            try:
+                save_json(self.cache_file, cache)
+            except OSError as e:
+                print(f"⚠️  Could not write token cache: {e}")
+
+
+_providers: Dict[str, TokenProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_token_provider(tenant_id: str, client_id: str, client_secret: str,
+                       scope: str = GRAPH_SCOPE) -> TokenProvider:
+    """Return the shared provider for a tenant/client/scope"""
+    key = f"{tenant_id}|{client_id}|{scope}"
+    with _providers_lock:
+        provider: Optional[TokenProvider] = _providers.get(key)
+        if provider is None:
+            provider = TokenProvider(tenant_id, client_id, client_secret, scope)
+            _providers[key] = provider
+        return provider
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Microsoft Graph JSON batching helpers
+Sends many Graph requests through the /$batch endpoint, 20 per envelope
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any
+
+from graph_throttle import retry_after_seconds, should_retry
+from graph_transport import GRAPH_URL, NETWORK_ERRORS, get_transport
+
+BATCH_URL = f"{GRAPH_URL}/$batch"
+BATCH_LIMIT = 20
+
+
+def chunk_requests(batch_requests: List[Dict[str, Any]], limit: int = BATCH_LIMIT) -> List[List[Dict[str, Any]]]:
+    """Split requests into envelopes of at most `limit` requests
+
+    Graph only resolves dependsOn against requests in the same envelope, so
+    dependencies on requests sent in an earlier envelope are dropped (those
+    have already completed by the time the later envelope is sent).
+    """
+    envelopes = []
+    for start in range(0, len(batch_requests), limit):
+        chunk = batch_requests[start:start + limit]
+        ids = {req['id'] for req in chunk}
+        envelope = []
+        for req in chunk:
+            req = dict(req)
+            depends_on = [dep for dep in req.pop('dependsOn', []) if dep in ids]
+            if depends_on:
+                req['dependsOn'] = depends_on
+            envelope.append(req)
+        envelopes.append(envelope)
+    return envelopes
+
+
+def send_batch(batch_requests: List[Dict[str, Any]], headers: Dict[str, str],
+               concurrency: int = 1) -> Dict[str, Dict[str, Any]]:
+    """Send requests through $batch and return the responses keyed by request id
+
+    With concurrency > 1 several envelopes are in flight at once; only use
+    that when no request depends on one in another envelope. Individual
+    requests throttled inside an envelope (429/503, or another 5xx for
+    idempotent methods) are resent after their Retry-After, up to the
+    transport's retry limit. When a whole
+    envelope fails, its requests come back with status None and a
+    batchFailed error, since they may or may not have been applied.
+    """
+    http = get_transport()
+    responses = {}
+    pending = list(batch_requests)
+    methods = {req['id']: req['method'] for req in batch_requests}
+
+    def post_envelope(envelope: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        try:
+            response = http.post(BATCH_URL, headers=headers, json={"requests": envelope})
+            if response.status_code == 200:
+                return response.json().get('responses', [])
+            error = f"$batch returned HTTP {response.status_code}"
+        except (NETWORK_ERRORS + (ValueError,)) as e:
+            error = f"$batch request failed: {e}"
+        # Only this envelope's requests get the error; other envelopes keep their results
+        return [{'id': req['id'], 'status': None, 'headers': {},
+                 'body': {'error': {'code': 'batchFailed', 'message': error}}} for req in envelope]
+
+    for attempt in range(http.retry.max_retries + 1):
+        envelopes = chunk_requests(pending)
+        if concurrency > 1 and len(envelopes) > 1:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(envelopes))) as executor:
+                results = list(executor.map(post_envelope, envelopes))
+        else:
+            results = [post_envelope(envelope) for envelope in envelopes]
+
+        throttled = []
+        delay = 0.0
+        for items in results:
+            for item in items:
+                responses[item['id']] = item
+                if should_retry(methods.get(item['id'], 'GET'), item.get('status')):
+                    throttled.append(item['id'])
+                    retry_after = retry_after_seconds(item.get('headers'))
+                    delay = max(delay, retry_after if retry_after is not None else http.retry.backoff(attempt))
+
+        if not throttled or attempt == http.retry.max_retries:
+            break
+
+        http.stats.add('throttled', len(throttled))
+        http.stats.add('retries', len(throttled))
+        http.stats.add_wait(delay)
+        http.bucket.pause(delay)
+        time.sleep(delay)
+
+        retry_ids = set(throttled)
+        pending = [req for req in pending if req['id'] in retry_ids]
+
+    return responses
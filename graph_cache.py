@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Local cache files for the SharePoint tooling
+Small JSON documents under SHP_CACHE_DIR, written atomically
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+from typing import Any
+
+load_dotenv()
+
+CACHE_DIR = Path(os.getenv('SHP_CACHE_DIR', str(Path.home() / '.cache' / 'ethos-isms')))
+
+
+def load_json(path: Path, default: Any = None) -> Any:
+    """Read a JSON cache file, returning `default` if it is missing or corrupt"""
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path: Path, data: Any, mode: int = 0o600):
+    """Write a JSON cache file atomically with owner-only permissions"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_suffix(f'{path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp')
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_file, path)
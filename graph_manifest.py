@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Upload manifest for the ISMS document library
+Records the quickXorHash and eTag of everything we upload so unchanged
+documents are skipped instead of creating a new SharePoint version
+"""
+
+import os
+import time
+import base64
+import threading
+from pathlib import Path
+from urllib.parse import quote
+from typing import Dict, Any, Optional
+
+from graph_cache import CACHE_DIR, load_json, save_json
+from graph_transport import GRAPH_URL, get_transport
+
+MANIFEST_FILE = CACHE_DIR / 'upload_manifest.json'
+
+# Set SHP_MANIFEST_VERIFY=0 to trust the manifest without asking Graph
+VERIFY_REMOTE = os.getenv('SHP_MANIFEST_VERIFY', '1').lower() not in ('0', 'false', 'no')
+
+HASH_BLOCK = 160 * 8192
+
+
+class QuickXorHash:
+    """OneDrive/SharePoint quickXorHash
+
+    Byte i of the input is XORed into a 160-bit ring at bit (11 * i) mod 160,
+    and the total length is XORed into the last 64 bits. Because the shift
+    repeats every 160 bytes, input is first folded into a 160-byte block so
+    the per-byte work happens once per block rather than once per byte.
+    """
+
+    WIDTH = 160
+    SHIFT = 11
+    MASK = (1 << 160) - 1
+
+    def __init__(self):
+        self.folded = 0
+        self.length = 0
+        self.pending = b''
+
+    def update(self, data: bytes):
+        data = self.pending + bytes(data)
+        usable = len(data) - len(data) % self.WIDTH
+        view = memoryview(data)
+        folded = self.folded
+        for start in range(0, usable, self.WIDTH):
+            folded ^= int.from_bytes(view[start:start + self.WIDTH], 'little')
+        self.folded = folded
+        self.pending = data[usable:]
+        self.length += usable
+
+    def digest(self) -> bytes:
+        block = self.folded.to_bytes(self.WIDTH, 'little')
+        total = self.length + len(self.pending)
+        # Fold the partial tail in at its own offsets
+        tail = bytearray(block)
+        for index, byte in enumerate(self.pending):
+            tail[index] ^= byte
+
+        state = 0
+        for index, byte in enumerate(tail):
+            if byte:
+                rotated = byte << ((index * self.SHIFT) % self.WIDTH)
+                state ^= (rotated & self.MASK) | (rotated >> self.WIDTH)
+
+        state ^= total << (self.WIDTH - 64)
+        return state.to_bytes(20, 'little')
+
+    def b64digest(self) -> str:
+        return base64.b64encode(self.digest()).decode('ascii')
+
+
+def quickxor_bytes(data: bytes) -> str:
+    """Return the base64 quickXorHash of an in-memory document"""
+    hasher = QuickXorHash()
+    hasher.update(data)
+    return hasher.b64digest()
+
+
+def quickxor_file(path) -> str:
+    """Return the base64 quickXorHash of a file, streamed from disk"""
+    hasher = QuickXorHash()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            hasher.update(block)
+    return hasher.b64digest()
+
+
+class UploadManifest:
+    """Local record of uploaded content hashes and remote eTags per target path"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, path: Path = MANIFEST_FILE, verify_remote: bool = VERIFY_REMOTE):
+        self.path = path
+        self.verify_remote = verify_remote
+        self.entries = load_json(self.path, {})
+        self.http = get_transport()
+
+    def is_unchanged(self, drive_id: str, remote_path: str, content_hash: str, tokens) -> bool:
+        """Return True when the remote document already has this content"""
+        key = f"{drive_id}:{remote_path}"
+        entry = self.entries.get(key)
+
+        if entry and entry.get('quickXorHash') != content_hash:
+            # Local content changed since our last upload
+            return False
+        if entry and not self.verify_remote:
+            return True
+
+        url = f"{GRAPH_URL}/drives/{drive_id}/root:/{quote(remote_path)}"
+        headers = tokens.auth_headers()
+        if entry and entry.get('eTag'):
+            headers['If-None-Match'] = entry['eTag']
+        response = self.http.get(url, headers=headers, params={'$select': 'id,eTag,size,file'})
+
+        if response.status_code == 304:
+            return True
+        if response.status_code != 200:
+            return False
+
+        item = response.json()
+        remote_hash = item.get('file', {}).get('hashes', {}).get('quickXorHash')
+        if remote_hash != content_hash:
+            return False
+
+        self.record(drive_id, remote_path, content_hash, item)
+        return True
+
+    def record(self, drive_id: str, remote_path: str, content_hash: str, item: Dict[str, Any]):
+        """Remember the hash and eTag of an uploaded document"""
+        key = f"{drive_id}:{remote_path}"
+        with self._lock:
+            # Merge with the file so manifests for other sites in this process are kept
+            self.entries = {**load_json(self.path, {}), **self.entries}
+            self.entries[key] = {
+                'quickXorHash': content_hash,
+                'eTag': item.get('eTag'),
+                'size': item.get('size'),
+                'recorded_at': time.time()
+            }
+            try:
+                save_json(self.path, self.entries)
+            except OSError as e:
+                print(f"⚠️  Could not write upload manifest: {e}")
+
+    def get(self, drive_id: str, remote_path: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(f"{drive_id}:{remote_path}")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for paged Microsoft Graph collections
+Follows @odata.nextLink lazily and yields one item at a time, so reading
+a large list or folder uses constant memory and never stops at page one
+"""
+
+import os
+import sys
+import json
+import argparse
+from urllib.parse import quote
+from typing import Dict, List, Any, Iterator, Optional
+
+from graph_transport import GRAPH_URL, get_transport
+
+# Graph caps most collections at 999 (lists) or 200 (drive children) per page
+LIST_PAGE_SIZE = 999
+CHILDREN_PAGE_SIZE = 200
+
+
+def iter_pages(url: str, tokens, params: Dict[str, Any] = None,
+               headers: Dict[str, str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield each page of a collection, following @odata.nextLink
+
+    Query parameters only apply to the first request; nextLink already
+    carries them (and the skip token) for the following pages.
+    """
+    http = get_transport()
+    while url:
+        request_headers = dict(tokens.auth_headers(), **(headers or {}))
+        response = http.get(url, headers=request_headers, params=params)
+        response.raise_for_status()
+        page = response.json()
+        yield page
+        url = page.get('@odata.nextLink')
+        params = None
+
+
+def iter_items(url: str, tokens, select: List[str] = None, expand: str = None,
+               filter: str = None, top: int = None, orderby: str = None,
+               headers: Dict[str, str] = None, limit: int = None) -> Iterator[Dict[str, Any]]:
+    """Yield the items of a collection one at a time
+
+    `top` is the page size requested from Graph; `limit` stops the stream
+    after that many items in total.
+    """
+    params = {}
+    if select:
+        params['$select'] = ','.join(select)
+    if expand:
+        params['$expand'] = expand
+    if filter:
+        params['$filter'] = filter
+    if top:
+        params['$top'] = top
+    if orderby:
+        params['$orderby'] = orderby
+
+    count = 0
+    for page in iter_pages(url, tokens, params or None, headers):
+        for item in page.get('value', []):
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+
+def iter_list_items(site_id: str, list_id: str, tokens, fields: List[str] = None,
+                    filter: str = None, top: int = LIST_PAGE_SIZE,
+                    limit: int = None) -> Iterator[Dict[str, Any]]:
+    """Yield list items with only the requested column values expanded"""
+    url = f"{GRAPH_URL}/sites/{site_id}/lists/{list_id}/items"
+    expand = f"fields($select={','.join(fields)})" if fields else 'fields'
+    headers = None
+    if filter:
+        # Filtering on non-indexed columns is refused on large lists without this
+        headers = {'Prefer': 'HonorNonIndexedQueriesWarningMayFailRandomly'}
+    return iter_items(url, tokens, select=['id', 'lastModifiedDateTime'], expand=expand,
+                      filter=filter, top=top, headers=headers, limit=limit)
+
+
+def iter_children(drive_id: str, tokens, path: str = '', select: List[str] = None,
+                  top: int = CHILDREN_PAGE_SIZE, limit: int = None) -> Iterator[Dict[str, Any]]:
+    """Yield the children of a drive folder ('' for the library root)"""
+    if path.strip('/'):
+        url = f"{GRAPH_URL}/drives/{drive_id}/root:/{quote(path.strip('/'))}:/children"
+    else:
+        url = f"{GRAPH_URL}/drives/{drive_id}/root/children"
+    return iter_items(url, tokens, select=select, top=top, limit=limit)
+
+
+def first_item(url: str, tokens, **kwargs: Any) -> Optional[Dict[str, Any]]:
+    """Return the first item of a collection, or None"""
+    return next(iter_items(url, tokens, limit=1, **kwargs), None)
+
+
+def main():
+    """Stream a list or folder to stdout as JSON lines"""
+    from graph_auth import get_token_provider
+    from graph_resolver import GraphResolver
+
+    parser = argparse.ArgumentParser(description="Stream SharePoint list items or folder children as JSON lines")
+    sub = parser.add_subparsers(dest='command', required=True)
+    list_parser = sub.add_parser('list', help="items of a SharePoint list")
+    list_parser.add_argument('name', help="list display name, e.g. 'Training Records'")
+    list_parser.add_argument('--fields', help="comma-separated column names to return")
+    list_parser.add_argument('--filter', help="OData $filter on fields/...")
+    list_parser.add_argument('--limit', type=int)
+    children_parser = sub.add_parser('children', help="children of a library folder")
+    children_parser.add_argument('path', nargs='?', default='', help="folder path, e.g. 01_Policies")
+    children_parser.add_argument('--select', help="comma-separated driveItem properties")
+    children_parser.add_argument('--limit', type=int)
+    args = parser.parse_args()
+
+    tenant_id = os.getenv('SHP_TENANT_ID')
+    client_id = os.getenv('SHP_ID_APP')
+    client_secret = os.getenv('SHP_ID_APP_SECRET')
+    site_url = os.getenv('SHP_SITE_URL')
+    if not all([tenant_id, client_id, client_secret, site_url]):
+        print("❌ Missing SharePoint configuration in .env file", file=sys.stderr)
+        sys.exit(1)
+
+    tokens = get_token_provider(tenant_id, client_id, client_secret)
+    resolver = GraphResolver(site_url, tokens)
+
+    if args.command == 'list':
+        list_id = resolver.list_id(args.name)
+        if not list_id:
+            print(f"❌ List not found: {args.name}", file=sys.stderr)
+            sys.exit(1)
+        fields = args.fields.split(',') if args.fields else None
+        items = iter_list_items(resolver.site_id, list_id, tokens, fields, args.filter, limit=args.limit)
+    else:
+        select = args.select.split(',') if args.select else None
+        items = iter_children(resolver.drive_id, tokens, args.path, select, limit=args.limit)
+
+    for item in items:
+        sys.stdout.write(json.dumps(item) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Cached resolution of SharePoint site, drive and list IDs
+Repeat runs reuse the IDs stored under SHP_CACHE_DIR instead of walking
+sites -> drives -> lists on every start
+"""
+
+import os
+import time
+import threading
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional
+
+from graph_cache import CACHE_DIR, load_json, save_json
+from graph_pager import first_item, iter_items
+from graph_transport import GRAPH_URL, get_transport
+
+RESOLVER_CACHE = CACHE_DIR / 'resolver.json'
+
+# Cached IDs are trusted for this long, then re-validated with one request
+RESOLVER_TTL = int(os.getenv('SHP_RESOLVER_TTL', '86400'))
+
+
+class GraphResolver:
+    """Resolve and cache the site, drive and list IDs for one SharePoint site"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, site_url: str, tokens, ttl: int = RESOLVER_TTL, cache_file=RESOLVER_CACHE):
+        self.site_url = site_url.rstrip('/')
+        self.tokens = tokens
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.http = get_transport()
+        # IDs from a stand-in (SHP_GRAPH_URL) must never be used against real Graph
+        self.cache_key = f"{GRAPH_URL}|{self.site_url}"
+        self.entry = load_json(self.cache_file, {}).get(self.cache_key, {})
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return self.tokens.auth_headers()
+
+    def resolve(self) -> Dict[str, str]:
+        """Return site_id and drive_id, using the cache when it is still valid"""
+        if self.entry.get('site_id') and self.entry.get('drive_id'):
+            age = time.time() - self.entry.get('validated_at', 0)
+            if age < self.ttl or self._validate():
+                return {'site_id': self.entry['site_id'], 'drive_id': self.entry['drive_id']}
+
+        site_id = self._lookup_site()
+        self.entry = {'site_id': site_id, 'drive_id': self._lookup_drive(site_id), 'lists': {}}
+        self._save()
+        return {'site_id': self.entry['site_id'], 'drive_id': self.entry['drive_id']}
+
+    @property
+    def site_id(self) -> str:
+        return self.resolve()['site_id']
+
+    @property
+    def drive_id(self) -> str:
+        return self.resolve()['drive_id']
+
+    def list_id(self, display_name: str) -> Optional[str]:
+        """Return a list ID by display name, filtered server-side
+
+        Like the site and drive, a cached ID is re-validated once it is
+        older than the TTL and looked up again if the list is gone.
+        """
+        site_id = self.site_id
+        cached = self.entry.get('lists', {}).get(display_name)
+        if isinstance(cached, dict) and cached.get('id'):
+            age = time.time() - cached.get('validated_at', 0)
+            if age < self.ttl or self._validate_list(display_name, cached):
+                return cached['id']
+
+        escaped = display_name.replace("'", "''")
+        found = first_item(f"{GRAPH_URL}/sites/{site_id}/lists", self.tokens,
+                           select=['id', 'displayName'], filter=f"displayName eq '{escaped}'")
+        if not found:
+            self.invalidate_list(display_name)
+            return None
+
+        self.entry.setdefault('lists', {})[display_name] = {'id': found.get('id'), 'validated_at': time.time()}
+        self._save()
+        return found.get('id')
+
+    def invalidate(self):
+        """Forget cached IDs (call after a 404 on a cached ID)"""
+        self.entry = {}
+        self._save()
+
+    def invalidate_list(self, display_name: str):
+        """Forget one cached list ID (call after a 404 on it)"""
+        if self.entry.get('lists', {}).pop(display_name, None) is not None:
+            self._save()
+
+    def _validate_list(self, display_name: str, cached: Dict[str, Any]) -> bool:
+        """Check a cached list still exists under the same name with one small request"""
+        url = f"{GRAPH_URL}/sites/{self.entry['site_id']}/lists/{cached['id']}?$select=id,displayName"
+        try:
+            response = self.http.get(url, headers=self.headers)
+        except Exception:
+            return False
+        if response.status_code != 200 or response.json().get('displayName') != display_name:
+            return False
+
+        cached['validated_at'] = time.time()
+        self._save()
+        return True
+
+    def _validate(self) -> bool:
+        """Check the cached site and drive still exist with one small request"""
+        url = (f"{GRAPH_URL}/sites/{self.entry['site_id']}/drives/{self.entry['drive_id']}"
+               f"?$select=id")
+        try:
+            response = self.http.get(url, headers=self.headers)
+        except Exception:
+            return False
+        if response.status_code != 200:
+            return False
+
+        self.entry['validated_at'] = time.time()
+        self._save()
+        return True
+
+    def _lookup_site(self) -> str:
+        parsed = urlparse(self.site_url)
+        hostname = parsed.netloc
+        site_path = parsed.path.lstrip('/')
+
+        url = f"{GRAPH_URL}/sites/{hostname}:/{site_path}?$select=id"
+        response = self.http.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response.json().get('id')
+
+    def _lookup_drive(self, site_id: str) -> Optional[str]:
+        drives = list(iter_items(f"{GRAPH_URL}/sites/{site_id}/drives", self.tokens, select=['id', 'name']))
+        for drive in drives:
+            if drive.get('name') == 'Shared Documents' or 'Documents' in drive.get('name', ''):
+                return drive.get('id')
+
+        # Use first drive if specific one not found
+        return drives[0].get('id') if drives else None
+
+    def _save(self):
+        if self.entry:
+            self.entry.setdefault('validated_at', time.time())
+        with self._lock:
+            cache = load_json(self.cache_file, {})
+            if self.entry:
+                cache[self.cache_key] = self.entry
+            else:
+                cache.pop(self.cache_key, None)
+            try:
+                save_json(self.cache_file, cache)
+            except OSError as e:
+                print(f"⚠️  Could not write resolver cache: {e}")
@@ -0,0 +1,1024 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Microsoft Graph endpoints our scripts use
+Serves the token endpoint, sites, drives, drive items and upload sessions,
+lists and items, $batch and delta from in-memory state, with configurable
+latency and 409/429 injection, so throughput can be measured offline.
+Point the scripts at it with SHP_GRAPH_URL and SHP_LOGIN_URL.
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, unquote, urlencode
+from typing import Dict, List, Any, Optional, Tuple
+
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+DEFAULT_PAGE_SIZE = 200
+BATCH_LIMIT = 20
+
+# Copy monitors report inProgress this many times before completing
+COPY_POLLS = 2
+
+# Like Graph, $expand=children returns at most this many and is never paged
+EXPAND_LIMIT = 200
+
+FILTER_CLAUSE = re.compile(r"^\s*([\w/]+)\s+(eq|ne|gt|ge|lt|le)\s+('(?:[^']|'')*'|[\w.+-]+)\s*$")
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+EXPAND_CHILDREN = re.compile(r'^children(?:\(\$select=([^)]*)\))?$')
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _quickxor(content: bytes) -> str:
+    # Imported on use: graph_manifest pulls in graph_transport, which reads
+    # SHP_GRAPH_URL at import, and in-process callers set that after start()
+    from graph_manifest import quickxor_bytes
+    return quickxor_bytes(content)
+
+
+def _error(status: int, code: str, message: str) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+    return status, {}, {'error': {'code': code, 'message': message}}
+
+
+class StandInError(Exception):
+    """Raised inside handlers to return a Graph-style error response"""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+class Drive:
+    """One document library: a tree of items plus a change sequence for delta"""
+
+    def __init__(self, drive_id: str, name: str = 'Documents'):
+        self.id = drive_id
+        self.name = name
+        self.seq = 0
+        self.min_token = 0  # delta tokens below this get 410 (resync required)
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.tombstones: Dict[str, Dict[str, Any]] = {}
+        self.root_id = self._new_item('root', None, folder=True)['id']
+
+    def _touch(self, item: Dict[str, Any]):
+        self.seq += 1
+        item['seq'] = self.seq
+        item['version'] = item.get('version', 0) + 1
+        item['lastModifiedDateTime'] = _now()
+
+    def _new_item(self, name: str, parent_id: Optional[str], folder: bool,
+                  content: bytes = None, mime_type: str = None) -> Dict[str, Any]:
+        item = {
+            'id': uuid.uuid4().hex[:16].upper(),
+            'name': name,
+            'parent': parent_id,
+            'folder': folder,
+            'content': content,
+            'mimeType': mime_type,
+            'hash': _quickxor(content) if content is not None else None,
+            'createdDateTime': _now()
+        }
+        self._touch(item)
+        self.items[item['id']] = item
+        return item
+
+    def children(self, item_id: str) -> List[Dict[str, Any]]:
+        return sorted((item for item in self.items.values() if item['parent'] == item_id),
+                      key=lambda item: item['name'].lower())
+
+    def child(self, parent_id: str, name: str) -> Optional[Dict[str, Any]]:
+        for item in self.items.values():
+            if item['parent'] == parent_id and item['name'].lower() == name.lower():
+                return item
+        return None
+
+    def resolve(self, path: str) -> Optional[Dict[str, Any]]:
+        item = self.items[self.root_id]
+        for part in filter(None, path.split('/')):
+            item = self.child(item['id'], part)
+            if item is None:
+                return None
+        return item
+
+    def path_of(self, item: Dict[str, Any]) -> str:
+        parts = []
+        while item['parent'] is not None:
+            parts.append(item['name'])
+            item = self.items[item['parent']]
+        return '/'.join(reversed(parts))
+
+    def ensure_folder(self, path: str) -> Dict[str, Any]:
+        """Return the folder at path, creating missing folders like a PUT by path does"""
+        item = self.items[self.root_id]
+        for part in filter(None, path.split('/')):
+            existing = self.child(item['id'], part)
+            if existing is None:
+                existing = self._new_item(part, item['id'], folder=True)
+            elif not existing['folder']:
+                raise StandInError(409, 'nameAlreadyExists', f"'{part}' is a file")
+            item = existing
+        return item
+
+    def create(self, parent: Dict[str, Any], name: str, folder: bool, conflict: str = 'fail',
+               content: bytes = None, mime_type: str = None) -> Tuple[Dict[str, Any], bool]:
+        """Create an item under parent; returns (item, created)"""
+        existing = self.child(parent['id'], name)
+        if existing is not None:
+            if conflict == 'rename':
+                stem, dot, suffix = name.rpartition('.') if not folder and '.' in name else (name, '', '')
+                number = 1
+                while self.child(parent['id'], name):
+                    name = f"{stem} {number}{dot}{suffix}"
+                    number += 1
+            elif conflict == 'replace' and existing['folder'] == folder:
+                if not folder:
+                    existing.update(content=content, mimeType=mime_type, hash=_quickxor(content))
+                self._touch(existing)
+                return existing, False
+            else:
+                raise StandInError(409, 'nameAlreadyExists', f"An item named '{name}' already exists")
+        return self._new_item(name, parent['id'], folder, content, mime_type), True
+
+    def delete(self, item: Dict[str, Any]):
+        subtree = [item]
+        for current in subtree:
+            subtree.extend(self.children(current['id']))
+        for current in subtree:
+            del self.items[current['id']]
+            self.seq += 1
+            self.tombstones[current['id']] = {'id': current['id'], 'parent': current['parent'], 'seq': self.seq}
+
+    def to_json(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        data = {
+            'id': item['id'],
+            'name': item['name'],
+            'eTag': f'"{{{item["id"]}}},{item["version"]}"',
+            'cTag': f'"c:{{{item["id"]}}},{item["version"]}"',
+            'createdDateTime': item['createdDateTime'],
+            'lastModifiedDateTime': item['lastModifiedDateTime'],
+            'size': len(item['content'] or b'') if not item['folder'] else self._folder_size(item),
+            'parentReference': {'driveId': self.id}
+        }
+        if item['parent'] is None:
+            data['root'] = {}
+        else:
+            parent = self.items[item['parent']]
+            parent_path = self.path_of(parent)
+            data['parentReference'].update(id=parent['id'], path=f"/drive/root:/{parent_path}".rstrip('/'))
+        if item['folder']:
+            data['folder'] = {'childCount': len(self.children(item['id']))}
+        else:
+            data['file'] = {'mimeType': item['mimeType'] or 'application/octet-stream',
+                            'hashes': {'quickXorHash': item['hash']}}
+        return data
+
+    def _folder_size(self, item: Dict[str, Any]) -> int:
+        return sum(len(child['content'] or b'') if not child['folder'] else self._folder_size(child)
+                   for child in self.children(item['id']))
+
+
+class StandInState:
+    """In-memory sites, drives, lists and upload sessions"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.sites: Dict[str, Dict[str, Any]] = {}
+        self.site_paths: Dict[str, str] = {}
+        self.drives: Dict[str, Drive] = {}
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.monitors: Dict[str, Dict[str, Any]] = {}
+
+    def site_for(self, hostname: str, path: str) -> Dict[str, Any]:
+        """Look up a site by hostname and path, provisioning it on first use"""
+        key = f"{hostname.lower()}:/{path.strip('/').lower()}"
+        if key not in self.site_paths:
+            site_id = f"{hostname},{uuid.uuid4()},{uuid.uuid4()}"
+            drive = Drive(f"b!{uuid.uuid4().hex}")
+            self.drives[drive.id] = drive
+            self.sites[site_id] = {
+                'id': site_id, 'name': path.strip('/').rsplit('/', 1)[-1],
+                'webUrl': f"https://{hostname}/{path.strip('/')}",
+                'drive_id': drive.id, 'lists': {}
+            }
+            self.site_paths[key] = site_id
+        return self.sites[self.site_paths[key]]
+
+
+def _select(data: Dict[str, Any], select: Optional[str]) -> Dict[str, Any]:
+    if not select:
+        return data
+    fields = {name.strip() for name in select.split(',')}
+    return {key: value for key, value in data.items() if key in fields or key.startswith('@')}
+
+
+def _matches(data: Dict[str, Any], expression: Optional[str]) -> bool:
+    """Evaluate a small OData $filter subset: comparisons joined by 'and'"""
+    if not expression:
+        return True
+    for clause in re.split(r'\s+and\s+', expression):
+        match = FILTER_CLAUSE.match(clause)
+        if not match:
+            raise StandInError(400, 'invalidRequest', f"Unsupported filter: {clause}")
+        name, operator, literal = match.groups()
+        value = data
+        for part in name.split('/'):
+            value = value.get(part) if isinstance(value, dict) else None
+        if literal.startswith("'"):
+            expected = literal[1:-1].replace("''", "'")
+        else:
+            try:
+                expected = float(literal)
+            except ValueError:
+                expected = {'true': True, 'false': False, 'null': None}.get(literal, literal)
+        if operator == 'eq':
+            ok = value == expected
+        elif operator == 'ne':
+            ok = value != expected
+        else:
+            if value is None:
+                return False
+            try:
+                ok = {'gt': value > expected, 'ge': value >= expected,
+                      'lt': value < expected, 'le': value <= expected}[operator]
+            except TypeError:
+                return False
+        if not ok:
+            return False
+    return True
+
+
+class GraphStandIn:
+    """In-process fake Graph server with latency and fault injection
+
+    `throttle_rate` and `conflict_rate` are probabilities (seeded by `seed`)
+    of answering a request with 429 + Retry-After, or a create with 409.
+    `rate_limit` (requests per second, 0 = off) throttles like the real
+    service once the budget is spent.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, throttle_rate: float = 0.0, conflict_rate: float = 0.0,
+                 retry_after: float = 1.0, rate_limit: float = 0.0, seed: int = None,
+                 verbose: bool = False):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.conflict_rate = conflict_rate
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.verbose = verbose
+        self.random = random.Random(seed)
+        self.state = StandInState()
+        self.stats: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._window = (0.0, 0)  # (second, requests in it) for rate_limit
+        self._thread = None
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def graph_url(self) -> str:
+        return f"{self.url}/v1.0"
+
+    @property
+    def login_url(self) -> str:
+        return self.url
+
+    def env(self) -> Dict[str, str]:
+        """Environment settings that point the scripts at this server"""
+        return {'SHP_GRAPH_URL': self.graph_url, 'SHP_LOGIN_URL': self.login_url}
+
+    def start(self) -> 'GraphStandIn':
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'GraphStandIn':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset(self):
+        """Drop all state and counters"""
+        with self.state.lock:
+            self.state = StandInState()
+        with self._stats_lock:
+            self.stats = {}
+
+    def configure(self, **options: Any):
+        """Change latency or fault settings while running"""
+        for name, value in options.items():
+            if name not in ('latency', 'jitter', 'throttle_rate', 'conflict_rate', 'retry_after', 'rate_limit'):
+                raise ValueError(f"Unknown stand-in option: {name}")
+            setattr(self, name, float(value))
+
+    def expire_delta_tokens(self):
+        """Make every outstanding delta token return 410 on next use"""
+        with self.state.lock:
+            for drive in self.state.drives.values():
+                drive.min_token = drive.seq + 1
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    # -- fault injection -------------------------------------------------
+
+    def _fault(self, method: str, creates: bool) -> Optional[Tuple[int, Dict[str, str], Dict[str, Any]]]:
+        """Return an injected 429/409 response, or None to serve normally"""
+        with self._stats_lock:
+            if self.rate_limit:
+                second, used = self._window
+                now = time.monotonic()
+                if now - second >= 1.0:
+                    second, used = now, 0
+                used += 1
+                self._window = (second, used)
+                if used > self.rate_limit:
+                    self.stats['throttled'] = self.stats.get('throttled', 0) + 1
+                    return 429, {'Retry-After': f"{self.retry_after:g}"}, {
+                        'error': {'code': 'TooManyRequests', 'message': 'Rate limit exceeded'}}
+            throttle = self.throttle_rate and self.random.random() < self.throttle_rate
+            conflict = creates and self.conflict_rate and self.random.random() < self.conflict_rate
+        if throttle:
+            self._count('throttled')
+            return 429, {'Retry-After': f"{self.retry_after:g}"}, {
+                'error': {'code': 'TooManyRequests', 'message': 'Injected throttling'}}
+        if conflict:
+            self._count('conflicts')
+            return _error(409, 'nameAlreadyExists', 'Injected conflict')
+        return None
+
+    # -- dispatch --------------------------------------------------------
+
+    def dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes,
+                 base_url: str, inner: bool = False) -> Tuple[int, Dict[str, str], Any]:
+        """Route one request (or one $batch sub-request) to its handler"""
+        parts = urlsplit(target)
+        path = parts.path
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        self._count('batch_requests' if inner else 'requests')
+
+        if path.startswith('/_standin/'):
+            return self._control(method, path, body)
+        if path.startswith('/_upload/'):
+            return self._upload_session(method, path.rsplit('/', 1)[-1], headers, body)
+        if path.startswith('/_monitor/') and method == 'GET':
+            return self._monitor(path.rsplit('/', 1)[-1])
+        if path.startswith('/_download/') and method == 'GET':
+            return self._download(*path.split('/')[2:4])
+        if re.match(r'^/[^/]+/oauth2/v2\.0/token$', path) and method == 'POST':
+            self._count('tokens')
+            return 200, {}, {'token_type': 'Bearer', 'expires_in': 3599,
+                             'access_token': f"standin-{uuid.uuid4().hex}"}
+
+        if not inner:
+            if not path.startswith('/v1.0/'):
+                return _error(404, 'itemNotFound', f"No route for {path}")
+            path = path[len('/v1.0'):]
+            if not headers.get('authorization', '').startswith('Bearer '):
+                return _error(401, 'InvalidAuthenticationToken', 'Access token is empty.')
+
+        creates = method in ('POST', 'PUT') and path != '/$batch'
+        fault = self._fault(method, creates)
+        if fault:
+            return fault
+
+        if path == '/$batch' and method == 'POST':
+            return self._batch(headers, body, base_url)
+
+        try:
+            payload = json.loads(body) if body and 'json' in headers.get('content-type', '') else None
+        except ValueError:
+            return _error(400, 'BadRequest', 'Invalid JSON body')
+
+        try:
+            with self.state.lock:
+                return self._route(method, path, query, headers, body, payload, base_url)
+        except StandInError as e:
+            return _error(e.status, e.code, str(e))
+
+    def _route(self, method, path, query, headers, body, payload, base_url):
+        segments = path.strip('/').split('/')
+
+        if segments[0] == 'sites' and len(segments) >= 2:
+            return self._sites(method, segments[1:], query, payload, base_url, path)
+        if segments[0] == 'drives' and len(segments) >= 2:
+            drive = self.state.drives.get(segments[1])
+            if drive is None:
+                raise StandInError(404, 'itemNotFound', 'Drive not found')
+            rest = path.split('/', 3)[3] if len(segments) > 2 else ''
+            return self._drive(method, drive, rest, query, headers, body, payload, base_url, path)
+        raise StandInError(404, 'itemNotFound', f"No route for {path}")
+
+    def _control(self, method: str, path: str, body: bytes):
+        if path == '/_standin/stats':
+            with self._stats_lock:
+                return 200, {}, dict(self.stats)
+        if path == '/_standin/reset' and method == 'POST':
+            self.reset()
+            return 204, {}, None
+        if path == '/_standin/config' and method == 'POST':
+            try:
+                self.configure(**json.loads(body or b'{}'))
+            except ValueError as e:
+                return _error(400, 'BadRequest', str(e))
+            return 204, {}, None
+        if path == '/_standin/expire-delta' and method == 'POST':
+            self.expire_delta_tokens()
+            return 204, {}, None
+        return _error(404, 'itemNotFound', f"No route for {path}")
+
+    # -- $batch ----------------------------------------------------------
+
+    def _batch(self, headers: Dict[str, str], body: bytes, base_url: str):
+        try:
+            requests_ = json.loads(body).get('requests', [])
+        except (ValueError, AttributeError):
+            return _error(400, 'BadRequest', 'Invalid batch body')
+        if len(requests_) > BATCH_LIMIT:
+            return _error(400, 'BadRequest', f"A batch may contain at most {BATCH_LIMIT} requests")
+
+        statuses = {}
+        responses = []
+        for req in requests_:
+            failed = [dep for dep in req.get('dependsOn', []) if not 200 <= statuses.get(dep, 0) < 300]
+            if failed:
+                status, response_headers, data = _error(424, 'FailedDependency', 'Failed dependency')
+            else:
+                inner_headers = {key.lower(): value for key, value in (req.get('headers') or {}).items()}
+                inner_body = req.get('body')
+                if inner_body is not None and not isinstance(inner_body, (bytes, str)):
+                    inner_headers.setdefault('content-type', 'application/json')
+                    inner_body = json.dumps(inner_body).encode('utf-8')
+                elif isinstance(inner_body, str):
+                    inner_body = inner_body.encode('utf-8')
+                status, response_headers, data = self.dispatch(
+                    req.get('method', 'GET').upper(), req['url'] if req['url'].startswith('/') else f"/{req['url']}",
+                    inner_headers, inner_body or b'', base_url, inner=True)
+                if isinstance(data, bytes):
+                    data = data.decode('utf-8', 'replace')
+            statuses[req['id']] = status
+            entry = {'id': req['id'], 'status': status, 'headers': response_headers}
+            if data is not None:
+                entry['body'] = data
+            responses.append(entry)
+        return 200, {}, {'responses': responses}
+
+    # -- sites and lists -------------------------------------------------
+
+    def _sites(self, method, segments, query, payload, base_url, path):
+        site_ref = unquote(segments[0])
+        if ':' in site_ref:
+            # /sites/{hostname}:/{server-relative path}
+            hostname = site_ref.split(':', 1)[0]
+            site_path = '/'.join(unquote(s) for s in segments[1:]) if segments[1:] else site_ref.split(':/', 1)[-1]
+            site = self.state.site_for(hostname, site_path.rstrip(':'))
+            return 200, {}, _select({'id': site['id'], 'name': site['name'], 'webUrl': site['webUrl']},
+                                    query.get('$select'))
+
+        site = self.state.sites.get(site_ref)
+        if site is None:
+            raise StandInError(404, 'itemNotFound', 'Site not found')
+        rest = segments[1:]
+        drive = self.state.drives[site['drive_id']]
+
+        if not rest:
+            return 200, {}, _select({'id': site['id'], 'name': site['name'], 'webUrl': site['webUrl']},
+                                    query.get('$select'))
+        if rest == ['drive'] or (rest[0] == 'drives' and len(rest) == 2):
+            if len(rest) == 2 and rest[1] != drive.id:
+                raise StandInError(404, 'itemNotFound', 'Drive not found')
+            return 200, {}, _select({'id': drive.id, 'name': drive.name, 'driveType': 'documentLibrary'},
+                                    query.get('$select'))
+        if rest == ['drives']:
+            drives = [{'id': drive.id, 'name': drive.name, 'driveType': 'documentLibrary'}]
+            return self._page([_select(d, query.get('$select')) for d in drives], query, base_url, path)
+        if rest[0] == 'lists':
+            return self._lists(method, site, rest[1:], query, payload, base_url, path)
+        raise StandInError(404, 'itemNotFound', f"No route for {path}")
+
+    def _list_json(self, lst: Dict[str, Any], query: Dict[str, str]) -> Dict[str, Any]:
+        data = {'id': lst['id'], 'name': lst['name'], 'displayName': lst['displayName'],
+                'createdDateTime': lst['createdDateTime'], 'list': {'template': lst['template']}}
+        data = _select(data, query.get('$select'))
+        if 'columns' in query.get('$expand', ''):
+            data['columns'] = [dict(column) for column in lst['columns']]
+        return data
+
+    def _lists(self, method, site, rest, query, payload, base_url, path):
+        lists = site['lists']
+        if not rest:
+            if method == 'GET':
+                values = [self._list_json(lst, query) for lst in lists.values()
+                          if _matches(lst, query.get('$filter'))]
+                return self._page(values, query, base_url, path)
+            if method == 'POST':
+                payload = payload or {}
+                name = payload.get('displayName')
+                if not name:
+                    raise StandInError(400, 'invalidRequest', 'displayName is required')
+                if any(lst['displayName'].lower() == name.lower() for lst in lists.values()):
+                    raise StandInError(409, 'nameAlreadyExists', f"A list named '{name}' already exists")
+                lst = {
+                    'id': str(uuid.uuid4()), 'name': name.replace(' ', ''), 'displayName': name,
+                    'template': (payload.get('list') or {}).get('template', 'genericList'),
+                    'createdDateTime': _now(),
+                    'columns': [{'name': 'Title', 'displayName': 'Title', 'text': {}}]
+                               + [dict(column) for column in payload.get('columns', [])],
+                    'items': {}, 'next_item': 1, 'seq': 0, 'tombstones': {}
+                }
+                lists[lst['id']] = lst
+                return 201, {}, self._list_json(lst, {'$expand': 'columns'})
+            raise StandInError(405, 'methodNotAllowed', method)
+
+        list_ref = unquote(rest[0])
+        lst = lists.get(list_ref) or next(
+            (candidate for candidate in lists.values() if candidate['displayName'].lower() == list_ref.lower()), None)
+        if lst is None:
+            raise StandInError(404, 'itemNotFound', 'List not found')
+        rest = rest[1:]
+
+        if not rest:
+            return 200, {}, self._list_json(lst, query)
+        if rest == ['columns']:
+            if method == 'POST':
+                column = payload or {}
+                if any(existing['name'] == column.get('name') for existing in lst['columns']):
+                    raise StandInError(409, 'nameAlreadyExists', f"Column '{column.get('name')}' already exists")
+                lst['columns'].append(dict(column))
+                return 201, {}, column
+            return self._page([dict(column) for column in lst['columns']], query, base_url, path)
+        if rest[0] == 'items':
+            return self._list_items(method, lst, rest[1:], query, payload, base_url, path)
+        raise StandInError(404, 'itemNotFound', f"No route for {path}")
+
+    def _item_json(self, item: Dict[str, Any], query: Dict[str, str]) -> Dict[str, Any]:
+        data = _select({'id': item['id'], 'createdDateTime': item['createdDateTime'],
+                        'lastModifiedDateTime': item['lastModifiedDateTime'],
+                        'eTag': f'"{item["id"]},{item["version"]}"'}, query.get('$select'))
+        expand = query.get('$expand', '')
+        if expand.startswith('fields'):
+            match = re.search(r'\$select=([^)]*)', expand)
+            fields = dict(item['fields'], id=item['id'])
+            if match:
+                wanted = {name.strip() for name in match.group(1).split(',')}
+                fields = {key: value for key, value in fields.items() if key in wanted}
+            data['fields'] = fields
+        return data
+
+    def _list_items(self, method, lst, rest, query, payload, base_url, path):
+        columns = {column['name'] for column in lst['columns']}
+
+        def checked_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+            unknown = [name for name in fields if name not in columns]
+            if unknown:
+                raise StandInError(400, 'invalidRequest', f"Field(s) not recognized: {', '.join(unknown)}")
+            return dict(fields)
+
+        def touch(item: Dict[str, Any]):
+            lst['seq'] += 1
+            item['seq'] = lst['seq']
+
+        if not rest:
+            if method == 'GET':
+                values = [self._item_json(item, query) for item in lst['items'].values()
+                          if _matches({'fields': item['fields'], 'id': item['id']}, query.get('$filter'))]
+                return self._page(values, query, base_url, path)
+            if method == 'POST':
+                item_id = str(lst['next_item'])
+                lst['next_item'] += 1
+                item = {'id': item_id, 'fields': checked_fields((payload or {}).get('fields', {})),
+                        'createdDateTime': _now(), 'lastModifiedDateTime': _now(), 'version': 1}
+                touch(item)
+                lst['items'][item_id] = item
+                return 201, {}, self._item_json(item, {'$expand': 'fields'})
+            raise StandInError(405, 'methodNotAllowed', method)
+        if rest == ['delta'] and method == 'GET':
+            return self._list_delta(lst, query, base_url, path)
+
+        item = lst['items'].get(rest[0])
+        if item is None:
+            raise StandInError(404, 'itemNotFound', 'Item not found')
+        if method == 'DELETE':
+            del lst['items'][rest[0]]
+            lst['seq'] += 1
+            lst['tombstones'][item['id']] = {'id': item['id'], 'seq': lst['seq']}
+            return 204, {}, None
+        if method == 'PATCH':
+            updates = payload or {}
+            if rest[1:] == ['fields']:
+                item['fields'].update(checked_fields(updates))
+            else:
+                item['fields'].update(checked_fields(updates.get('fields', {})))
+            item['version'] += 1
+            item['lastModifiedDateTime'] = _now()
+            touch(item)
+            return 200, {}, (dict(item['fields']) if rest[1:] == ['fields'] else
+                             self._item_json(item, {'$expand': 'fields'}))
+        return 200, {}, self._item_json(item, query)
+
+    # -- drives and items ------------------------------------------------
+
+    @staticmethod
+    def _split_drive_path(rest: str) -> Tuple[str, str]:
+        """Split 'root:/a/b:/children' or 'items/{id}/content' into (reference, action)"""
+        if rest.startswith('root:'):
+            address = rest[len('root:'):]
+            if ':/' in address:
+                item_path, _, action = address.rpartition(':/')
+                return f"root:{unquote(item_path)}", action
+            return f"root:{unquote(address.rstrip(':'))}", ''
+        parts = rest.split('/')
+        if parts[0] == 'root':
+            return 'root', '/'.join(parts[1:])
+        if parts[0] == 'items' and len(parts) >= 2:
+            return f"items:{parts[1]}", '/'.join(parts[2:])
+        return rest, ''
+
+    def _find(self, drive: Drive, reference: str) -> Optional[Dict[str, Any]]:
+        if reference == 'root':
+            return drive.items[drive.root_id]
+        if reference.startswith('root:'):
+            return drive.resolve(reference[len('root:'):])
+        if reference.startswith('items:'):
+            item_id = reference[len('items:'):]
+            return drive.items.get(drive.root_id if item_id == 'root' else item_id)
+        return None
+
+    def _drive(self, method, drive, rest, query, headers, body, payload, base_url, path):
+        if not rest:
+            return 200, {}, _select({'id': drive.id, 'name': drive.name, 'driveType': 'documentLibrary'},
+                                    query.get('$select'))
+
+        if rest == 'list/items' and method == 'GET':
+            return self._drive_list_items(drive, query, base_url, path)
+
+        reference, action = self._split_drive_path(rest)
+        item = self._find(drive, reference)
+
+        if action == 'content' and method == 'PUT':
+            if len(body) > SIMPLE_UPLOAD_LIMIT:
+                raise StandInError(413, 'requestEntityTooLarge', 'Use an upload session above 4 MB')
+            if item is None:
+                if not reference.startswith('root:'):
+                    raise StandInError(404, 'itemNotFound', 'Item not found')
+                parent_path, _, name = reference[len('root:'):].strip('/').rpartition('/')
+                parent = drive.ensure_folder(parent_path)
+                item, created = drive.create(parent, name, folder=False, conflict='replace', content=body,
+                                             mime_type=headers.get('content-type'))
+            else:
+                item, created = drive.create(drive.items[item['parent']], item['name'], folder=False,
+                                             conflict='replace', content=body,
+                                             mime_type=headers.get('content-type'))
+            return (201 if created else 200), {}, drive.to_json(item)
+
+        if action == 'createUploadSession' and method == 'POST':
+            if not reference.startswith('root:') and item is None:
+                raise StandInError(404, 'itemNotFound', 'Item not found')
+            item_path = reference[len('root:'):].strip('/') if reference.startswith('root:') else drive.path_of(item)
+            conflict = ((payload or {}).get('item') or {}).get('@microsoft.graph.conflictBehavior', 'replace')
+            session_id = uuid.uuid4().hex
+            expires = (datetime.now(timezone.utc) + timedelta(days=2)).strftime('%Y-%m-%dT%H:%M:%SZ')
+            self.state.sessions[session_id] = {'drive': drive.id, 'path': item_path, 'conflict': conflict,
+                                               'received': bytearray(), 'size': None, 'expires': expires}
+            return 200, {}, {'uploadUrl': f"{base_url}/_upload/{session_id}",
+                             'expirationDateTime': expires, 'nextExpectedRanges': ['0-']}
+
+        if action == 'delta' and method == 'GET':
+            if item is None or item['id'] != drive.root_id:
+                raise StandInError(400, 'invalidRequest', 'Delta is only supported on the drive root')
+            return self._delta(drive, query, base_url, path)
+
+        if item is None:
+            raise StandInError(404, 'itemNotFound', 'The resource could not be found.')
+
+        if action == 'children':
+            if not item['folder']:
+                raise StandInError(400, 'invalidRequest', 'Item is not a folder')
+            if method == 'POST':
+                payload = payload or {}
+                conflict = payload.get('@microsoft.graph.conflictBehavior', 'fail')
+                child, created = drive.create(item, payload.get('name', ''), folder='folder' in payload,
+                                              conflict=conflict, content=b'' if 'folder' not in payload else None)
+                return (201 if created else 200), {}, drive.to_json(child)
+            values = [_select(drive.to_json(child), query.get('$select')) for child in drive.children(item['id'])]
+            values = [value for value in values if _matches(value, query.get('$filter'))]
+            return self._page(values, query, base_url, path)
+
+        if action == 'copy' and method == 'POST':
+            return self._copy(drive, item, payload or {}, query, base_url)
+
+        if action == 'content' and method == 'GET':
+            if item['folder']:
+                raise StandInError(400, 'invalidRequest', 'Folders have no content')
+            # Like Graph, redirect to a short-lived pre-authenticated download URL
+            return 302, {'Location': f"{base_url}/_download/{drive.id}/{item['id']}"}, None
+
+        if action == '':
+            if method == 'GET':
+                data = drive.to_json(item)
+                if headers.get('if-none-match') == data['eTag']:
+                    return 304, {}, None
+                selected = _select(data, query.get('$select'))
+                expand = EXPAND_CHILDREN.match(query.get('$expand', ''))
+                if expand and item['folder']:
+                    selected['children'] = [_select(drive.to_json(child), expand.group(1))
+                                            for child in drive.children(item['id'])[:EXPAND_LIMIT]]
+                return 200, {'ETag': data['eTag']}, selected
+            if method == 'DELETE':
+                if item['id'] == drive.root_id:
+                    raise StandInError(403, 'accessDenied', 'Cannot delete the root')
+                drive.delete(item)
+                return 204, {}, None
+            if method == 'PATCH':
+                updates = payload or {}
+                parent_id = (updates.get('parentReference') or {}).get('id', item['parent'])
+                name = updates.get('name', item['name'])
+                if parent_id not in drive.items:
+                    raise StandInError(404, 'itemNotFound', 'Destination folder not found')
+                clash = drive.child(parent_id, name)
+                if clash is not None and clash['id'] != item['id']:
+                    raise StandInError(409, 'nameAlreadyExists', f"An item named '{name}' already exists")
+                item['name'], item['parent'] = name, parent_id
+                drive._touch(item)
+                return 200, {}, drive.to_json(item)
+
+        raise StandInError(404, 'itemNotFound', f"No route for {path}")
+
+    def _copy(self, drive: Drive, item: Dict[str, Any], payload: Dict[str, Any],
+              query: Dict[str, str], base_url: str):
+        """Server-side copy: 202 with a monitor URL that reports progress"""
+        reference = payload.get('parentReference') or {}
+        target_drive = self.state.drives.get(reference.get('driveId', drive.id))
+        if target_drive is None or reference.get('id', target_drive.root_id) not in target_drive.items:
+            raise StandInError(400, 'invalidRequest', 'Destination not found')
+        parent = target_drive.items[reference.get('id', target_drive.root_id)]
+        name = payload.get('name', item['name'])
+        conflict = query.get('@microsoft.graph.conflictBehavior', 'fail')
+
+        # The copy happens at once; the monitor reports it after COPY_POLLS polls
+        monitor = {'polls': COPY_POLLS}
+        try:
+            monitor['resourceId'] = self._copy_tree(drive, item, target_drive, parent, name, conflict)['id']
+        except StandInError as e:
+            monitor['error'] = {'code': e.code, 'message': str(e)}
+        monitor_id = uuid.uuid4().hex
+        self.state.monitors[monitor_id] = monitor
+        return 202, {'Location': f"{base_url}/_monitor/{monitor_id}"}, None
+
+    def _copy_tree(self, drive: Drive, item: Dict[str, Any], target_drive: Drive,
+                   parent: Dict[str, Any], name: str, conflict: str) -> Dict[str, Any]:
+        copied, _ = target_drive.create(parent, name, folder=item['folder'], conflict=conflict,
+                                        content=item['content'], mime_type=item['mimeType'])
+        if item['folder']:
+            for child in drive.children(item['id']):
+                self._copy_tree(drive, child, target_drive, copied, child['name'], conflict)
+        return copied
+
+    def _monitor(self, monitor_id: str):
+        with self.state.lock:
+            monitor = self.state.monitors.get(monitor_id)
+            if monitor is None:
+                return _error(404, 'itemNotFound', 'Monitor not found')
+            if monitor['polls'] > 0:
+                monitor['polls'] -= 1
+                done = 100.0 * (COPY_POLLS - monitor['polls']) / (COPY_POLLS + 1)
+                return 202, {}, {'operation': 'itemCopy', 'status': 'inProgress', 'percentageComplete': done}
+            if 'error' in monitor:
+                return 200, {}, {'operation': 'itemCopy', 'status': 'failed', 'error': monitor['error']}
+            return 200, {}, {'operation': 'itemCopy', 'status': 'completed', 'percentageComplete': 100.0,
+                             'resourceId': monitor['resourceId']}
+
+    def _download(self, drive_id: str, item_id: str):
+        with self.state.lock:
+            drive = self.state.drives.get(drive_id)
+            item = drive.items.get(item_id) if drive else None
+            if item is None or item['folder']:
+                return _error(404, 'itemNotFound', 'Item not found')
+            return 200, {'Content-Type': item['mimeType'] or 'application/octet-stream'}, bytes(item['content'])
+
+    def _drive_list_items(self, drive: Drive, query: Dict[str, str], base_url: str, path: str):
+        """The library's list items, newest first when ordered by modification time"""
+        items = [item for item in drive.items.values() if item['parent'] is not None]
+        if 'desc' in query.get('$orderby', ''):
+            items.sort(key=lambda item: item['seq'], reverse=True)
+        values = [{'id': str(index + 1), 'lastModifiedDateTime': item['lastModifiedDateTime'],
+                   'driveItem': drive.to_json(item)} for index, item in enumerate(items)]
+        return self._page(values, query, base_url, path)
+
+    def _delta(self, drive: Drive, query: Dict[str, str], base_url: str, path: str):
+        token = query.get('token', '0')
+        # Token 0 is an initial sync, which is always allowed
+        if not token.isdigit() or 0 < int(token) < drive.min_token:
+            raise StandInError(410, 'resyncRequired', 'The delta token is no longer valid')
+        since = int(token)
+
+        if since == 0:
+            # Initial sync: every live item, parents before children
+            changes = sorted(drive.items.values(), key=lambda item: (drive.path_of(item).count('/'),
+                                                                      item['parent'] is not None, item['seq']))
+            entries = [drive.to_json(item) for item in changes]
+        else:
+            changes = [item for item in drive.items.values() if item['seq'] > since]
+            deleted = [tomb for tomb in drive.tombstones.values() if tomb['seq'] > since]
+            merged = sorted(changes + deleted, key=lambda entry: entry['seq'])
+            entries = [drive.to_json(entry) if 'name' in entry else
+                       {'id': entry['id'], 'deleted': {'state': 'deleted'},
+                        'parentReference': {'driveId': drive.id, 'id': entry['parent']}}
+                       for entry in merged]
+        entries = [_select(entry, query.get('$select')) for entry in entries]
+
+        size = int(query.get('$top', DEFAULT_PAGE_SIZE))
+        offset = int(query.get('$skiptoken', 0))
+        page = {'value': entries[offset:offset + size]}
+        if offset + size < len(entries):
+            params = dict(query, token=str(since), **{'$skiptoken': str(offset + size)})
+            page['@odata.nextLink'] = f"{base_url}/v1.0{path}?{urlencode(params)}"
+        else:
+            params = {key: value for key, value in query.items() if key != '$skiptoken'}
+            params['token'] = str(drive.seq)
+            page['@odata.deltaLink'] = f"{base_url}/v1.0{path}?{urlencode(params)}"
+        return 200, {}, page
+
+    def _list_delta(self, lst: Dict[str, Any], query: Dict[str, str], base_url: str, path: str):
+        """List item delta: the same token scheme as drive delta, over the list's change sequence"""
+        token = query.get('token', '0')
+        if not token.isdigit():
+            raise StandInError(410, 'resyncRequired', 'The delta token is no longer valid')
+        since = int(token)
+        changes = [item for item in lst['items'].values() if item['seq'] > since]
+        deleted = [tomb for tomb in lst['tombstones'].values() if tomb['seq'] > since] if since else []
+        entries = sorted(changes + deleted, key=lambda entry: entry['seq'])
+
+        size = int(query.get('$top', DEFAULT_PAGE_SIZE))
+        offset = int(query.get('$skiptoken', 0))
+        page = {'value': [self._item_json(entry, query) if 'fields' in entry else
+                          {'id': entry['id'], 'deleted': {'state': 'deleted'}}
+                          for entry in entries[offset:offset + size]]}
+        if offset + size < len(entries):
+            params = dict(query, token=str(since), **{'$skiptoken': str(offset + size)})
+            page['@odata.nextLink'] = f"{base_url}/v1.0{path}?{urlencode(params)}"
+        else:
+            params = {key: value for key, value in query.items() if key != '$skiptoken'}
+            params['token'] = str(lst['seq'])
+            page['@odata.deltaLink'] = f"{base_url}/v1.0{path}?{urlencode(params)}"
+        return 200, {}, page
+
+    def _page(self, values: List[Dict[str, Any]], query: Dict[str, str], base_url: str, path: str):
+        """Serve one page of a collection, with an @odata.nextLink for the rest"""
+        size = int(query.get('$top', DEFAULT_PAGE_SIZE))
+        offset = int(query.get('$skiptoken', 0))
+        page = {'value': values[offset:offset + size]}
+        if offset + size < len(values):
+            params = dict(query, **{'$skiptoken': str(offset + size)})
+            page['@odata.nextLink'] = f"{base_url}/v1.0{path}?{urlencode(params)}"
+        return 200, {}, page
+
+    # -- upload sessions -------------------------------------------------
+
+    def _upload_session(self, method: str, session_id: str, headers: Dict[str, str], body: bytes):
+        fault = self._fault(method, creates=False) if method == 'PUT' else None
+        if fault:
+            return fault
+
+        with self.state.lock:
+            session = self.state.sessions.get(session_id)
+            if session is None:
+                return _error(404, 'itemNotFound', 'Upload session not found')
+
+            received = session['received']
+            status = {'expirationDateTime': session['expires'], 'nextExpectedRanges': [f"{len(received)}-"]}
+            if method == 'GET':
+                return 200, {}, status
+            if method == 'DELETE':
+                del self.state.sessions[session_id]
+                return 204, {}, None
+            if method != 'PUT':
+                return _error(405, 'methodNotAllowed', method)
+
+            match = CONTENT_RANGE.match(headers.get('content-range', ''))
+            if not match:
+                return _error(400, 'invalidRange', 'Content-Range header is required')
+            start, end, total = map(int, match.groups())
+            if start != len(received) or end - start + 1 != len(body):
+                return 416, {}, dict(status, error={'code': 'invalidRange',
+                                                    'message': 'Fragment overlaps or skips expected range'})
+            received.extend(body)
+            session['size'] = total
+            if len(received) < total:
+                status['nextExpectedRanges'] = [f"{len(received)}-"]
+                return 202, {}, status
+
+            del self.state.sessions[session_id]
+            drive = self.state.drives[session['drive']]
+            parent_path, _, name = session['path'].rpartition('/')
+            try:
+                item, created = drive.create(drive.ensure_folder(parent_path), name, folder=False,
+                                             conflict=session['conflict'], content=bytes(received))
+            except StandInError as e:
+                return _error(e.status, e.code, str(e))
+            return (201 if created else 200), {}, drive.to_json(item)
+
+    # -- HTTP plumbing ---------------------------------------------------
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real service
+            # Responses go out in several writes; without this Nagle holds the last one for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                delay = standin.latency + (standin.random.uniform(0, standin.jitter) if standin.jitter else 0)
+                if delay:
+                    time.sleep(delay / 1000.0)
+
+                headers = {key.lower(): value for key, value in self.headers.items()}
+                base_url = f"http://{self.headers.get('Host') or '%s:%s' % self.server.server_address[:2]}"
+                try:
+                    status, response_headers, data = standin.dispatch(self.command, self.path, headers, body, base_url)
+                except Exception as e:  # keep serving; report as a Graph-style 500
+                    status, response_headers, data = _error(500, 'generalException', str(e))
+
+                if data is None:
+                    payload, content_type = b'', None
+                elif isinstance(data, bytes):
+                    payload, content_type = data, response_headers.pop('Content-Type', 'application/octet-stream')
+                else:
+                    payload, content_type = json.dumps(data).encode('utf-8'), 'application/json'
+
+                self.send_response(status)
+                for key, value in response_headers.items():
+                    self.send_header(key, value)
+                if content_type:
+                    self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _serve
+
+            def log_message(self, format, *args):
+                if standin.verbose:
+                    super().log_message(format, *args)
+
+        return Handler
+
+
+def main():
+    """Run the Graph stand-in until interrupted"""
+    parser = argparse.ArgumentParser(description="Local Microsoft Graph stand-in for offline and load testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="added latency per request in ms")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random extra latency up to this many ms")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="probability of a 429 per request")
+    parser.add_argument('--conflict-rate', type=float, default=0.0, help="probability of a 409 per create")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds on injected 429s")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="requests per second before 429 (0 = off)")
+    parser.add_argument('--seed', type=int, help="seed for fault injection, for repeatable runs")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    standin = GraphStandIn(args.host, args.port, args.latency, args.jitter, args.throttle_rate,
+                           args.conflict_rate, args.retry_after, args.rate_limit, args.seed, args.verbose)
+    print(f"🧪 Graph stand-in listening on {standin.url}")
+    print("   Point the scripts at it with:")
+    for key, value in standin.env().items():
+        print(f"   {key}={value}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+    finally:
+        standin.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
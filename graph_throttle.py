@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Throttling and retry primitives for Microsoft Graph calls
+A shared token bucket that honours Retry-After, an adaptive concurrency
+limit (halved when throttled, raised again on success) and jittered
+exponential backoff for transient failures
+"""
+
+import time
+import random
+import threading
+from typing import Dict, Optional
+
+# Statuses Graph uses for throttling and transient server trouble
+THROTTLE_STATUSES = (429, 503)
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+
+# Methods that are safe to repeat after the server may already have acted on them
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter with a global pause"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping as needed; returns the time spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.rate <= 0:
+                    return waited
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """Hold every caller back for `seconds` (used for Retry-After)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that backs off multiplicatively and recovers additively"""
+
+    def __init__(self, max_limit: int, min_limit: int = 1, recover_after: int = 10):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self.recover_after = recover_after
+        self.in_flight = 0
+        self.successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def throttled(self):
+        with self._cond:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self.successes = 0
+
+    def succeeded(self):
+        with self._cond:
+            self.successes += 1
+            if self.successes >= self.recover_after and self.limit < self.max_limit:
+                self.limit += 1
+                self.successes = 0
+                self._cond.notify_all()
+
+
+class RetryPolicy:
+    """Jittered exponential backoff ("full jitter")"""
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Parse a Retry-After header given in seconds (Graph never sends HTTP dates)"""
+    value = headers.get('Retry-After') if headers else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def should_retry(method: str, status: Optional[int]) -> bool:
+    """Whether a response with this status is worth sending again
+
+    Throttled requests (429/503) were not processed, so any method retries
+    them; after another 5xx a POST or PATCH may have taken effect, so only
+    idempotent methods retry those and the rest surface them to the caller.
+    """
+    if status in THROTTLE_STATUSES:
+        return True
+    return status in TRANSIENT_STATUSES and method.upper() in IDEMPOTENT_METHODS
+
+
+class ThrottleStats:
+    """Counters for requests, retries, throttling and failures"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {'requests': 0, 'retries': 0, 'throttled': 0, 'failed': 0}
+        self.throttle_wait = 0.0
+
+    def add(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def add_wait(self, seconds: float):
+        with self._lock:
+            self.throttle_wait += seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.counts, throttle_wait=round(self.throttle_wait, 3))
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        return (f"{snap['requests']} requests, {snap['retries']} retries, "
+                f"{snap['throttled']} throttled, {snap['failed']} failed, "
+                f"{snap['throttle_wait']}s waiting on throttling")
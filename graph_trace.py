@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Per-request tracing and metrics for Microsoft Graph traffic
+Observes every attempt on the shared transport and records method, URL
+template, status, latency, retries, throttle waits and payload sizes as
+JSON-lines logs, an OpenMetrics text file and a per-step timing summary
+"""
+
+import os
+import re
+import json
+import math
+import time
+import threading
+import contextlib
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, unquote
+from typing import Dict, List, Any, Optional, Tuple
+
+from graph_throttle import THROTTLE_STATUSES, retry_after_seconds
+from graph_transport import GRAPH_URL, LOGIN_URL, get_transport
+
+# Output locations from .env (unset: not written)
+TRACE_LOG = os.getenv('SHP_TRACE_LOG')
+METRICS_FILE = os.getenv('SHP_METRICS_FILE')
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Path segments whose following segment is an ID
+ID_SEGMENTS = {
+    'sites': '{site-id}',
+    'drives': '{drive-id}',
+    'items': '{item-id}',
+    'lists': '{list-id}',
+    'columns': '{column-id}'
+}
+SITE_BY_PATH = re.compile(r'^/sites/[^/]+:/.*?(?=:/|$)')
+ITEM_BY_PATH = re.compile(r'root:/.*?(?=:/|:$|$)')
+COPY_MONITOR = re.compile(r'/_?monitor/')
+
+
+def url_template(url: str) -> str:
+    """Reduce a request URL to its route, without IDs, paths or query
+
+    Upload session and copy monitor URLs are pre-authenticated, so they are
+    never logged.
+    """
+    parts = urlsplit(url)
+    graph = urlsplit(GRAPH_URL)
+    path = unquote(parts.path)
+
+    if parts.netloc == urlsplit(LOGIN_URL).netloc and path.endswith('/oauth2/v2.0/token'):
+        return '/{tenant}/oauth2/v2.0/token'
+    if parts.netloc != graph.netloc or not path.startswith(graph.path + '/'):
+        # Pre-authenticated URLs: copy monitors or upload sessions
+        return '{copy-monitor}' if COPY_MONITOR.search(path) else '{upload-session}'
+
+    path = path[len(graph.path):]
+    path = SITE_BY_PATH.sub('/sites/{hostname}:/{site-path}', path)
+    path = ITEM_BY_PATH.sub('root:/{path}', path)
+
+    segments = path.split('/')
+    for index in range(1, len(segments)):
+        placeholder = ID_SEGMENTS.get(segments[index - 1])
+        if placeholder and segments[index] and not segments[index].startswith('{') \
+                and segments[index] != 'root' and not segments[index].startswith('root:'):
+            segments[index] = placeholder
+    return '/'.join(segments)
+
+
+def _body_size(body: Any) -> int:
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    return 0
+
+
+def _error_code(response) -> Optional[str]:
+    """Graph error code from a failed response, if the body carries one"""
+    if 'json' not in response.headers.get('Content-Type', ''):
+        return None
+    try:
+        return (response.json().get('error') or {}).get('code')
+    except Exception:
+        return None
+
+
+def _label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class GraphTracer:
+    """Transport observer that logs each attempt and aggregates metrics
+
+    Attach it with `attach()`; wrap phases of a run in `step(name)` to get
+    per-step timings. Requests made outside any step count under 'other'.
+    """
+
+    def __init__(self, log_path: str = TRACE_LOG, metrics_path: str = METRICS_FILE):
+        self.log_path = log_path
+        self.metrics_path = metrics_path
+        self._lock = threading.Lock()
+        self._log = open(log_path, 'a', encoding='utf-8') if log_path else None
+        self._transport = None
+        self.current_step: Optional[str] = None
+
+        # (method, template, status) -> counters and latency histogram
+        self.requests: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self.retries: Dict[str, int] = {}
+        self.throttle_wait: Dict[str, float] = {}
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    def attach(self, transport=None) -> 'GraphTracer':
+        self._transport = transport or get_transport()
+        self._transport.add_observer(self)
+        return self
+
+    def close(self):
+        """Detach, write the metrics file and close the log"""
+        if self._transport is not None:
+            self._transport.remove_observer(self)
+            self._transport = None
+        if self.metrics_path:
+            self.write_metrics(self.metrics_path)
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    @contextlib.contextmanager
+    def step(self, name: str):
+        """Attribute requests made inside the block to a named step"""
+        previous = self.current_step
+        self.current_step = name
+        entry = self._step_entry(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                entry['wall'] += time.perf_counter() - started
+            self.current_step = previous
+
+    def _step_entry(self, name: str) -> Dict[str, Any]:
+        with self._lock:
+            return self.steps.setdefault(name, {'wall': 0.0, 'requests': 0, 'retries': 0, 'failed': 0,
+                                                'throttle_wait': 0.0, 'sent': 0, 'received': 0,
+                                                'latencies': []})
+
+    def __call__(self, method: str, url: str, response, elapsed: float,
+                 attempt: int = 0, waited: float = 0.0, error: Exception = None):
+        template = url_template(url)
+        request = getattr(response, 'request', None)
+        sent = _body_size(request.body if hasattr(request, 'body') else getattr(request, 'content', None))
+        status = str(response.status_code) if response is not None else 'error'
+        received = int(response.headers.get('Content-Length') or 0) if response is not None else 0
+
+        retry_after = None
+        error_code = type(error).__name__ if error is not None else None
+        batch_statuses = None
+        if response is not None:
+            if response.status_code in THROTTLE_STATUSES:
+                retry_after = retry_after_seconds(response.headers)
+            if response.status_code >= 400:
+                error_code = _error_code(response)
+            elif template == '/$batch':
+                batch_statuses = {}
+                try:
+                    for item in response.json().get('responses', []):
+                        key = str(item.get('status'))
+                        batch_statuses[key] = batch_statuses.get(key, 0) + 1
+                except Exception:
+                    batch_statuses = None
+
+        step_name = self.current_step or 'other'
+        step = self._step_entry(step_name)
+        failed = response is None or response.status_code >= 400
+        with self._lock:
+            key = (method, template, status)
+            counters = self.requests.setdefault(key, {'count': 0, 'seconds': 0.0, 'sent': 0, 'received': 0,
+                                                      'buckets': [0] * len(LATENCY_BUCKETS)})
+            counters['count'] += 1
+            counters['seconds'] += elapsed
+            counters['sent'] += sent
+            counters['received'] += received
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    counters['buckets'][index] += 1
+
+            wait = waited + (retry_after or 0.0)
+            if attempt:
+                self.retries[template] = self.retries.get(template, 0) + 1
+            if wait:
+                self.throttle_wait[template] = self.throttle_wait.get(template, 0.0) + wait
+
+            step['requests'] += 1
+            step['retries'] += 1 if attempt else 0
+            step['failed'] += 1 if failed else 0
+            step['throttle_wait'] += wait
+            step['sent'] += sent
+            step['received'] += received
+            step['latencies'].append(elapsed)
+
+            if self._log:
+                record = {
+                    'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                    'step': step_name,
+                    'method': method,
+                    'template': template,
+                    'status': response.status_code if response is not None else None,
+                    'latency_ms': round(elapsed * 1000, 2),
+                    'attempt': attempt,
+                    'rate_limit_wait_ms': round(waited * 1000, 2),
+                    'retry_after_s': retry_after,
+                    'bytes_sent': sent,
+                    'bytes_received': received
+                }
+                if error_code:
+                    record['error'] = error_code
+                if batch_statuses is not None:
+                    record['batch_statuses'] = batch_statuses
+                self._log.write(json.dumps(record) + '\n')
+                self._log.flush()
+
+    def write_metrics(self, path: str):
+        """Write aggregated metrics in OpenMetrics text format"""
+        lines = [
+            '# TYPE graph_requests counter',
+            '# HELP graph_requests Graph HTTP attempts by method, URL template and status.'
+        ]
+        with self._lock:
+            requests = sorted(self.requests.items())
+            retries = sorted(self.retries.items())
+            waits = sorted(self.throttle_wait.items())
+            steps = sorted(self.steps.items())
+
+        for (method, template, status), counters in requests:
+            labels = f'method="{_label(method)}",template="{_label(template)}",status="{_label(status)}"'
+            lines.append(f'graph_requests_total{{{labels}}} {counters["count"]}')
+
+        lines += ['# TYPE graph_request_duration_seconds histogram',
+                  '# UNIT graph_request_duration_seconds seconds',
+                  '# HELP graph_request_duration_seconds Graph HTTP attempt latency.']
+        for (method, template, status), counters in requests:
+            labels = f'method="{_label(method)}",template="{_label(template)}",status="{_label(status)}"'
+            for bound, count in zip(LATENCY_BUCKETS, counters['buckets']):
+                lines.append(f'graph_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'graph_request_duration_seconds_bucket{{{labels},le="+Inf"}} {counters["count"]}')
+            lines.append(f'graph_request_duration_seconds_count{{{labels}}} {counters["count"]}')
+            lines.append(f'graph_request_duration_seconds_sum{{{labels}}} {counters["seconds"]:.6f}')
+
+        lines += ['# TYPE graph_payload_bytes counter',
+                  '# UNIT graph_payload_bytes bytes',
+                  '# HELP graph_payload_bytes Request and response body bytes.']
+        for (method, template, status), counters in requests:
+            labels = f'method="{_label(method)}",template="{_label(template)}",status="{_label(status)}"'
+            lines.append(f'graph_payload_bytes_total{{{labels},direction="sent"}} {counters["sent"]}')
+            lines.append(f'graph_payload_bytes_total{{{labels},direction="received"}} {counters["received"]}')
+
+        lines += ['# TYPE graph_retries counter',
+                  '# HELP graph_retries Retried attempts by URL template.']
+        for template, count in retries:
+            lines.append(f'graph_retries_total{{template="{_label(template)}"}} {count}')
+
+        lines += ['# TYPE graph_throttle_wait_seconds counter',
+                  '# UNIT graph_throttle_wait_seconds seconds',
+                  '# HELP graph_throttle_wait_seconds Time spent in the rate limiter or honouring Retry-After.']
+        for template, seconds in waits:
+            lines.append(f'graph_throttle_wait_seconds_total{{template="{_label(template)}"}} {seconds:.6f}')
+
+        lines += ['# TYPE graph_step_duration_seconds gauge',
+                  '# UNIT graph_step_duration_seconds seconds',
+                  '# HELP graph_step_duration_seconds Wall time of each provisioning step.']
+        for name, entry in steps:
+            lines.append(f'graph_step_duration_seconds{{step="{_label(name)}"}} {entry["wall"]:.6f}')
+
+        lines.append('# EOF')
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        """Print wall time, requests and latency percentiles per step"""
+        with self._lock:
+            steps = [(name, dict(entry)) for name, entry in self.steps.items()]
+        if not steps:
+            return
+
+        print("\n⏱️  Step timings:")
+        print(f"   {'step':<14} {'wall s':>8} {'reqs':>6} {'retries':>8} {'failed':>7} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'throttled s':>12}")
+        for name, entry in steps:
+            latencies = entry['latencies']
+            print(f"   {name:<14} {entry['wall']:>8.2f} {entry['requests']:>6} {entry['retries']:>8} "
+                  f"{entry['failed']:>7} {percentile(latencies, 0.5) * 1000:>8.1f} "
+                  f"{percentile(latencies, 0.95) * 1000:>8.1f} {entry['throttle_wait']:>12.2f}")
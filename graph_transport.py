@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP transport for Azure AD and Microsoft Graph calls
+Keeps one keep-alive connection pool per host so every step of a run
+reuses the same TCP/TLS connections instead of handshaking per request
+"""
+
+import os
+import time
+import threading
+import contextlib
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from typing import Any, Callable
+
+from graph_throttle import (AdaptiveLimiter, RetryPolicy, ThrottleStats, TokenBucket,
+                            IDEMPOTENT_METHODS, THROTTLE_STATUSES, TRANSIENT_STATUSES,
+                            retry_after_seconds, should_retry)
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs h2 installed for HTTP/2)
+except ImportError:
+    httpx = None
+
+# Errors raised before the request reached the server are always safe to retry;
+# other network errors are only retried for idempotent methods
+CONNECT_ERRORS = (requests.ConnectionError,) + ((httpx.ConnectError, httpx.ConnectTimeout) if httpx else ())
+NETWORK_ERRORS = (requests.RequestException,) + ((httpx.TransportError,) if httpx else ())
+
+load_dotenv()
+
+# Endpoints from .env, so a run can target a local stand-in (graph_standin.py)
+GRAPH_URL = os.getenv('SHP_GRAPH_URL', "https://graph.microsoft.com/v1.0").rstrip('/')
+LOGIN_URL = os.getenv('SHP_LOGIN_URL', "https://login.microsoftonline.com").rstrip('/')
+
+# Transport configuration from .env
+POOL_SIZE = int(os.getenv('SHP_HTTP_POOL_SIZE', '10'))
+CONNECT_TIMEOUT = float(os.getenv('SHP_HTTP_CONNECT_TIMEOUT', '10'))
+READ_TIMEOUT = float(os.getenv('SHP_HTTP_READ_TIMEOUT', '60'))
+USE_HTTP2 = os.getenv('SHP_HTTP2', '').lower() in ('1', 'true', 'yes')
+
+# Throttling configuration from .env (SHP_RATE_LIMIT=0 disables the rate limit)
+RATE_LIMIT = float(os.getenv('SHP_RATE_LIMIT', '20'))
+MAX_CONCURRENCY = int(os.getenv('SHP_MAX_CONCURRENCY', str(POOL_SIZE)))
+MAX_RETRIES = int(os.getenv('SHP_MAX_RETRIES', '5'))
+
+
+class GraphTransport:
+    """Pooled HTTP client with optional HTTP/2 multiplexing
+
+    Every request goes through a shared token bucket and adaptive
+    concurrency limit, and throttled (429/503) or transient failures are
+    retried with Retry-After or jittered exponential backoff.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, http2: bool = USE_HTTP2,
+                 rate_limit: float = RATE_LIMIT, max_concurrency: int = MAX_CONCURRENCY,
+                 max_retries: int = MAX_RETRIES):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.http2 = http2 and httpx is not None
+        self.bucket = TokenBucket(rate_limit, burst=max(1, int(rate_limit)))
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.retry = RetryPolicy(max_retries)
+        self.stats = ThrottleStats()
+        self.observers = []
+
+        if self.http2:
+            self.client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+            )
+        else:
+            self.client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            self.client.mount('https://', adapter)
+            self.client.mount('http://', adapter)
+
+    def request(self, method: str, url: str, **kwargs: Any):
+        """Send a request, retrying throttled and transient failures
+
+        Only throttling (429/503) and connection failures are retried for
+        POST and PATCH; their other 5xx responses go back to the caller.
+        Returns the last response once retries are exhausted, so callers
+        still see the final 429/5xx status; network errors are re-raised.
+        """
+        method = method.upper()
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            self.stats.add_wait(waited)
+            self.limiter.acquire()
+            self.stats.add('requests')
+            started = time.perf_counter()
+            try:
+                response = self._send(method, url, **kwargs)
+            except NETWORK_ERRORS as e:
+                self._notify(method, url, None, time.perf_counter() - started,
+                             attempt=attempt, waited=waited, error=e)
+                retryable = isinstance(e, CONNECT_ERRORS) or method in IDEMPOTENT_METHODS
+                if not retryable or attempt >= self.retry.max_retries:
+                    self.stats.add('failed')
+                    raise
+                delay = self.retry.backoff(attempt)
+            else:
+                self._notify(method, url, response, time.perf_counter() - started,
+                             attempt=attempt, waited=waited)
+                if not should_retry(method, response.status_code):
+                    if response.status_code not in TRANSIENT_STATUSES:
+                        self.limiter.succeeded()
+                    return response
+
+                if response.status_code in THROTTLE_STATUSES:
+                    self.stats.add('throttled')
+                    self.limiter.throttled()
+
+                if attempt >= self.retry.max_retries:
+                    self.stats.add('failed')
+                    return response
+                response.close()  # release a streamed response's connection before retrying
+
+                delay = retry_after_seconds(response.headers)
+                if delay is None:
+                    delay = self.retry.backoff(attempt)
+                else:
+                    # Retry-After applies to the whole app, not just this request
+                    self.bucket.pause(delay)
+                    self.stats.add_wait(delay)
+            finally:
+                self.limiter.release()
+
+            attempt += 1
+            self.stats.add('retries')
+            time.sleep(delay)
+
+    def add_observer(self, callback: Callable[..., None]):
+        """Call callback(method, url, response, seconds, **details) after every attempt
+
+        `details` carries `attempt` (0 for the first try), `waited` (seconds
+        spent in the rate limiter) and, when no response arrived, `error`
+        with `response` set to None.
+        """
+        self.observers.append(callback)
+
+    def remove_observer(self, callback: Callable[..., None]):
+        self.observers.remove(callback)
+
+    def _notify(self, method: str, url: str, response, elapsed: float, **details: Any):
+        for callback in list(self.observers):
+            try:
+                callback(method, url, response, elapsed, **details)
+            except Exception as e:
+                print(f"⚠️  Transport observer failed: {e}")
+
+    def _send(self, method: str, url: str, **kwargs: Any):
+        """Send a single request over the shared pool"""
+        if self.http2:
+            # httpx takes raw bodies as `content` rather than `data`, timeouts as
+            # httpx.Timeout, and neither follows redirects nor streams by default
+            if isinstance(kwargs.get('data'), (bytes, str)):
+                kwargs['content'] = kwargs.pop('data')
+            timeout = kwargs.pop('timeout', None)
+            if isinstance(timeout, tuple):
+                timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+            if timeout is not None:
+                kwargs['timeout'] = timeout
+            stream = kwargs.pop('stream', False)
+            request = self.client.build_request(method, url, **kwargs)
+            return self.client.send(request, stream=stream, follow_redirects=True)
+        kwargs.setdefault('timeout', self.timeout)
+        return self.client.request(method, url, **kwargs)
+
+    def download(self, url: str, path, **kwargs: Any) -> int:
+        """Stream a GET response body into a file, returning the HTTP status
+
+        The body is written to a .part file and moved into place only once
+        complete, so an interrupted download never leaves a truncated file.
+        Goes through the same rate limit and retries as every other request;
+        content URLs redirect to the file's download URL, which is followed.
+        """
+        tmp_path = f"{path}.part"
+        response = self.request('GET', url, stream=True, **kwargs)
+        try:
+            if response.status_code != 200:
+                return response.status_code
+            blocks = response.iter_bytes(1024 * 1024) if self.http2 else response.iter_content(1024 * 1024)
+            with open(tmp_path, 'wb') as f:
+                for block in blocks:
+                    f.write(block)
+        finally:
+            response.close()
+        os.replace(tmp_path, path)
+        return 200
+
+    def get(self, url: str, **kwargs: Any):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs: Any):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url: str, **kwargs: Any):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        self.client.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+_thread_transport = threading.local()
+
+
+def get_transport() -> GraphTransport:
+    """Return the process-wide shared transport, creating it on first use
+
+    Inside `use_transport()` the calling thread gets that transport instead.
+    """
+    override = getattr(_thread_transport, 'transport', None)
+    if override is not None:
+        return override
+
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = GraphTransport()
+        return _transport
+
+
+@contextlib.contextmanager
+def use_transport(transport: GraphTransport):
+    """Route get_transport() on this thread to another transport
+
+    Used by the multi-site fan-out so each tenant gets its own pool, rate
+    limit and concurrency limit. Objects capture the transport when they
+    are created, so create them inside the block.
+    """
+    previous = getattr(_thread_transport, 'transport', None)
+    _thread_transport.transport = transport
+    try:
+        yield transport
+    finally:
+        _thread_transport.transport = previous
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Upload documents to the ISMS document library
+Small files go up with a single PUT; anything above the threshold uses a
+Graph upload session, streamed from disk in 320 KiB aligned chunks and
+resumed from the last acknowledged byte range after a dropped connection
+"""
+
+import io
+import os
+import sys
+import hashlib
+import argparse
+import mimetypes
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from graph_cache import CACHE_DIR, load_json, save_json
+from graph_manifest import UploadManifest, quickxor_bytes, quickxor_file
+from graph_transport import GRAPH_URL, NETWORK_ERRORS, get_transport
+
+# Graph rejects simple PUT uploads above 4 MB
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+UPLOAD_THRESHOLD = min(int(os.getenv('SHP_UPLOAD_THRESHOLD', str(SIMPLE_UPLOAD_LIMIT))), SIMPLE_UPLOAD_LIMIT)
+
+# Upload session chunks must be multiples of 320 KiB
+CHUNK_ALIGNMENT = 320 * 1024
+CHUNK_SIZE = max(1, int(os.getenv('SHP_UPLOAD_CHUNK_SIZE', str(10 * CHUNK_ALIGNMENT))) // CHUNK_ALIGNMENT) * CHUNK_ALIGNMENT
+
+UPLOAD_WORKERS = int(os.getenv('SHP_UPLOAD_WORKERS', '4'))
+SESSION_CACHE = CACHE_DIR / 'upload_sessions.json'
+
+# Give up on a session after this many consecutive failed resume attempts
+MAX_RESUMES = 5
+
+
+class UploadError(Exception):
+    """Raised when a document cannot be uploaded"""
+
+
+class GraphUploader:
+    """Upload files and in-memory documents into one drive"""
+
+    _sessions_lock = threading.Lock()
+
+    def __init__(self, drive_id: str, tokens, chunk_size: int = CHUNK_SIZE,
+                 threshold: int = UPLOAD_THRESHOLD, session_cache: Path = SESSION_CACHE,
+                 manifest: Optional[UploadManifest] = None):
+        self.drive_id = drive_id
+        self.tokens = tokens
+        self.manifest = manifest
+        self.chunk_size = chunk_size
+        self.threshold = threshold
+        self.session_cache = session_cache
+        self.http = get_transport()
+
+    def upload_file(self, local_path, remote_path: str, content_type: str = None) -> Dict[str, Any]:
+        """Upload a file from disk without loading it into memory
+
+        With a manifest, returns {'skipped': True, ...} instead of uploading
+        when the remote document already has the same content hash.
+        """
+        local_path = Path(local_path)
+        stat = local_path.stat()
+        content_type = content_type or mimetypes.guess_type(local_path.name)[0] or 'application/octet-stream'
+
+        content_hash = quickxor_file(local_path) if self.manifest else None
+        if content_hash and self.manifest.is_unchanged(self.drive_id, remote_path, content_hash, self.tokens):
+            return dict(self.manifest.get(self.drive_id, remote_path), skipped=True)
+
+        if stat.st_size <= self.threshold:
+            item = self.put_content(remote_path, local_path.read_bytes(), content_type)
+        else:
+            key = f"{self.drive_id}:{remote_path}:{stat.st_size}:{stat.st_mtime_ns}"
+            with open(local_path, 'rb') as f:
+                item = self._upload_session(f, stat.st_size, remote_path, key)
+
+        if content_hash:
+            self.manifest.record(self.drive_id, remote_path, content_hash, item)
+        return item
+
+    def upload_bytes(self, data: bytes, remote_path: str, content_type: str = 'application/octet-stream') -> Dict[str, Any]:
+        """Upload an in-memory document, switching to a session when it is large"""
+        content_hash = quickxor_bytes(data) if self.manifest else None
+        if content_hash and self.manifest.is_unchanged(self.drive_id, remote_path, content_hash, self.tokens):
+            return dict(self.manifest.get(self.drive_id, remote_path), skipped=True)
+
+        if len(data) <= self.threshold:
+            item = self.put_content(remote_path, data, content_type)
+        else:
+            key = f"{self.drive_id}:{remote_path}:{len(data)}:{hashlib.sha1(data).hexdigest()}"
+            item = self._upload_session(io.BytesIO(data), len(data), remote_path, key)
+
+        if content_hash:
+            self.manifest.record(self.drive_id, remote_path, content_hash, item)
+        return item
+
+    def upload_many(self, uploads: List[Tuple[Path, str]], workers: int = UPLOAD_WORKERS,
+                    progress: Callable[[str, Any], None] = None) -> Dict[str, Any]:
+        """Upload several files in parallel, returning item or exception per remote path
+
+        Graph requires the chunks of one session to arrive in order, so the
+        parallelism is across files rather than within a file. `progress` is
+        called on the calling thread with (remote_path, result) as each file
+        finishes.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(self.upload_file, local_path, remote_path): remote_path
+                       for local_path, remote_path in uploads}
+            for future in as_completed(futures):
+                remote_path = futures[future]
+                try:
+                    results[remote_path] = future.result()
+                except Exception as e:
+                    results[remote_path] = e
+                if progress:
+                    progress(remote_path, results[remote_path])
+        return {remote_path: results[remote_path] for remote_path in futures.values()}
+
+    def put_content(self, remote_path: str, data: bytes, content_type: str) -> Dict[str, Any]:
+        """Upload a small document with a single PUT"""
+        url = f"{GRAPH_URL}/drives/{self.drive_id}/root:/{quote(remote_path)}:/content"
+        headers = dict(self.tokens.auth_headers(), **{'Content-Type': content_type})
+        response = self.http.put(url, headers=headers, data=data)
+        if response.status_code not in (200, 201):
+            raise UploadError(f"{remote_path}: HTTP {response.status_code} {response.text[:200]}")
+        return response.json()
+
+    def _upload_session(self, f, size: int, remote_path: str, key: str) -> Dict[str, Any]:
+        """Stream a file-like object through an upload session"""
+        upload_url = self._cached_session(key)
+        offset = self._next_offset(upload_url) if upload_url else None
+        if offset is None:
+            upload_url = self._create_session(remote_path)
+            self._remember_session(key, upload_url)
+            offset = 0
+
+        resumes = 0
+        while True:
+            f.seek(offset)
+            chunk = f.read(min(self.chunk_size, size - offset))
+            end = offset + len(chunk) - 1
+            headers = {
+                'Content-Length': str(len(chunk)),
+                'Content-Range': f"bytes {offset}-{end}/{size}"
+            }
+
+            try:
+                # The upload URL is pre-authenticated: no Authorization header
+                response = self.http.put(upload_url, headers=headers, data=chunk)
+            except NETWORK_ERRORS:
+                response = None
+
+            if response is not None and response.status_code in (200, 201):
+                self._forget_session(key)
+                return response.json()
+
+            if response is not None and response.status_code == 202:
+                offset = self._parse_next_offset(response.json(), default=end + 1)
+                resumes = 0
+                continue
+
+            if response is not None and response.status_code == 404:
+                # Session expired or was cancelled: start again from scratch
+                self._forget_session(key)
+                raise UploadError(f"{remote_path}: upload session expired")
+
+            # Dropped connection or rejected range: ask the session where to resume
+            resumes += 1
+            next_offset = self._next_offset(upload_url)
+            if resumes > MAX_RESUMES or next_offset is None:
+                status = response.status_code if response is not None else 'connection error'
+                raise UploadError(f"{remote_path}: chunk at byte {offset} failed ({status})")
+            offset = next_offset
+
+    def _create_session(self, remote_path: str) -> str:
+        url = f"{GRAPH_URL}/drives/{self.drive_id}/root:/{quote(remote_path)}:/createUploadSession"
+        body = {"item": {"@microsoft.graph.conflictBehavior": "replace"}}
+        headers = dict(self.tokens.auth_headers(), **{'Content-Type': 'application/json'})
+        response = self.http.post(url, headers=headers, json=body)
+        if response.status_code != 200:
+            raise UploadError(f"{remote_path}: could not create upload session (HTTP {response.status_code})")
+        return response.json()['uploadUrl']
+
+    def _next_offset(self, upload_url: str) -> Optional[int]:
+        """Return the first byte the session still expects, or None if it is gone"""
+        try:
+            response = self.http.get(upload_url)
+        except NETWORK_ERRORS:
+            return None
+        if response.status_code != 200:
+            return None
+        return self._parse_next_offset(response.json(), default=None)
+
+    @staticmethod
+    def _parse_next_offset(status: Dict[str, Any], default: Optional[int]) -> Optional[int]:
+        ranges = status.get('nextExpectedRanges') or []
+        if not ranges:
+            return default
+        return int(ranges[0].split('-')[0])
+
+    def _cached_session(self, key: str) -> Optional[str]:
+        entry = load_json(self.session_cache, {}).get(key)
+        if not entry:
+            return None
+        expires = datetime.fromisoformat(entry['expires'])
+        if expires <= datetime.now(timezone.utc):
+            self._forget_session(key)
+            return None
+        return entry['uploadUrl']
+
+    def _remember_session(self, key: str, upload_url: str):
+        # Graph sessions last a few days; re-check well inside that window
+        expires = datetime.now(timezone.utc) + timedelta(hours=24)
+        self._update_sessions(key, {'uploadUrl': upload_url, 'expires': expires.isoformat()})
+
+    def _forget_session(self, key: str):
+        self._update_sessions(key, None)
+
+    def _update_sessions(self, key: str, entry: Optional[Dict[str, str]]):
+        with self._sessions_lock:
+            sessions = load_json(self.session_cache, {})
+            if entry:
+                sessions[key] = entry
+            else:
+                sessions.pop(key, None)
+            try:
+                save_json(self.session_cache, sessions)
+            except OSError as e:
+                print(f"⚠️  Could not write upload session cache: {e}")
+
+
+def main():
+    """Upload local files into the document library"""
+    from graph_auth import get_token_provider
+    from graph_resolver import GraphResolver
+
+    parser = argparse.ArgumentParser(description="Upload documents to the ISMS document library")
+    parser.add_argument('files', nargs='+', help="local files to upload")
+    parser.add_argument('--dest', default='', help="destination folder in the library (e.g. 01_Policies/Core_Policies)")
+    parser.add_argument('--workers', type=int, default=UPLOAD_WORKERS, help="files uploaded in parallel")
+    parser.add_argument('--force', action='store_true', help="upload even when the content is unchanged")
+    args = parser.parse_args()
+
+    tenant_id = os.getenv('SHP_TENANT_ID')
+    client_id = os.getenv('SHP_ID_APP')
+    client_secret = os.getenv('SHP_ID_APP_SECRET')
+    site_url = os.getenv('SHP_SITE_URL')
+    if not all([tenant_id, client_id, client_secret, site_url]):
+        print("❌ Missing SharePoint configuration in .env file")
+        sys.exit(1)
+
+    tokens = get_token_provider(tenant_id, client_id, client_secret)
+    manifest = None if args.force else UploadManifest()
+    uploader = GraphUploader(GraphResolver(site_url, tokens).drive_id, tokens, manifest=manifest)
+
+    dest = args.dest.strip('/')
+    uploads = [(Path(path), f"{dest}/{Path(path).name}" if dest else Path(path).name) for path in args.files]
+
+    print(f"📤 Uploading {len(uploads)} file(s)...")
+    results = uploader.upload_many(uploads, args.workers)
+
+    failed = 0
+    for remote_path, result in results.items():
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"  ❌ {remote_path}: {result}")
+        elif result.get('skipped'):
+            print(f"  ⏭️  {remote_path} (unchanged)")
+        else:
+            print(f"  ✅ {remote_path} ({result.get('size', 0)} bytes)")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Bulk import of staff training results into the Training Records list
+Streams a CSV or JSONL file row by row, validates each row against the
+list columns and creates items through Graph $batch
+"""
+
+import os
+import sys
+import csv
+import json
+import math
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterator, Tuple
+
+from graph_auth import get_token_provider
+from graph_batch import BATCH_LIMIT, send_batch
+from graph_resolver import GraphResolver
+from graph_throttle import THROTTLE_STATUSES
+from isms_schema import TRAINING_RECORDS_LIST
+
+load_dotenv()
+
+# Configuration from .env
+TENANT_ID = os.getenv('SHP_TENANT_ID')
+CLIENT_ID = os.getenv('SHP_ID_APP')
+CLIENT_SECRET = os.getenv('SHP_ID_APP_SECRET')
+SITE_URL = os.getenv('SHP_SITE_URL')
+
+IMPORT_CONCURRENCY = int(os.getenv('SHP_IMPORT_CONCURRENCY', '4'))
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d %B %Y', '%d %b %Y']
+
+
+class RowError(ValueError):
+    """Raised when an input row cannot be mapped to a list item"""
+
+
+class RecordMapper:
+    """Map input rows to list item fields using the list's column definitions"""
+
+    def __init__(self, list_definition: Dict[str, Any] = TRAINING_RECORDS_LIST):
+        self.columns = {column['name']: column for column in list_definition['columns']}
+        # Accept internal names and display names, case-insensitively
+        self.aliases = {'title': 'Title'}
+        for column in list_definition['columns']:
+            self.aliases[column['name'].lower()] = column['name']
+            self.aliases[column['displayName'].lower()] = column['name']
+
+    def map_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the Graph `fields` for a row, raising RowError when invalid"""
+        if not isinstance(row, dict):
+            raise RowError(f"expected an object, got {type(row).__name__}")
+        fields = {}
+        for key, value in row.items():
+            name = self.aliases.get(str(key).strip().lower())
+            if name is None or value is None or str(value).strip() == '':
+                continue
+            fields[name] = str(value).strip() if name == 'Title' else self.convert(name, value)
+
+        if 'Title' not in fields:
+            if not fields.get('StaffMember') or not fields.get('TrainingCourse'):
+                raise RowError("Title, or both Staff Member and Training Course, are required")
+            fields['Title'] = f"{fields['StaffMember']} - {fields['TrainingCourse']}"
+        return fields
+
+    def convert(self, name: str, value: Any) -> Any:
+        column = self.columns[name]
+        text = str(value).strip()
+
+        if 'dateTime' in column:
+            return self.parse_date(name, text)
+
+        if 'number' in column:
+            try:
+                number = float(text.rstrip('%'))
+            except ValueError:
+                raise RowError(f"{name}: '{text}' is not a number")
+            if not math.isfinite(number):
+                raise RowError(f"{name}: '{text}' is not a finite number")
+            return int(number) if number.is_integer() else number
+
+        if 'choice' in column:
+            for choice in column['choice']['choices']:
+                if choice.lower() == text.lower():
+                    return choice
+            raise RowError(f"{name}: '{text}' is not one of {column['choice']['choices']}")
+
+        return text
+
+    @staticmethod
+    def parse_date(name: str, text: str) -> str:
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            for date_format in DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, date_format)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise RowError(f"{name}: '{text}' is not a recognised date")
+
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def read_rows(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (row number, row) from a CSV or JSONL file without loading it all"""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if path.suffix.lower() in ('.jsonl', '.ndjson'):
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError as e:
+                        yield number, {'__error__': f"invalid JSON: {e}"}
+        else:
+            for number, row in enumerate(csv.DictReader(f), 2):
+                yield number, row
+
+
+class TrainingRecordImporter:
+    """Create Training Records items in bounded-concurrency $batch groups"""
+
+    def __init__(self, site_id: str, list_id: str, tokens, concurrency: int = IMPORT_CONCURRENCY):
+        self.site_id = site_id
+        self.list_id = list_id
+        self.tokens = tokens
+        self.concurrency = max(1, concurrency)
+        self.mapper = RecordMapper()
+
+    def run(self, rows: Iterator[Tuple[int, Dict[str, Any]]], results_path: Path,
+            validate_only: bool = False) -> Dict[str, int]:
+        """Import rows, writing one result line per row; returns status counts"""
+        counts = {'created': 0, 'invalid': 0, 'throttled': 0, 'failed': 0, 'unknown': 0, 'valid': 0}
+        window = BATCH_LIMIT * self.concurrency
+        pending = []
+
+        with open(results_path, 'w', encoding='utf-8', newline='') as out:
+            writer = csv.writer(out)
+            writer.writerow(['row', 'status', 'item_id', 'detail'])
+
+            for number, row in rows:
+                try:
+                    if isinstance(row, dict) and '__error__' in row:
+                        raise RowError(row['__error__'])
+                    fields = self.mapper.map_row(row)
+                except RowError as e:
+                    counts['invalid'] += 1
+                    writer.writerow([number, 'invalid', '', str(e)])
+                    continue
+
+                if validate_only:
+                    counts['valid'] += 1
+                    writer.writerow([number, 'valid', '', ''])
+                    continue
+
+                pending.append((number, fields))
+                if len(pending) >= window:
+                    self._send(pending, writer, counts)
+                    pending = []
+
+            if pending:
+                self._send(pending, writer, counts)
+
+        return counts
+
+    def _send(self, pending: List[Tuple[int, Dict[str, Any]]], writer, counts: Dict[str, int]):
+        url = f"/sites/{self.site_id}/lists/{self.list_id}/items"
+        batch_requests = [
+            {
+                "id": str(number),
+                "method": "POST",
+                "url": url,
+                "headers": {"Content-Type": "application/json"},
+                "body": {"fields": fields}
+            }
+            for number, fields in pending
+        ]
+
+        headers = dict(self.tokens.auth_headers(), **{'Content-Type': 'application/json'})
+        responses = send_batch(batch_requests, headers, concurrency=self.concurrency)
+
+        for number, _ in pending:
+            item = responses.get(str(number), {})
+            status = item.get('status')
+            body = item.get('body') or {}
+            if status == 201:
+                counts['created'] += 1
+                writer.writerow([number, 'created', body.get('id', ''), ''])
+            elif status is None:
+                # The envelope failed as a whole: the item may or may not exist
+                counts['unknown'] += 1
+                message = body.get('error', {}).get('message', '')
+                writer.writerow([number, 'unknown', '', f"{message}; check the list before re-importing"])
+            elif status in THROTTLE_STATUSES:
+                counts['throttled'] += 1
+                writer.writerow([number, 'throttled', '', f"HTTP {status}"])
+            else:
+                counts['failed'] += 1
+                message = body.get('error', {}).get('message', '') if isinstance(body, dict) else ''
+                writer.writerow([number, 'failed', '', f"HTTP {status} {message}".strip()])
+
+
+def main():
+    """Import training records from a CSV or JSONL file"""
+    parser = argparse.ArgumentParser(description="Bulk import into the Training Records list")
+    parser.add_argument('input', help="CSV (with a header row) or JSONL file")
+    parser.add_argument('--results', help="per-row result file (default: <input>.results.csv)")
+    parser.add_argument('--concurrency', type=int, default=IMPORT_CONCURRENCY,
+                        help=f"$batch envelopes in flight at once (default {IMPORT_CONCURRENCY})")
+    parser.add_argument('--validate-only', action='store_true', help="check rows without creating items")
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    results_path = Path(args.results) if args.results else input_path.with_name(input_path.name + '.results.csv')
+
+    site_id = list_id = tokens = None
+    if not args.validate_only:
+        if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET, SITE_URL]):
+            print("❌ Missing SharePoint configuration in .env file")
+            sys.exit(1)
+
+        tokens = get_token_provider(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
+        resolver = GraphResolver(SITE_URL, tokens)
+        site_id = resolver.site_id
+        list_id = resolver.list_id(TRAINING_RECORDS_LIST['displayName'])
+        if not list_id:
+            print("⚠️  Training Records list not found - run setup_sharepoint_graph.py first")
+            sys.exit(1)
+
+    print(f"📥 Importing {input_path}...")
+    started = datetime.now()
+    importer = TrainingRecordImporter(site_id, list_id, tokens, args.concurrency)
+    counts = importer.run(read_rows(input_path), results_path, args.validate_only)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    if args.validate_only:
+        print(f"✅ {counts['valid']} valid, {counts['invalid']} invalid rows")
+    else:
+        print(f"✅ {counts['created']} created, {counts['invalid']} invalid, "
+              f"{counts['throttled']} throttled, {counts['failed']} failed, "
+              f"{counts['unknown']} unconfirmed in {elapsed:.1f}s")
+    print(f"📝 Results written to {results_path}")
+
+    sys.exit(0 if counts['failed'] == 0 and counts['throttled'] == 0 and counts['unknown'] == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
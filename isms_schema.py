@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+ETHOS ISMS site schema
+The document library folder tree and SharePoint list definitions shared by
+the setup, import and rendering scripts
+"""
+
+# Document library folder tree (parents listed before their children)
+FOLDER_STRUCTURE = [
+    "01_Policies",
+    "01_Policies/Core_Policies",
+    "01_Policies/Supporting_Policies",
+    "02_Procedures",
+    "02_Procedures/Operational",
+    "02_Procedures/Emergency",
+    "03_Training",
+    "03_Training/Staff_Training",
+    "03_Training/Contractor_Materials",
+    "03_Training/Assessments",
+    "04_Forms_Templates",
+    "04_Forms_Templates/Access_Requests",
+    "04_Forms_Templates/Incident_Reports",
+    "04_Forms_Templates/Change_Requests",
+    "05_Quick_Reference",
+    "05_Quick_Reference/FAQ",
+    "05_Quick_Reference/Contacts",
+    "06_Archive",
+    "06_Archive/Previous_Versions"
+]
+
+# Tech Innovation theme colors
+THEME_COLORS = {
+    "primary": "#0078D4",
+    "secondary": "#50E6FF",
+    "accent": "#0063B1",
+    "success": "#107C10",
+    "warning": "#FFB900",
+    "danger": "#E81123",
+    "background": "#F3F2F1",
+    "card": "#FFFFFF",
+    "text_primary": "#323130",
+    "text_secondary": "#605E5C",
+    "border": "#D0CCCB"
+}
+
+# Welcome guide revision, shown in the guide itself; bump both when its text
+# changes (a date taken at render time would make every run re-upload it)
+WELCOME_GUIDE_VERSION = "1.0"
+WELCOME_GUIDE_UPDATED = "January 15, 2025"
+
+# Training Records list (Graph list definition used by create_lists)
+TRAINING_RECORDS_LIST = {
+    "displayName": "Training Records",
+    "description": "Track staff security training completion and compliance",
+    "list": {
+        "template": "genericList"
+    },
+    "columns": [
+        {
+            "name": "StaffMember",
+            "displayName": "Staff Member",
+            "text": {}
+        },
+        {
+            "name": "TrainingCourse",
+            "displayName": "Training Course",
+            "text": {}
+        },
+        {
+            "name": "CompletionDate",
+            "displayName": "Completion Date",
+            "dateTime": {}
+        },
+        {
+            "name": "NextReviewDate",
+            "displayName": "Next Review Date",
+            "dateTime": {}
+        },
+        {
+            "name": "Score",
+            "displayName": "Score (%)",
+            "number": {}
+        },
+        {
+            "name": "Status",
+            "displayName": "Status",
+            "choice": {
+                "choices": ["Not Started", "In Progress", "Completed", "Expired"]
+            }
+        },
+        {
+            "name": "Notes",
+            "displayName": "Notes",
+            "text": {
+                "allowMultipleLines": True
+            }
+        }
+    ]
+}
+
+# Library folder for each document naming pattern (first match wins; matched
+# case-insensitively against the file name)
+DOCUMENT_RULES = [
+    (r"^ISMS_POL_\d+_.*(Supporting|Guideline|Standard)", "01_Policies/Supporting_Policies"),
+    (r"^ISMS_POL_", "01_Policies/Core_Policies"),
+    (r"^ISMS_PRO_\d+_.*(Incident|Emergency|Continuity|Disaster|Breach)", "02_Procedures/Emergency"),
+    (r"^ISMS_PRO_", "02_Procedures/Operational"),
+    (r"^ISMS_TRN_\d+_.*(Assessment|Quiz)", "03_Training/Assessments"),
+    (r"^ISMS_TRN_\d+_.*Contractor", "03_Training/Contractor_Materials"),
+    (r"^ISMS_TRN_", "03_Training/Staff_Training")
+]
+
+# Document ID at the start of a document name, e.g. ISMS_POL_009 or ISMS-POL-009
+DOCUMENT_ID_PATTERN = r"^ISMS[_-](POL|PRO|TRN)[_-](\d+)"
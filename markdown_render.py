@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Single-pass Markdown to HTML rendering for portal documents
+Handles the subset our guides use: headings, paragraphs, ordered and
+unordered lists, bold/italic/code/links and horizontal rules
+"""
+
+import re
+import html
+import argparse
+from pathlib import Path
+from string import Template
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from isms_schema import THEME_COLORS
+
+HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+RULE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+UNORDERED_ITEM = re.compile(r'^\s*[-*+]\s+(.*)$')
+ORDERED_ITEM = re.compile(r'^\s*\d+[.)]\s+(.*)$')
+
+# Code spans are cut out first, so nothing inside them is formatted
+CODE_SPAN = re.compile(r'`([^`]+)`')
+CODE_PLACEHOLDER = re.compile(r'\x00(\d+)\x00')
+
+# Link targets that would run script when clicked
+UNSAFE_SCHEME = re.compile(r'^(javascript|vbscript|data):', re.I)
+
+
+def _link(match: re.Match) -> str:
+    """Anchor for [text](href), or just the text if the href is unsafe"""
+    href = html.unescape(match.group(2))
+    # Browsers ignore control characters and spaces inside the scheme
+    if UNSAFE_SCHEME.match(re.sub(r'[\x00-\x20]', '', href)):
+        return match.group(1)
+    return f'<a href="{html.escape(href, quote=True)}">{match.group(1)}</a>'
+
+
+# Inline patterns run on already-escaped text, in this order
+INLINE_PATTERNS = [
+    (re.compile(r'\*\*(.+?)\*\*|__(.+?)__'), lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>"),
+    (re.compile(r'(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])|(?<!\w)_(?!\s)(.+?)(?<!\s)_(?!\w)'),
+     lambda m: f"<em>{m.group(1) or m.group(2)}</em>"),
+    (re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)'), _link),
+]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>$title</title>
+    <style>
+        body { font-family: 'Segoe UI', sans-serif; color: $text_primary; }
+        h1 { color: $primary; }
+        h2 { color: $accent; }
+        h3 { color: $text_primary; }
+        .highlight { background: linear-gradient(135deg, rgba(0,120,212,0.1), rgba(80,230,255,0.1)); padding: 15px; border-left: 4px solid $primary; margin: 20px 0; }
+        .footer { margin-top: 50px; padding-top: 20px; border-top: 1px solid $border; color: $text_secondary; }
+    </style>
+</head>
+<body>
+$body
+</body>
+</html>
+"""
+
+
+def render_inline(text: str) -> str:
+    """Escape text and apply inline code, emphasis and links"""
+    code: List[str] = []
+
+    def stash(match: re.Match) -> str:
+        code.append(f"<code>{html.escape(match.group(1), quote=False)}</code>")
+        return f"\x00{len(code) - 1}\x00"
+
+    text = html.escape(CODE_SPAN.sub(stash, text.replace('\x00', '')), quote=False)
+    for pattern, replacement in INLINE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return CODE_PLACEHOLDER.sub(lambda m: code[int(m.group(1))], text)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+class MarkdownRenderer:
+    """Convert Markdown lines to HTML in a single pass
+
+    Each line is looked at once; open block elements (paragraph or list)
+    are tracked as state and closed as soon as a different block starts.
+    Lines inside a paragraph keep their breaks, as our guides are written
+    one statement per line.
+    """
+
+    def __init__(self, heading_ids: bool = True):
+        self.heading_ids = heading_ids
+
+    def render(self, source) -> str:
+        """Render a string or an iterable of lines"""
+        lines = source.splitlines() if isinstance(source, str) else source
+        return ''.join(self.iter_render(lines))
+
+    def iter_render(self, lines: Iterable[str]):
+        """Yield HTML fragments while consuming lines"""
+        open_block: Optional[str] = None  # 'p', 'ul' or 'ol'
+        paragraph: List[str] = []
+
+        def close():
+            nonlocal open_block
+            if open_block == 'p':
+                fragment = f"<p>{'<br>'.join(paragraph)}</p>\n"
+                paragraph.clear()
+            elif open_block in ('ul', 'ol'):
+                fragment = f"</{open_block}>\n"
+            else:
+                fragment = ''
+            open_block = None
+            return fragment
+
+        for raw in lines:
+            line = raw.rstrip('\n').rstrip()
+
+            if not line.strip():
+                yield close()
+                continue
+
+            match = HEADING.match(line)
+            if match:
+                yield close()
+                level = len(match.group(1))
+                text = render_inline(match.group(2))
+                anchor = f' id="{_slug(match.group(2))}"' if self.heading_ids else ''
+                yield f"<h{level}{anchor}>{text}</h{level}>\n"
+                continue
+
+            if RULE.match(line):
+                yield close()
+                yield "<hr>\n"
+                continue
+
+            for tag, pattern in (('ul', UNORDERED_ITEM), ('ol', ORDERED_ITEM)):
+                match = pattern.match(line)
+                if match:
+                    if open_block != tag:
+                        yield close()
+                        yield f"<{tag}>\n"
+                        open_block = tag
+                    yield f"<li>{render_inline(match.group(1))}</li>\n"
+                    break
+            else:
+                if open_block != 'p':
+                    yield close()
+                    open_block = 'p'
+                paragraph.append(render_inline(line.strip()))
+
+        yield close()
+
+
+@lru_cache(maxsize=None)
+def page_template() -> Template:
+    """Compiled page wrapper, shared by every rendered document"""
+    return Template(PAGE_TEMPLATE)
+
+
+def render_document(markdown: str, title: str, theme_colors: Dict[str, str] = THEME_COLORS) -> str:
+    """Render Markdown into a complete, themed HTML page"""
+    body = MarkdownRenderer().render(markdown)
+    return page_template().substitute(theme_colors, title=html.escape(title), body=body)
+
+
+def main():
+    """Render Markdown guides to themed HTML files"""
+    parser = argparse.ArgumentParser(description="Render Markdown guides to portal HTML")
+    parser.add_argument('files', nargs='+', help="Markdown source files")
+    parser.add_argument('--out', default='.', help="output directory (default: current directory)")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for source in map(Path, args.files):
+        markdown = source.read_text(encoding='utf-8')
+        heading = HEADING.match(markdown.lstrip().split('\n', 1)[0])
+        title = heading.group(2) if heading else source.stem.replace('_', ' ')
+        target = out_dir / f"{source.stem}.html"
+        target.write_text(render_document(markdown, title), encoding='utf-8')
+        print(f"✅ {source} -> {target}")
+
+
+if __name__ == '__main__':
+    main()
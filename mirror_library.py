@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Mirror the ISMS document library locally using Graph delta queries
+Keeps item metadata in a SQLite store (and optionally the file contents)
+and only applies what changed since the last saved delta token
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from graph_auth import get_token_provider
+from graph_cache import CACHE_DIR
+from graph_manifest import quickxor_file
+from graph_resolver import GraphResolver
+from graph_transport import GRAPH_URL, get_transport
+
+load_dotenv()
+
+# Configuration from .env
+TENANT_ID = os.getenv('SHP_TENANT_ID')
+CLIENT_ID = os.getenv('SHP_ID_APP')
+CLIENT_SECRET = os.getenv('SHP_ID_APP_SECRET')
+SITE_URL = os.getenv('SHP_SITE_URL')
+
+MIRROR_DIR = CACHE_DIR / 'mirror'
+DELTA_SELECT = 'id,name,parentReference,file,folder,size,eTag,lastModifiedDateTime,deleted,root'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    parent_id TEXT,
+    name TEXT,
+    is_folder INTEGER,
+    size INTEGER,
+    etag TEXT,
+    quick_xor_hash TEXT,
+    modified TEXT
+);
+CREATE INDEX IF NOT EXISTS items_parent ON items(parent_id);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS local_files (
+    id TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    etag TEXT,
+    quick_xor_hash TEXT
+);
+"""
+
+
+class LibraryMirror:
+    """Delta-driven local copy of one drive's metadata and (optionally) content"""
+
+    def __init__(self, drive_id: str, tokens, store_path: Path = None, content_dir: Path = None):
+        self.drive_id = drive_id
+        self.tokens = tokens
+        self.store_path = Path(store_path or MIRROR_DIR / f"{drive_id.replace('!', '_')}.sqlite")
+        self.content_dir = Path(content_dir) if content_dir else None
+        self.http = get_transport()
+
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.store_path))
+        self.db.executescript(SCHEMA)
+
+    def sync(self) -> Dict[str, int]:
+        """Apply all changes since the last sync and save the new delta token"""
+        stats = {'pages': 0, 'updated': 0, 'deleted': 0, 'downloaded': 0}
+        delta_link = self._get_state('delta_link')
+        url = delta_link or f"{GRAPH_URL}/drives/{self.drive_id}/root/delta?$select={DELTA_SELECT}"
+
+        full_resync = delta_link is None
+        if full_resync:
+            # Full resync: start from an empty store
+            self.db.execute("DELETE FROM items")
+
+        while url:
+            response = self.http.get(url, headers=self.tokens.auth_headers())
+            if response.status_code == 410:
+                # Delta token expired: Graph requires a full resync
+                print("⚠️  Delta token expired, resyncing from scratch")
+                self.reset()
+                return self.sync()
+            response.raise_for_status()
+            page = response.json()
+            stats['pages'] += 1
+
+            for item in page.get('value', []):
+                if 'deleted' in item:
+                    stats['deleted'] += self._delete(item['id'])
+                else:
+                    self._upsert(item)
+                    stats['updated'] += 1
+
+            url = page.get('@odata.nextLink')
+            if not url:
+                self._set_state('delta_link', page.get('@odata.deltaLink'))
+                self._set_state('synced_at', datetime.now().isoformat())
+
+        self.db.commit()
+
+        if self.content_dir:
+            if full_resync:
+                stats['deleted'] += self._prune_content()
+            stats['downloaded'] = self._sync_content()
+        return stats
+
+    def reset(self):
+        """Forget the delta token so the next sync is a full resync"""
+        self._set_state('delta_link', None)
+        self.db.commit()
+
+    def path_of(self, item_id: str) -> Optional[str]:
+        """Library-relative path of an item, built from the parent chain"""
+        parts = []
+        current = item_id
+        while current:
+            row = self.db.execute("SELECT parent_id, name FROM items WHERE id = ?", (current,)).fetchone()
+            if row is None:
+                return None
+            parent_id, name = row
+            if parent_id is None:
+                break  # drive root
+            parts.append(name)
+            current = parent_id
+        return '/'.join(reversed(parts))
+
+    def files(self) -> List[Dict[str, Any]]:
+        """All mirrored files with their library paths"""
+        rows = self.db.execute(
+            "SELECT id, size, etag, quick_xor_hash, modified FROM items WHERE is_folder = 0"
+        ).fetchall()
+        return [
+            {'id': row[0], 'path': self.path_of(row[0]), 'size': row[1], 'eTag': row[2],
+             'quickXorHash': row[3], 'lastModifiedDateTime': row[4]}
+            for row in rows
+        ]
+
+    def _upsert(self, item: Dict[str, Any]):
+        old_path = self.path_of(item['id']) if self.content_dir else None
+        parent_id = None if 'root' in item else item.get('parentReference', {}).get('id')
+        self.db.execute(
+            "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (item['id'], parent_id, item.get('name'), 1 if 'folder' in item or 'root' in item else 0,
+             item.get('size'), item.get('eTag'),
+             item.get('file', {}).get('hashes', {}).get('quickXorHash'),
+             item.get('lastModifiedDateTime'))
+        )
+
+        # Follow renames and moves in the local content copy
+        if old_path:
+            new_path = self.path_of(item['id'])
+            old_local = self.content_dir / old_path
+            if new_path and new_path != old_path and old_local.exists():
+                new_local = self.content_dir / new_path
+                new_local.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(old_local, new_local)
+
+    def _delete(self, item_id: str) -> int:
+        """Remove an item and everything below it; returns rows removed"""
+        subtree = [item_id]
+        for current in subtree:
+            subtree.extend(row[0] for row in self.db.execute("SELECT id FROM items WHERE parent_id = ?", (current,)))
+
+        if self.content_dir:
+            # Resolve paths before any rows go, children first
+            for current in reversed(subtree):
+                path = self.path_of(current)
+                local_path = self.content_dir / path if path else None
+                if local_path and local_path.is_file():
+                    local_path.unlink()
+                elif local_path and local_path.is_dir() and not any(local_path.iterdir()):
+                    local_path.rmdir()
+
+        removed = 0
+        for current in subtree:
+            removed += self.db.execute("DELETE FROM items WHERE id = ?", (current,)).rowcount
+            self.db.execute("DELETE FROM local_files WHERE id = ?", (current,))
+        return removed
+
+    def _sync_content(self) -> int:
+        """Download every file whose local copy is missing or differs from the remote
+
+        Checks all mirrored files, not just this sync's changes, so downloads
+        that failed or were interrupted last time are picked up again. A
+        file is only hashed when its size, mtime or remote eTag changed since
+        it was last verified; files without a remote hash are compared by
+        those alone.
+        """
+        downloaded = 0
+        for entry in self.files():
+            if not entry['path']:
+                continue
+
+            local_path = self.content_dir / entry['path']
+            if local_path.is_file() and self._local_matches(entry, local_path):
+                continue
+
+            url = f"{GRAPH_URL}/drives/{self.drive_id}/items/{entry['id']}/content"
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            status = self.http.download(url, local_path, headers=self.tokens.auth_headers())
+            if status != 200:
+                print(f"  ⚠️  Could not download {entry['path']}: {status}")
+                continue
+            self._record_local(entry, local_path)
+            downloaded += 1
+        self.db.commit()
+        return downloaded
+
+    def _local_matches(self, entry: Dict[str, Any], local_path: Path) -> bool:
+        """Whether the local copy is the remote file, hashing only when unsure"""
+        stat = local_path.stat()
+        if entry['size'] is not None and stat.st_size != entry['size']:
+            return False
+        row = self.db.execute("SELECT size, mtime_ns, etag FROM local_files WHERE id = ?",
+                              (entry['id'],)).fetchone()
+        if row == (stat.st_size, stat.st_mtime_ns, entry['eTag']):
+            return True
+        if not entry['quickXorHash'] or quickxor_file(local_path) != entry['quickXorHash']:
+            return False
+        self._record_local(entry, local_path)
+        return True
+
+    def _record_local(self, entry: Dict[str, Any], local_path: Path):
+        stat = local_path.stat()
+        self.db.execute("INSERT OR REPLACE INTO local_files VALUES (?, ?, ?, ?, ?)",
+                        (entry['id'], stat.st_size, stat.st_mtime_ns, entry['eTag'], entry['quickXorHash']))
+
+    def _prune_content(self) -> int:
+        """Remove local files that are no longer in the library; returns how many
+
+        Only needed after a full resync: the deletions between the expired
+        delta token and the resync are never reported.
+        """
+        known = {entry['path'] for entry in self.files() if entry['path']}
+        removed = 0
+        for local_path in sorted(self.content_dir.rglob('*'), reverse=True):
+            if local_path.is_file() and local_path.relative_to(self.content_dir).as_posix() not in known:
+                local_path.unlink()
+                removed += 1
+            elif local_path.is_dir() and not any(local_path.iterdir()):
+                local_path.rmdir()
+        return removed
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: Optional[str]):
+        self.db.execute("INSERT OR REPLACE INTO state VALUES (?, ?)", (key, value))
+
+
+def main():
+    """Sync the local mirror of the document library"""
+    parser = argparse.ArgumentParser(description="Mirror the ISMS document library using Graph delta queries")
+    parser.add_argument('--content', metavar='DIR', help="also mirror file contents into DIR")
+    parser.add_argument('--store', metavar='FILE', help="SQLite metadata store (default under SHP_CACHE_DIR)")
+    parser.add_argument('--full', action='store_true', help="discard the delta token and resync everything")
+    parser.add_argument('--list', action='store_true', help="print the mirrored files after syncing")
+    args = parser.parse_args()
+
+    if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET, SITE_URL]):
+        print("❌ Missing SharePoint configuration in .env file")
+        sys.exit(1)
+
+    tokens = get_token_provider(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
+    drive_id = GraphResolver(SITE_URL, tokens).drive_id
+    mirror = LibraryMirror(drive_id, tokens, args.store, args.content)
+
+    if args.full:
+        mirror.reset()
+
+    print("🔄 Syncing document library mirror...")
+    stats = mirror.sync()
+    print(f"✅ {stats['updated']} updated, {stats['deleted']} removed, "
+          f"{stats['downloaded']} downloaded in {stats['pages']} page(s)")
+
+    if args.list:
+        for entry in sorted(mirror.files(), key=lambda entry: entry['path'] or ''):
+            print(f"  📄 {entry['path']} ({entry['size']} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Asset optimisation stage for the portal homepage
+Takes the pages rendered by build_portal.py, keeps only the CSS rules the
+page actually uses, minifies the HTML and CSS, and writes deployable
+output to dist/: content-hashed stylesheets, precompressed gzip/brotli
+variants and a _headers file of cache rules. That layout is for a host
+that reads _headers and serves .gz/.br variants (Netlify, Cloudflare
+Pages); the GitHub Pages site (CNAME) serves the root index.html from
+build_portal.py as-is and uses none of it
+"""
+
+import re
+import gzip
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from html.parser import HTMLParser
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from build_portal import ROOT_DIR, build, load_content, output_path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Not published by GitHub Pages: deploy this directory to a _headers-aware host
+DIST_DIR = ROOT_DIR / 'dist'
+
+# Hashed assets never change under the same name; the entry page must revalidate
+LONG_CACHE = 'public, max-age=31536000, immutable'
+ENTRY_CACHE = 'no-cache'
+
+STYLE_BLOCK = re.compile(r'<style>(.*?)</style>', re.S)
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+HTML_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+RAW_TEXT_BLOCK = re.compile(r'(<(script|pre|textarea)\b.*?</\2\s*>)', re.S | re.I)
+PSEUDO = re.compile(r'::?[\w-]+(\([^)]*\))?')
+SELECTOR_CLASS = re.compile(r'\.([\w-]+)')
+SELECTOR_ID = re.compile(r'#([\w-]+)')
+SELECTOR_TAG = re.compile(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)')
+
+# Elements the inline scripts create at runtime, so the page scan never sees
+# them: {container id: (tags, classes)} kept whenever the container is present
+SCRIPT_GENERATED = {
+    'search-results': ({'li', 'a', 'strong', 'span'}, {'search-empty'}),
+}
+
+
+class _DocumentScan(HTMLParser):
+    """Collect the tags, classes and ids a page uses"""
+
+    def __init__(self):
+        super().__init__()
+        self.tags: Set[str] = set()
+        self.classes: Set[str] = set()
+        self.ids: Set[str] = set()
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.add(tag)
+        for name, value in attrs:
+            if name == 'class' and value:
+                self.classes.update(value.split())
+            elif name == 'id' and value:
+                self.ids.add(value)
+
+
+def split_rules(css: str) -> List[Tuple[str, str]]:
+    """Split a stylesheet into top-level (prelude, block) pairs"""
+    rules = []
+    depth = 0
+    start = 0
+    prelude = ''
+    for index, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                prelude = css[start:index].strip()
+                start = index + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude, css[start:index]))
+                start = index + 1
+    return rules
+
+
+def _selector_used(selector: str, scan: _DocumentScan) -> bool:
+    selector = PSEUDO.sub('', selector).strip()
+    if not selector or selector == '*':
+        return True
+    return (all(name in scan.classes for name in SELECTOR_CLASS.findall(selector))
+            and all(name in scan.ids for name in SELECTOR_ID.findall(selector))
+            and all(tag.lower() in scan.tags for tag in SELECTOR_TAG.findall(selector)))
+
+
+def prune_css(css: str, page: str) -> str:
+    """Drop rules whose selectors match nothing in the page"""
+    scan = _DocumentScan()
+    scan.feed(page)
+    for container, (tags, classes) in SCRIPT_GENERATED.items():
+        if container in scan.ids:
+            scan.tags.update(tags)
+            scan.classes.update(classes)
+    return _prune_rules(CSS_COMMENT.sub('', css), scan)
+
+
+def _prune_rules(css: str, scan: _DocumentScan) -> str:
+    kept = []
+    for prelude, block in split_rules(css):
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = _prune_rules(block, scan)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith('@'):
+            kept.append(f"{prelude}{{{block}}}")  # keyframes, font-face: keep as-is
+        else:
+            selectors = [s.strip() for s in prelude.split(',') if _selector_used(s, scan)]
+            if selectors:
+                kept.append(f"{','.join(selectors)}{{{block}}}")
+    return '\n'.join(kept)
+
+
+def minify_css(css: str) -> str:
+    css = CSS_COMMENT.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_html(page: str) -> str:
+    """Drop comments and collapse whitespace runs to one space
+
+    Whitespace between inline elements renders, so it is never removed
+    outright; <script>, <pre> and <textarea> contents are left as they are.
+    """
+    parts = RAW_TEXT_BLOCK.split(page)
+    # split() yields text, then each raw block followed by its tag name group
+    for index in range(0, len(parts), 3):
+        parts[index] = re.sub(r'\s+', ' ', HTML_COMMENT.sub('', parts[index]))
+    return ''.join(part for index, part in enumerate(parts) if index % 3 != 2).strip()
+
+
+def content_hash(data: bytes, length: int = 10) -> str:
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def precompress(path: Path, data: bytes) -> Dict[str, int]:
+    """Write .gz (and .br when brotli is installed) next to a file"""
+    sizes = {}
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    path.with_name(path.name + '.gz').write_bytes(compressed)
+    sizes['gzip'] = len(compressed)
+    if brotli:
+        compressed = brotli.compress(data, quality=11)
+        path.with_name(path.name + '.br').write_bytes(compressed)
+        sizes['brotli'] = len(compressed)
+    return sizes
+
+
+def search_index_paths(name: str, content: Dict[str, Any]) -> Optional[Tuple[Path, Path]]:
+    """(built, published) search manifest paths, or None if the target has no search"""
+    if not (content.get('search') and content['targets'][name].get('search')):
+        return None
+    index = content['search'].get('index', 'search/index.json')
+    return output_path(name, content).parent / index, DIST_DIR / name / index
+
+
+def publish_search(built: Path, published: Path, precompressed: bool = False) -> Dict[str, Dict[str, int]]:
+    """Copy a search index written by search_index.py next to the optimised page"""
+    published.parent.mkdir(parents=True, exist_ok=True)
+    for stale in published.parent.iterdir():
+        if stale.is_file():
+            stale.unlink()
+    if not built.exists():
+        print(f"⚠️  No search index at {built} - run search_index.py to enable search")
+        return {}
+
+    files = {}
+    for path in sorted(built.parent.glob('*.json')):
+        data = path.read_bytes()
+        (published.parent / path.name).write_bytes(data)
+        files[path.name] = {'bytes': len(data)}
+        if precompressed:
+            files[path.name].update(precompress(published.parent / path.name, data))
+    return files
+
+
+def _search_published(name: str, content: Dict[str, Any]) -> bool:
+    paths = search_index_paths(name, content)
+    if paths is None or not paths[0].exists():
+        return True
+    built, published = paths
+    return published.exists() and published.read_bytes() == built.read_bytes()
+
+
+def optimize_target(name: str, content: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Optimise one built target into dist/<target>/; returns a size report"""
+    content = content or load_content()
+    options = content['targets'][name].get('optimize', {})
+    source = output_path(name, content)
+    page = source.read_text(encoding='utf-8')
+    out_dir = DIST_DIR / name
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for stale in out_dir.iterdir():
+        if stale.is_file():
+            stale.unlink()
+
+    style = STYLE_BLOCK.search(page)
+    css = minify_css(prune_css(style.group(1), page)) if style else ''
+    report = {'target': name, 'files': {}, 'original': len(page.encode('utf-8'))}
+
+    if style and options.get('css') == 'external':
+        css_bytes = css.encode('utf-8')
+        css_name = f"portal.{content_hash(css_bytes)}.css"
+        (out_dir / css_name).write_bytes(css_bytes)
+        link = f'<link rel="stylesheet" href="{css_name}">'
+        page = page[:style.start()] + link + page[style.end():]
+        report['files'][css_name] = {'bytes': len(css_bytes)}
+        if options.get('precompress'):
+            report['files'][css_name].update(precompress(out_dir / css_name, css_bytes))
+    elif style:
+        page = page[:style.start()] + f"<style>{css}</style>" + page[style.end():]
+
+    page_bytes = minify_html(page).encode('utf-8')
+    entry = out_dir / source.name
+    entry.write_bytes(page_bytes)
+    report['entry'] = entry
+    report['files'][entry.name] = {'bytes': len(page_bytes)}
+    if options.get('precompress'):
+        report['files'][entry.name].update(precompress(entry, page_bytes))
+
+    headers = (f"/\n  Cache-Control: {ENTRY_CACHE}\n"
+               f"/{entry.name}\n  Cache-Control: {ENTRY_CACHE}\n"
+               f"/portal.*.css\n  Cache-Control: {LONG_CACHE}\n")
+    search = search_index_paths(name, content)
+    if search:
+        report['search'] = publish_search(*search, options.get('precompress', False))
+        # The search manifest names the hashed shards, so only it revalidates
+        manifest = search[1].relative_to(out_dir).as_posix()
+        headers += (f"/{manifest}\n  Cache-Control: {ENTRY_CACHE}\n"
+                    f"/{manifest.rpartition('/')[0]}/*.*.json\n  Cache-Control: {LONG_CACHE}\n")
+    if options.get('headers'):
+        (out_dir / '_headers').write_text(headers, encoding='utf-8')
+    return report
+
+
+def optimize(targets: List[str] = None, force: bool = False,
+             stats: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+    """Build and optimise targets, skipping those whose build was unchanged"""
+    content = load_content()
+    reports = {}
+    for name, (path, rebuilt) in build(targets, force, stats).items():
+        entry = DIST_DIR / name / path.name
+        if not rebuilt and entry.exists() and _search_published(name, content):
+            reports[name] = {'target': name, 'entry': entry, 'skipped': True}
+            continue
+        reports[name] = optimize_target(name, content)
+    return reports
+
+
+def print_report(reports: Dict[str, Dict[str, Any]]):
+    for name, report in reports.items():
+        if report.get('skipped'):
+            print(f"⏭️  {name} unchanged, skipped")
+            continue
+
+        total = sum(info['bytes'] for info in report['files'].values())
+        saved = 100 * (1 - total / report['original']) if report['original'] else 0
+        print(f"📦 {name}: {report['original']:,} -> {total:,} bytes ({saved:.0f}% smaller)")
+        for file_name, info in report['files'].items():
+            variants = ', '.join(f"{kind} {size:,}" for kind, size in info.items() if kind != 'bytes')
+            print(f"   {file_name}: {info['bytes']:,} bytes" + (f" ({variants})" if variants else ''))
+        if report.get('search'):
+            search_bytes = sum(info['bytes'] for info in report['search'].values())
+            print(f"   🔎 search index: {len(report['search'])} file(s), {search_bytes:,} bytes")
+    if brotli is None:
+        print("ℹ️  brotli not installed, only gzip variants were written")
+
+
+def main():
+    """Build, optimise and report on the portal pages"""
+    parser = argparse.ArgumentParser(description="Optimise the portal pages into dist/ for a host that reads _headers")
+    parser.add_argument('targets', nargs='*', help="targets to optimise (default: all)")
+    parser.add_argument('--force', action='store_true', help="rebuild even if the inputs are unchanged")
+    parser.add_argument('--json', action='store_true', help="print the size report as JSON")
+    args = parser.parse_args()
+
+    reports = optimize(args.targets, args.force)
+    if args.json:
+        print(json.dumps(reports, indent=2, default=str))
+    else:
+        print_report(reports)
+
+
+if __name__ == '__main__':
+    main()
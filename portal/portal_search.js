@@ -0,0 +1,135 @@
+/* Portal search over the prebuilt index from search_index.py.
+   Loads the manifest on first use and each term shard only when a query
+   needs its prefix. */
+(function () {
+    var box = document.getElementById('search-box');
+    var list = document.getElementById('search-results');
+    var indexUrl = box.getAttribute('data-index');
+    var base = indexUrl.replace(/[^\/]*$/, '');
+    var manifest = null;
+    var shards = {};
+    var timer = null;
+    var latest = 0;
+
+    function load(url) {
+        return fetch(url).then(function (response) {
+            if (!response.ok) { throw new Error(url + ': ' + response.status); }
+            return response.json();
+        });
+    }
+
+    function ready() {
+        if (!manifest) {
+            manifest = load(indexUrl).then(function (index) {
+                index.stop = {};
+                index.stop_words.forEach(function (word) { index.stop[word] = true; });
+                index.documentData = load(base + index.documents);
+                return index;
+            });
+        }
+        return manifest;
+    }
+
+    function shard(index, prefix) {
+        var name = index.shards[prefix];
+        if (!name) { return Promise.resolve({}); }
+        if (!shards[name]) { shards[name] = load(base + name); }
+        return shards[name];
+    }
+
+    function queryTerms(index, query) {
+        var seen = {};
+        return (query.toLowerCase().match(/[a-z0-9]+/g) || []).filter(function (term) {
+            var keep = term.length >= index.min_term && !index.stop[term] && !seen[term];
+            seen[term] = true;
+            return keep;
+        });
+    }
+
+    function sectionScores(index, terms, term) {
+        var scores = {};
+        var postings = [];
+        Object.keys(terms).forEach(function (candidate) {
+            if (candidate.lastIndexOf(term, 0) === 0) {
+                postings.push({ exact: candidate === term, flat: terms[candidate] });
+            }
+        });
+        postings.forEach(function (posting) {
+            var idf = Math.log(1 + index.sections / (posting.flat.length / 2));
+            var section = 0;
+            for (var i = 0; i < posting.flat.length; i += 2) {
+                section += posting.flat[i];
+                scores[section] = (scores[section] || 0) + posting.flat[i + 1] * idf * (posting.exact ? 2 : 1);
+            }
+        });
+        return scores;
+    }
+
+    function search(query) {
+        var request = ++latest;
+        ready().then(function (index) {
+            var terms = queryTerms(index, query);
+            if (!terms.length) { return render(request, null, []); }
+            var loads = terms.map(function (term) { return shard(index, term.slice(0, index.prefix)); });
+            return Promise.all([index.documentData].concat(loads)).then(function (loaded) {
+                var scores = null;
+                terms.forEach(function (term, position) {
+                    var found = sectionScores(index, loaded[position + 1], term);
+                    if (scores === null) { scores = found; return; }
+                    Object.keys(scores).forEach(function (section) {
+                        if (found[section] === undefined) { delete scores[section]; }
+                        else { scores[section] += found[section]; }
+                    });
+                });
+                var ranked = Object.keys(scores).sort(function (a, b) { return scores[b] - scores[a]; });
+                render(request, loaded[0], ranked.slice(0, 10));
+            });
+        }).catch(function () {
+            manifest = null;
+            shards = {};
+            render(request, null, null);
+        });
+    }
+
+    function render(request, data, sections) {
+        if (request !== latest) { return; }
+        list.textContent = '';
+        if (sections === null || !sections.length) {
+            var empty = document.createElement('li');
+            empty.className = 'search-empty';
+            empty.textContent = sections === null ? 'Search is unavailable right now' : 'No matching documents';
+            list.appendChild(empty);
+            list.hidden = !box.value.trim();
+            return;
+        }
+        sections.forEach(function (section) {
+            var entry = data.sections[section];
+            var documentEntry = data.documents[entry[0]];
+            var item = document.createElement('li');
+            var link = document.createElement('a');
+            link.href = documentEntry[2] + (entry[1] ? '#' + entry[1] : '');
+            link.target = '_blank';
+            if (documentEntry[0]) {
+                var id = document.createElement('strong');
+                id.textContent = documentEntry[0] + ' ';
+                link.appendChild(id);
+            }
+            link.appendChild(document.createTextNode(documentEntry[1]));
+            item.appendChild(link);
+            if (entry[2] && entry[2] !== documentEntry[1]) {
+                var heading = document.createElement('span');
+                heading.textContent = entry[2];
+                item.appendChild(heading);
+            }
+            list.appendChild(item);
+        });
+        list.hidden = false;
+    }
+
+    box.addEventListener('focus', ready, { once: true });
+    box.addEventListener('input', function () {
+        clearTimeout(timer);
+        if (!box.value.trim()) { latest++; list.hidden = true; return; }
+        timer = setTimeout(function () { search(box.value); }, 120);
+    });
+})();
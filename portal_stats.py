@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Live document counts and recent changes for the portal homepage
+Fetches the document count of each library section and the most recently
+modified documents in one $batch round trip, cached under SHP_CACHE_DIR
+for SHP_STATS_TTL seconds so regenerating the page rarely touches Graph
+"""
+
+import os
+import time
+import threading
+from urllib.parse import quote
+from dotenv import load_dotenv
+from typing import Dict, List, Any, Optional
+
+from graph_auth import get_token_provider
+from graph_batch import send_batch
+from graph_cache import CACHE_DIR, load_json, save_json
+from graph_resolver import GraphResolver
+
+load_dotenv()
+
+STATS_CACHE = CACHE_DIR / 'library_stats.json'
+
+# Counts older than this are fetched again
+STATS_TTL = int(os.getenv('SHP_STATS_TTL', '900'))
+
+# Recently updated documents shown on the homepage
+RECENT_LIMIT = int(os.getenv('SHP_RECENT_DOCUMENTS', '5'))
+
+# Ordering list items by a non-indexed column needs this on larger libraries
+NON_INDEXED_PREFER = 'HonorNonIndexedQueriesWarningMayFailRandomly'
+
+
+def stats_requests(drive_id: str, folders: List[str], recent: int) -> List[Dict[str, Any]]:
+    """One request per section folder, plus one for the newest list items
+
+    Each section is read with its children expanded: files directly in the
+    section count once, and each subfolder contributes its childCount, so
+    counts cover the section and one level below (the library's layout)
+    without walking the tree. Graph returns at most 200 expanded children
+    and never pages them; parse_stats marks such sections as partial.
+    """
+    batch_requests = []
+    for index, folder in enumerate(folders):
+        batch_requests.append({
+            'id': f"folder-{index}",
+            'method': 'GET',
+            'url': (f"/drives/{drive_id}/root:/{quote(folder.strip('/'))}?$select=id,name,folder,lastModifiedDateTime"
+                    f"&$expand=children($select=name,folder,file)")
+        })
+    if recent:
+        # Folders are list items too, so over-fetch and keep only files
+        batch_requests.append({
+            'id': 'recent',
+            'method': 'GET',
+            'url': (f"/drives/{drive_id}/list/items?$select=id,lastModifiedDateTime"
+                    f"&$expand=driveItem($select=name,file,parentReference,lastModifiedDateTime)"
+                    f"&$orderby=fields/Modified%20desc&$top={recent * 4}"),
+            'headers': {'Prefer': NON_INDEXED_PREFER}
+        })
+    return batch_requests
+
+
+def library_path(drive_item: Dict[str, Any]) -> str:
+    """Library-relative path of a driveItem, from its parentReference"""
+    parent = (drive_item.get('parentReference') or {}).get('path', '')
+    parent = parent.split('root:', 1)[-1].strip('/')
+    return f"{parent}/{drive_item['name']}" if parent else drive_item['name']
+
+
+def parse_stats(responses: Dict[str, Dict[str, Any]], folders: List[str], recent: int) -> Dict[str, Any]:
+    """Turn batch responses into {'folders': {path: {...}}, 'recent': [...]}"""
+    stats = {'folders': {}, 'recent': []}
+    for index, folder in enumerate(folders):
+        response = responses.get(f"folder-{index}", {})
+        if response.get('status') != 200:
+            continue
+        body = response.get('body', {})
+        children = body.get('children', [])
+        documents = sum(1 for child in children if 'file' in child)
+        documents += sum(child['folder'].get('childCount', 0) for child in children if 'folder' in child)
+        # Past the expansion cap the count is only a lower bound
+        partial = ('children@odata.nextLink' in body
+                   or (body.get('folder') or {}).get('childCount', 0) > len(children))
+        stats['folders'][folder.strip('/')] = {
+            'documents': documents,
+            'partial': partial,
+            'lastModifiedDateTime': body.get('lastModifiedDateTime')
+        }
+
+    response = responses.get('recent', {})
+    if response.get('status') == 200:
+        for item in response.get('body', {}).get('value', []):
+            drive_item = item.get('driveItem') or {}
+            if 'file' not in drive_item:
+                continue
+            stats['recent'].append({
+                'name': drive_item['name'],
+                'path': library_path(drive_item),
+                'lastModifiedDateTime': drive_item.get('lastModifiedDateTime') or item.get('lastModifiedDateTime')
+            })
+            if len(stats['recent']) == recent:
+                break
+    return stats
+
+
+class LibraryStats:
+    """Section document counts and recent documents for one drive, with a TTL cache"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, drive_id: str, tokens, ttl: int = STATS_TTL, cache_file=STATS_CACHE):
+        self.drive_id = drive_id
+        self.tokens = tokens
+        self.ttl = ttl
+        self.cache_file = cache_file
+
+    def get(self, folders: List[str], recent: int = RECENT_LIMIT, refresh: bool = False) -> Dict[str, Any]:
+        """Return the stats, from the cache unless it is stale or covers other folders"""
+        key = f"{self.drive_id}|{recent}|{','.join(sorted(folder.strip('/') for folder in folders))}"
+        entry = load_json(self.cache_file, {}).get(key)
+        if not refresh and entry and time.time() - entry.get('fetched_at', 0) < self.ttl:
+            return entry
+
+        responses = send_batch(stats_requests(self.drive_id, folders, recent), self.tokens.auth_headers())
+        entry = parse_stats(responses, folders, recent)
+        entry['fetched_at'] = time.time()
+
+        with self._lock:
+            cache = load_json(self.cache_file, {})
+            cache = {name: cached for name, cached in cache.items()
+                     if time.time() - cached.get('fetched_at', 0) < self.ttl}
+            cache[key] = entry
+            try:
+                save_json(self.cache_file, cache)
+            except OSError as e:
+                print(f"⚠️  Could not write library stats cache: {e}")
+        return entry
+
+
+def load_live_stats(folders: List[str], refresh: bool = False) -> Optional[Dict[str, Any]]:
+    """Stats for the .env site, or None (after printing why) if they can't be fetched"""
+    tenant_id, client_id = os.getenv('SHP_TENANT_ID'), os.getenv('SHP_ID_APP')
+    client_secret, site_url = os.getenv('SHP_ID_APP_SECRET'), os.getenv('SHP_SITE_URL')
+    if not all([tenant_id, client_id, client_secret, site_url]):
+        print("❌ Missing SharePoint configuration in .env file")
+        return None
+
+    try:
+        tokens = get_token_provider(tenant_id, client_id, client_secret)
+        drive_id = GraphResolver(site_url, tokens).drive_id
+        return LibraryStats(drive_id, tokens).get(folders, refresh=refresh)
+    except Exception as e:
+        print(f"❌ Could not fetch library stats: {e}")
+        return None
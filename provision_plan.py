@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Desired-state plan/apply engine for ISMS site provisioning
+Reads the current site state in one $batch round trip, diffs it against
+the folder tree, list schemas and seed documents, and applies only the
+operations needed to converge
+"""
+
+from urllib.parse import quote
+from typing import Dict, List, Any, Set
+
+from graph_batch import send_batch
+from graph_manifest import UploadManifest, quickxor_bytes
+from graph_pager import iter_items
+from graph_upload import GraphUploader
+
+PLAN_SYMBOLS = {
+    'create_folder': '+',
+    'create_list': '+',
+    'add_column': '~',
+    'upload_document': '↑'
+}
+
+
+class ProvisionPlanner:
+    """Plan and apply the desired state for one site
+
+    `setup` is an authenticated SharePointSetup (site_id and drive_id
+    resolved); `folders`, `lists` and `documents` describe the desired state.
+    """
+
+    def __init__(self, setup, folders: List[str], lists: List[Dict[str, Any]],
+                 documents: Dict[str, Any]):
+        self.setup = setup
+        self.folders = folders
+        self.lists = lists
+        self.documents = documents
+
+    def fetch_state(self) -> Dict[str, Any]:
+        """Read existing folders, lists/columns and document hashes in one $batch"""
+        drive_id = self.setup.drive_id
+        parents = sorted({folder_path.rpartition('/')[0] for folder_path in self.folders})
+
+        batch_requests = []
+        for index, parent_path in enumerate(parents):
+            if parent_path:
+                url = f"/drives/{drive_id}/root:/{quote(parent_path)}:/children"
+            else:
+                url = f"/drives/{drive_id}/root/children"
+            batch_requests.append({
+                "id": f"children-{index}",
+                "method": "GET",
+                "url": f"{url}?$select=name,folder&$top=200"
+            })
+
+        batch_requests.append({
+            "id": "lists",
+            "method": "GET",
+            "url": f"/sites/{self.setup.site_id}/lists?$select=id,displayName&$expand=columns($select=name)"
+        })
+
+        document_paths = sorted(self.documents)
+        for index, document_path in enumerate(document_paths):
+            batch_requests.append({
+                "id": f"document-{index}",
+                "method": "GET",
+                "url": f"/drives/{drive_id}/root:/{quote(document_path)}?$select=id,eTag,size,file"
+            })
+
+        responses = send_batch(batch_requests, self.setup.headers)
+
+        folders: Set[str] = set()
+        for index, parent_path in enumerate(parents):
+            response = responses.get(f"children-{index}", {})
+            if response.get('status') != 200:
+                continue  # parent missing: none of its children exist
+            for child in self._all_values(response['body']):
+                if 'folder' in child:
+                    folders.add(f"{parent_path}/{child['name']}" if parent_path else child['name'])
+
+        lists = {}
+        response = responses.get('lists', {})
+        if response.get('status') == 200:
+            for lst in self._all_values(response['body']):
+                lists[lst['displayName']] = {
+                    'id': lst['id'],
+                    'columns': {column['name'] for column in lst.get('columns', [])}
+                }
+
+        documents = {}
+        for index, document_path in enumerate(document_paths):
+            response = responses.get(f"document-{index}", {})
+            if response.get('status') == 200:
+                documents[document_path] = response['body']
+
+        return {'folders': folders, 'lists': lists, 'documents': documents}
+
+    def plan(self, state: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Return the minimal operations that bring the site to the desired state"""
+        state = state if state is not None else self.fetch_state()
+        operations = []
+
+        for folder_path in self.folders:
+            if folder_path not in state['folders']:
+                operations.append({'action': 'create_folder', 'target': folder_path})
+
+        for list_definition in self.lists:
+            existing = state['lists'].get(list_definition['displayName'])
+            if existing is None:
+                operations.append({'action': 'create_list', 'target': list_definition['displayName'],
+                                   'definition': list_definition})
+                continue
+            for column in list_definition['columns']:
+                if column['name'] not in existing['columns']:
+                    operations.append({'action': 'add_column',
+                                       'target': f"{list_definition['displayName']}.{column['name']}",
+                                       'list_id': existing['id'], 'definition': column})
+
+        for document_path, (content, content_type) in sorted(self.documents.items()):
+            remote = state['documents'].get(document_path)
+            content_hash = quickxor_bytes(content)
+            remote_hash = (remote or {}).get('file', {}).get('hashes', {}).get('quickXorHash')
+            if remote_hash != content_hash:
+                operations.append({'action': 'upload_document', 'target': document_path,
+                                   'content': content, 'content_type': content_type,
+                                   'hash': content_hash, 'reason': 'changed' if remote else 'missing'})
+
+        return operations
+
+    def apply(self, operations: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Run planned operations; returns succeeded/failed counts"""
+        counts = {'succeeded': 0, 'failed': 0}
+
+        folders = [op['target'] for op in operations if op['action'] == 'create_folder']
+        if folders:
+            results = self.setup.create_folders_batch(folders)
+            for folder_path in folders:
+                ok = results.get(folder_path) in ('created', 'exists')
+                counts['succeeded' if ok else 'failed'] += 1
+                print(f"  {'✅' if ok else '❌'} folder {folder_path}: {results.get(folder_path, 'failed')}")
+
+        schema_ops = [op for op in operations if op['action'] in ('create_list', 'add_column')]
+        if schema_ops:
+            batch_requests = []
+            for index, op in enumerate(schema_ops):
+                if op['action'] == 'create_list':
+                    url = f"/sites/{self.setup.site_id}/lists"
+                else:
+                    url = f"/sites/{self.setup.site_id}/lists/{op['list_id']}/columns"
+                batch_requests.append({
+                    "id": str(index + 1),
+                    "method": "POST",
+                    "url": url,
+                    "headers": {"Content-Type": "application/json"},
+                    "body": op['definition']
+                })
+            responses = send_batch(batch_requests, self.setup.headers)
+            for index, op in enumerate(schema_ops):
+                status = responses.get(str(index + 1), {}).get('status')
+                ok = status in (200, 201)
+                counts['succeeded' if ok else 'failed'] += 1
+                print(f"  {'✅' if ok else '❌'} {op['action'].replace('_', ' ')} {op['target']} (HTTP {status})")
+
+        uploads = [op for op in operations if op['action'] == 'upload_document']
+        if uploads:
+            manifest = UploadManifest()
+            uploader = GraphUploader(self.setup.drive_id, self.setup.tokens)
+            for op in uploads:
+                try:
+                    item = uploader.upload_bytes(op['content'], op['target'], op['content_type'])
+                    manifest.record(self.setup.drive_id, op['target'], op['hash'], item)
+                    counts['succeeded'] += 1
+                    print(f"  ✅ uploaded {op['target']}")
+                except Exception as e:
+                    counts['failed'] += 1
+                    print(f"  ❌ upload {op['target']}: {e}")
+
+        return counts
+
+    @staticmethod
+    def print_plan(operations: List[Dict[str, Any]]):
+        if not operations:
+            print("✅ No changes. The site matches the desired state.")
+            return
+
+        for op in operations:
+            detail = f" ({op['reason']})" if 'reason' in op else ''
+            print(f"  {PLAN_SYMBOLS[op['action']]} {op['action'].replace('_', ' ')}: {op['target']}{detail}")
+        print(f"\n📋 Plan: {len(operations)} operation(s)")
+
+    def _all_values(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Values from a batch response body plus any further pages"""
+        values = list(body.get('value', []))
+        next_link = body.get('@odata.nextLink')
+        if next_link:
+            values.extend(iter_items(next_link, self.setup.tokens))
+        return values
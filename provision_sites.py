@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Provision many ISMS SharePoint sites in parallel
+Reads a manifest of site URLs (optionally across tenants), runs the
+setup/plan/apply flow for every site concurrently and ends with a per-site
+result table. Each tenant gets one token provider and one connection pool,
+rate limit and concurrency limit shared by all of its sites, so a run takes
+about as long as the slowest site rather than the sum of all of them
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from typing import Dict, List, Any, Tuple
+
+from graph_transport import GraphTransport, use_transport
+from setup_sharepoint_graph import SharePointSetup, load_folder_list
+
+# Load environment variables
+load_dotenv()
+
+# Concurrency limits from .env
+MAX_SITES = int(os.getenv('SHP_FANOUT_SITES', '20'))
+TENANT_SITES = int(os.getenv('SHP_FANOUT_TENANT_SITES', '10'))
+
+DEFAULT_TENANT = 'default'
+
+
+def load_site_manifest(path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, str]]]:
+    """Read the sites and tenants to provision
+
+    A text file lists one site URL per line (# starts a comment) and uses
+    the .env credentials. A JSON file can also name tenants:
+
+        {"tenants": {"contoso": {"tenant_id": "...", "client_id": "...",
+                                 "client_secret_env": "CONTOSO_SECRET"}},
+         "sites": ["https://ethos.sharepoint.com/sites/ISMS",
+                   {"url": "https://contoso.sharepoint.com/sites/ISMS", "tenant": "contoso"}]}
+
+    Secrets are never stored in the manifest, only the name of the
+    environment variable holding them (default SHP_ID_APP_SECRET).
+    """
+    text = Path(path).read_text(encoding='utf-8')
+    if not path.endswith('.json'):
+        urls = [line.split('#', 1)[0].strip() for line in text.splitlines()]
+        sites, tenants = [{'url': url, 'tenant': DEFAULT_TENANT} for url in urls if url], {}
+    else:
+        manifest = json.loads(text)
+        tenants = manifest.get('tenants', {})
+        sites = []
+        for entry in manifest.get('sites', []):
+            site = {'url': entry} if isinstance(entry, str) else dict(entry)
+            site.setdefault('tenant', DEFAULT_TENANT)
+            if site['tenant'] != DEFAULT_TENANT and site['tenant'] not in tenants:
+                raise ValueError(f"Site {site['url']} names unknown tenant '{site['tenant']}'")
+            sites.append(site)
+
+    # Results are keyed by URL, and two runs on one site would race each other
+    seen = set()
+    for site in sites:
+        key = site['url'].rstrip('/').lower()
+        if key in seen:
+            raise ValueError(f"Site {site['url']} is listed more than once")
+        seen.add(key)
+    return sites, tenants
+
+
+def tenant_credentials(name: str, tenants: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    """Tenant, client and secret for a manifest tenant (.env for the default)"""
+    config = tenants.get(name, {})
+    return {
+        'tenant_id': config.get('tenant_id') or os.getenv('SHP_TENANT_ID'),
+        'client_id': config.get('client_id') or os.getenv('SHP_ID_APP'),
+        'client_secret': os.getenv(config.get('client_secret_env', 'SHP_ID_APP_SECRET'))
+    }
+
+
+def interleave_tenants(sites: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order sites round-robin by tenant so no tenant's limit blocks the queue"""
+    by_tenant: Dict[str, List[Dict[str, Any]]] = {}
+    for site in sites:
+        by_tenant.setdefault(site['tenant'], []).append(site)
+    ordered = []
+    queues = list(by_tenant.values())
+    while queues:
+        ordered.extend(queue.pop(0) for queue in queues)
+        queues = [queue for queue in queues if queue]
+    return ordered
+
+
+class _ThreadOutput(io.TextIOBase):
+    """stdout that sends each site thread's prints to that site's buffer"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        if getattr(self.local, 'buffer', None) is None:
+            self.stream.flush()
+
+
+class FanOutProvisioner:
+    """Run SharePointSetup for many sites with global and per-tenant limits"""
+
+    def __init__(self, sites: List[Dict[str, Any]], tenants: Dict[str, Dict[str, str]] = None,
+                 command: str = 'setup', folders: List[str] = None, max_sites: int = MAX_SITES,
+                 tenant_sites: int = TENANT_SITES, tenant_requests: int = None, tenant_rate: float = None,
+                 log_dir: Path = None, verbose: bool = False):
+        self.sites = sites
+        self.tenants = tenants or {}
+        self.command = command
+        self.folders = folders
+        self.max_sites = max(1, max_sites)
+        self.tenant_sites = max(1, tenant_sites)
+        self.tenant_requests = tenant_requests
+        self.tenant_rate = tenant_rate
+        self.log_dir = log_dir
+        self.verbose = verbose
+        self.transports = {}
+        self.semaphores = {}
+        self.output = None
+        self._lock = threading.Lock()
+
+    def _tenant(self, name: str):
+        """Shared transport and site semaphore for one tenant"""
+        with self._lock:
+            if name not in self.transports:
+                options = {}
+                if self.tenant_requests:
+                    options['max_concurrency'] = self.tenant_requests
+                    options['pool_size'] = self.tenant_requests
+                if self.tenant_rate is not None:
+                    options['rate_limit'] = self.tenant_rate
+                self.transports[name] = GraphTransport(**options)
+                self.semaphores[name] = threading.Semaphore(self.tenant_sites)
+            return self.transports[name], self.semaphores[name]
+
+    def provision(self, site: Dict[str, Any]) -> Dict[str, Any]:
+        """Provision one site on the calling thread, capturing its output"""
+        transport, semaphore = self._tenant(site['tenant'])
+        result = {'site': site['url'], 'tenant': site['tenant'], 'status': 'failed',
+                  'seconds': 0.0, 'detail': ''}
+        buffer = io.StringIO()
+
+        with semaphore:
+            self.output.local.buffer = buffer
+            started = time.perf_counter()
+            try:
+                with use_transport(transport):
+                    setup = SharePointSetup(folders=self.folders, site_url=site['url'],
+                                            **tenant_credentials(site['tenant'], self.tenants))
+                    if self.command == 'setup':
+                        success = setup.setup_site()
+                    else:
+                        success = setup.plan_site(apply_changes=self.command == 'apply')
+                result['status'] = 'ok' if success else 'failed'
+            except Exception as e:
+                print(f"❌ {type(e).__name__}: {e}")
+                result['status'] = 'error'
+            finally:
+                result['seconds'] = time.perf_counter() - started
+                self.output.local.buffer = None
+
+        # SharePointSetup ends with its transport's totals, which here are the
+        # whole tenant's traffic so far; print_results reports those per tenant
+        log = ''.join(line for line in buffer.getvalue().splitlines(keepends=True)
+                      if not line.startswith('🚦 Graph traffic'))
+        problems = [line.strip() for line in log.splitlines() if line.lstrip().startswith(('❌', '⚠️'))]
+        result['detail'] = problems[0] if problems else ''
+        result['log'] = log
+        if self.log_dir:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            name = site['url'].split('://', 1)[-1].replace('/', '_')
+            result['log_file'] = str(self.log_dir / f"{name}.log")
+            Path(result['log_file']).write_text(log, encoding='utf-8')
+        return result
+
+    def run(self) -> List[Dict[str, Any]]:
+        """Provision every site; returns one result per site in manifest order"""
+        results = {}
+        self.output = _ThreadOutput(sys.stdout)
+        original = sys.stdout
+        sys.stdout = self.output
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_sites, len(self.sites)) or 1) as executor:
+                futures = [executor.submit(self.provision, site) for site in interleave_tenants(self.sites)]
+                for future in as_completed(futures):
+                    result = future.result()
+                    results[result['site']] = result
+                    icon = '✅' if result['status'] == 'ok' else '❌'
+                    print(f"{icon} {result['site']} ({result['seconds']:.1f}s)")
+                    if self.verbose or result['status'] != 'ok':
+                        print(result['log'].rstrip('\n'))
+        finally:
+            sys.stdout = original
+        return [results[site['url']] for site in self.sites if site['url'] in results]
+
+    def print_results(self, results: List[Dict[str, Any]], wall: float):
+        """Per-site result table plus per-tenant Graph traffic"""
+        width = max([len('site')] + [len(result['site']) for result in results])
+        tenant_width = max([len('tenant')] + [len(result['tenant']) for result in results])
+        print(f"\n{'site':<{width}}  {'tenant':<{tenant_width}}  {'result':<7} {'seconds':>8}  detail")
+        print(f"{'-' * width}  {'-' * tenant_width}  {'-' * 7} {'-' * 8}  {'-' * 6}")
+        for result in results:
+            print(f"{result['site']:<{width}}  {result['tenant']:<{tenant_width}}  {result['status']:<7} "
+                  f"{result['seconds']:>8.1f}  {result['detail']}")
+
+        succeeded = sum(1 for result in results if result['status'] == 'ok')
+        slowest = max((result['seconds'] for result in results), default=0.0)
+        total = sum(result['seconds'] for result in results)
+        print(f"\n✅ {succeeded}/{len(results)} site(s) succeeded in {wall:.1f}s "
+              f"(slowest site {slowest:.1f}s, {total:.1f}s if run one after another)")
+        for name, transport in sorted(self.transports.items()):
+            print(f"🚦 {name}: {transport.stats.summary()}")
+
+
+def main():
+    """Provision every site in a manifest concurrently"""
+    parser = argparse.ArgumentParser(description="Provision many ISMS SharePoint sites in parallel")
+    parser.add_argument('manifest', help="site manifest: one URL per line, or JSON with tenants")
+    parser.add_argument('command', nargs='?', default='setup', choices=['setup', 'plan', 'apply'],
+                        help="setup: run every step; plan: show what differs; apply: converge each site")
+    parser.add_argument('--folders', help="file listing folder paths to create (one per line)")
+    parser.add_argument('--max-sites', type=int, default=MAX_SITES,
+                        help=f"sites provisioned at once across all tenants (default {MAX_SITES})")
+    parser.add_argument('--tenant-sites', type=int, default=TENANT_SITES,
+                        help=f"sites provisioned at once per tenant (default {TENANT_SITES})")
+    parser.add_argument('--tenant-requests', type=int,
+                        help="max in-flight Graph requests per tenant (default SHP_MAX_CONCURRENCY)")
+    parser.add_argument('--tenant-rate', type=float,
+                        help="Graph requests per second per tenant (default SHP_RATE_LIMIT)")
+    parser.add_argument('--log-dir', type=Path, help="write each site's full output to DIR/<site>.log")
+    parser.add_argument('--verbose', action='store_true', help="print each site's output as it finishes")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args()
+
+    try:
+        sites, tenants = load_site_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read site manifest: {e}")
+        sys.exit(1)
+    if not sites:
+        print("❌ No sites in the manifest")
+        sys.exit(1)
+
+    missing = sorted({site['tenant'] for site in sites
+                      if not all(tenant_credentials(site['tenant'], tenants).values())})
+    if missing:
+        print(f"❌ Missing credentials for tenant(s): {', '.join(missing)}")
+        sys.exit(1)
+
+    provisioner = FanOutProvisioner(
+        sites, tenants, command=args.command,
+        folders=load_folder_list(args.folders) if args.folders else None,
+        max_sites=args.max_sites, tenant_sites=args.tenant_sites,
+        tenant_requests=args.tenant_requests, tenant_rate=args.tenant_rate,
+        log_dir=args.log_dir, verbose=args.verbose
+    )
+
+    print(f"🚀 Provisioning {len(sites)} site(s) across {len({site['tenant'] for site in sites})} tenant(s)")
+    started = time.perf_counter()
+    try:
+        results = provisioner.run()
+    except KeyboardInterrupt:
+        print("\n\n⛔ Provisioning cancelled by user")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps([{key: value for key, value in result.items() if key != 'log'}
+                          for result in results], indent=2))
+    else:
+        provisioner.print_results(results, time.perf_counter() - started)
+    sys.exit(0 if all(result['status'] == 'ok' for result in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
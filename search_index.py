@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Prebuilt full-text search index for the static portal
+Extracts the text of the library's HTML and Markdown documents (a local
+copy, e.g. from mirror_library.py --content), splits it into sections at
+the headings and writes a sharded inverted index next to the page: one
+small entry manifest plus content-hashed document and term shards, so the
+browser loads only the shards a query's prefixes need
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from pathlib import Path
+from html.parser import HTMLParser
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+
+from build_portal import LinkResolver, load_content, output_path
+from isms_schema import DOCUMENT_ID_PATTERN
+from markdown_render import MarkdownRenderer
+from optimize_portal import content_hash
+
+SEARCH_DIR = 'search'
+MANIFEST_NAME = 'index.json'
+
+# Terms are grouped by their first SHARD_PREFIX characters (queries need at
+# least that many); neighbouring groups share a shard up to about SHARD_BYTES
+SHARD_PREFIX = 2
+SHARD_BYTES = int(os.getenv('SHP_SEARCH_SHARD_BYTES', '32768'))
+MIN_TERM = 2
+MAX_TERM = 30
+
+INDEX_EXTENSIONS = {'.html', '.htm', '.md'}
+SECTION_TAGS = {'h1', 'h2', 'h3'}
+SKIP_TAGS = {'script', 'style', 'head', 'nav'}
+
+TOKEN = re.compile(r'[a-z0-9]+')
+DOCUMENT_ID = re.compile(DOCUMENT_ID_PATTERN, re.I)
+STOP_WORDS = frozenset("""
+    a an and are as at be been but by can for from has have if in into is it its may must not of on or
+    our shall should such that the their then there these this those to was we were which will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case index terms, without stop words and one-letter noise"""
+    return [token for token in TOKEN.findall(text.lower())
+            if MIN_TERM <= len(token) <= MAX_TERM and token not in STOP_WORDS]
+
+
+def display_id(name: str) -> str:
+    """ISMS-POL-009 for ISMS_POL_009_..., or '' for names without an ISMS ID"""
+    match = DOCUMENT_ID.match(name)
+    return f"ISMS-{match.group(1).upper()}-{int(match.group(2)):03d}" if match else ''
+
+
+class _SectionScan(HTMLParser):
+    """Split a page's text into sections that start at h1-h3 headings"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ''
+        self.sections: List[Dict[str, Any]] = [{'anchor': '', 'heading': '', 'text': []}]
+        self.skip = 0
+        self.in_title = False
+        self.heading: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip += 1
+        if tag == 'title':
+            self.in_title = True
+        elif tag in SECTION_TAGS:
+            self.heading = []
+            self.sections.append({'anchor': dict(attrs).get('id') or '', 'heading': '', 'text': []})
+        elif tag in ('p', 'li', 'br', 'td', 'div', 'tr'):
+            self.sections[-1]['text'].append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip = max(0, self.skip - 1)
+        if tag == 'title':
+            self.in_title = False
+        elif tag in SECTION_TAGS and self.heading is not None:
+            self.sections[-1]['heading'] = ' '.join(''.join(self.heading).split())
+            self.heading = None
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+        elif self.skip:
+            return
+        elif self.heading is not None:
+            self.heading.append(data)
+        else:
+            self.sections[-1]['text'].append(data)
+
+
+def extract_sections(path: Path) -> Tuple[str, List[Dict[str, str]]]:
+    """(title, [{'anchor', 'heading', 'text'}, ...]) for one document"""
+    source = path.read_text(encoding='utf-8', errors='replace')
+    if path.suffix.lower() == '.md':
+        source = MarkdownRenderer().render(source)
+
+    scan = _SectionScan()
+    scan.feed(source)
+    scan.close()
+
+    sections = []
+    for section in scan.sections:
+        text = ' '.join(''.join(section['text']).split())
+        if text or section['heading']:
+            sections.append({'anchor': section['anchor'], 'heading': section['heading'], 'text': text})
+    headings = [section['heading'] for section in sections if section['heading']]
+    title = ' '.join(scan.title.split()) or (headings[0] if headings else path.stem.replace('_', ' '))
+    return title, sections
+
+
+def _dump(data: Any) -> bytes:
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class SearchIndexBuilder:
+    """Build the sharded index for one portal target from a local document tree
+
+    Postings are per section, as flat [section delta, term frequency, ...]
+    lists sorted by section. All terms sharing a prefix live in one shard,
+    so a prefix query loads one file; the manifest maps each prefix to its
+    shard. A document's first section is the text before its first heading.
+    """
+
+    def __init__(self, source: Path, links: LinkResolver, shard_prefix: int = SHARD_PREFIX,
+                 shard_bytes: int = SHARD_BYTES):
+        self.source = Path(source)
+        self.links = links
+        self.shard_prefix = shard_prefix
+        self.shard_bytes = shard_bytes
+        self.documents: List[List[str]] = []
+        self.sections: List[List[Any]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+
+    def add(self, path: Path):
+        """Index one document; its href is its library path for the target"""
+        library_path = path.relative_to(self.source).as_posix()
+        title, sections = extract_sections(path)
+        document = len(self.documents)
+        self.documents.append([display_id(path.name), title, self.links.library_href(library_path)])
+
+        for section in sections:
+            index = len(self.sections)
+            self.sections.append([document, section['anchor'], section['heading']])
+            terms = Counter(tokenize(section['heading']) * 3 + tokenize(section['text']))
+            for term, count in terms.items():
+                self.postings.setdefault(term, []).append((index, count))
+
+    def add_tree(self) -> int:
+        """Index every HTML/Markdown document under the source; returns how many"""
+        count = 0
+        for path in sorted(self.source.rglob('*')):
+            relative = path.relative_to(self.source)
+            if not path.is_file() or path.suffix.lower() not in INDEX_EXTENSIONS:
+                continue
+            if any(part.startswith(('.', '~$')) for part in relative.parts):
+                continue
+            self.add(path)
+            count += 1
+        return count
+
+    def shards(self) -> List[Tuple[List[str], Dict[str, List[int]]]]:
+        """[(prefixes, {term: [section delta, tf, ...]}), ...] with terms sorted"""
+        groups: Dict[str, Dict[str, List[int]]] = {}
+        for term in sorted(self.postings):
+            flat, previous = [], 0
+            for section, count in self.postings[term]:
+                flat += [section - previous, count]
+                previous = section
+            groups.setdefault(term[:self.shard_prefix], {})[term] = flat
+
+        shards = []
+        size = 0
+        for prefix, terms in groups.items():
+            group_size = len(_dump(terms))
+            if not shards or size + group_size > self.shard_bytes:
+                shards.append(([], {}))
+                size = 0
+            shards[-1][0].append(prefix)
+            shards[-1][1].update(terms)
+            size += group_size
+        return shards
+
+    def write(self, out_dir: Path) -> Dict[str, Any]:
+        """Write the manifest and hashed shards into out_dir/search; returns a size report"""
+        search_dir = Path(out_dir) / SEARCH_DIR
+        search_dir.mkdir(parents=True, exist_ok=True)
+        written = {}
+
+        def write_hashed(stem: str, data: Any) -> str:
+            payload = _dump(data)
+            name = f"{stem}.{content_hash(payload)}.json"
+            (search_dir / name).write_bytes(payload)
+            written[name] = len(payload)
+            return name
+
+        documents = write_hashed('documents', {'documents': self.documents, 'sections': self.sections})
+        shards = {}
+        for prefixes, terms in self.shards():
+            name = write_hashed(f"terms-{prefixes[0]}", terms)
+            shards.update((prefix, name) for prefix in prefixes)
+        manifest = _dump({'version': 1, 'prefix': self.shard_prefix, 'min_term': MIN_TERM,
+                          'stop_words': sorted(STOP_WORDS), 'sections': len(self.sections),
+                          'documents': documents, 'shards': shards})
+        (search_dir / MANIFEST_NAME).write_bytes(manifest)
+        written[MANIFEST_NAME] = len(manifest)
+
+        for stale in search_dir.iterdir():
+            if stale.is_file() and stale.name not in written:
+                stale.unlink()
+        return {'directory': search_dir, 'documents': len(self.documents), 'sections': len(self.sections),
+                'terms': len(self.postings), 'files': written}
+
+
+def build_search_index(source: Path, target: str = 'static', content: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Index the documents under source for one target, next to its page"""
+    content = content or load_content()
+    builder = SearchIndexBuilder(source, LinkResolver(content['targets'][target]))
+    builder.add_tree()
+    return builder.write(output_path(target, content).parent)
+
+
+def main():
+    """Build the search index for the portal's search box"""
+    parser = argparse.ArgumentParser(description="Build the static portal's search index")
+    parser.add_argument('source', help="local copy of the document library (e.g. mirror_library.py --content DIR)")
+    parser.add_argument('--target', default='static', help="portal target the index is published with")
+    args = parser.parse_args()
+
+    content = load_content()
+    if args.target not in content['targets']:
+        print(f"❌ Unknown target: {args.target} (known: {', '.join(sorted(content['targets']))})")
+        sys.exit(1)
+    if not Path(args.source).is_dir():
+        print(f"❌ {args.source} is not a directory")
+        sys.exit(1)
+
+    report = build_search_index(Path(args.source), args.target, content)
+    total = sum(report['files'].values())
+    shards = [size for name, size in report['files'].items() if name.startswith('terms-')]
+    print(f"🔎 Indexed {report['documents']} document(s), {report['sections']} section(s), "
+          f"{report['terms']:,} term(s)")
+    print(f"✅ {len(shards)} term shard(s) (largest {max(shards, default=0):,} bytes), "
+          f"{total:,} bytes in all -> {report['directory']}")
+    print("ℹ️  Run build_portal.py to add the search box to the page")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,12 +8,28 @@ import os
 import sys
 import json
 import time
-import requests
+import asyncio
+import argparse
+import contextlib
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime
 from typing import Dict, List, Any
 
+from graph_auth import get_token_provider
+from graph_batch import send_batch
+from graph_manifest import UploadManifest
+from graph_resolver import GraphResolver
+from graph_throttle import THROTTLE_STATUSES
+from graph_trace import METRICS_FILE, TRACE_LOG, GraphTracer
+from graph_transport import GRAPH_URL, get_transport
+from graph_upload import GraphUploader
+from isms_schema import (FOLDER_STRUCTURE, THEME_COLORS, TRAINING_RECORDS_LIST,
+                         WELCOME_GUIDE_UPDATED, WELCOME_GUIDE_VERSION)
+from markdown_render import render_document
+from provision_plan import ProvisionPlanner
+
 # Load environment variables
 load_dotenv()
 
@@ -23,153 +39,245 @@ CLIENT_ID = os.getenv('SHP_ID_APP')
 CLIENT_SECRET = os.getenv('SHP_ID_APP_SECRET')
 SITE_URL = os.getenv('SHP_SITE_URL')
 
-# Validate configuration
-if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET, SITE_URL]):
-    print("❌ Missing SharePoint configuration in .env file")
-    sys.exit(1)
+WELCOME_GUIDE_PATH = '05_Quick_Reference/Welcome_Guide.html'
 
+# Default in-flight request limit for --async-folders
+FOLDER_CONCURRENCY = int(os.getenv('SHP_FOLDER_CONCURRENCY', '8'))
+
+
+def expand_folder_tree(folders: List[str]) -> List[str]:
+    """Add any missing ancestors and order the tree so parents precede children"""
+    paths = set()
+    for folder_path in folders:
+        parts = folder_path.strip('/').split('/')
+        for depth in range(1, len(parts) + 1):
+            paths.add('/'.join(parts[:depth]))
+
+    ordered = [folder_path.strip('/') for folder_path in folders]
+    ordered = list(dict.fromkeys(ordered))
+    missing = paths - set(ordered)
+    ordered.extend(sorted(missing))
+    return sorted(ordered, key=lambda folder_path: folder_path.count('/'))
+
+
+def error_detail(response) -> str:
+    """Status plus Graph error code and message, for failure messages"""
+    try:
+        error = response.json().get('error') or {}
+    except ValueError:
+        error = {}
+    detail = f"HTTP {response.status_code}"
+    if error.get('code'):
+        detail += f" {error['code']}"
+    if error.get('message'):
+        detail += f": {error['message']}"
+    return detail
+
+
+def load_folder_list(path: str) -> List[str]:
+    """Read folder paths from a file, one per line (# starts a comment)"""
+    folders = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                folders.append(line)
+    return folders
 
-class SharePointSetup:
-    """Setup SharePoint site structure using Microsoft Graph API"""
 
-    def __init__(self):
-        self.access_token = None
+class SharePointSetup:
+    """Setup SharePoint site structure using Microsoft Graph API
+
+    The site and app credentials default to the .env configuration; pass
+    them explicitly to provision other sites or tenants from one process.
+    """
+
+    def __init__(self, folders: List[str] = None, folder_concurrency: int = 0, tracer: GraphTracer = None,
+                 site_url: str = None, tenant_id: str = None, client_id: str = None, client_secret: str = None):
+        self.site_url = site_url or SITE_URL
+        self.tenant_id = tenant_id or TENANT_ID
+        self.client_id = client_id or CLIENT_ID
+        self.client_secret = client_secret or CLIENT_SECRET
+        self.folders = folders or FOLDER_STRUCTURE
+        self.folder_concurrency = folder_concurrency
+        self.tracer = tracer
+        self.tokens = None
         self.site_id = None
         self.drive_id = None
-        self.headers = {}
+        self.resolver = None
+        self.http = get_transport()
 
         # Tech Innovation theme colors
-        self.theme_colors = {
-            "primary": "#0078D4",
-            "secondary": "#50E6FF",
-            "accent": "#0063B1",
-            "success": "#107C10",
-            "warning": "#FFB900",
-            "danger": "#E81123",
-            "background": "#F3F2F1",
-            "card": "#FFFFFF",
-            "text_primary": "#323130",
-            "text_secondary": "#605E5C",
-            "border": "#D0CCCB"
+        self.theme_colors = dict(THEME_COLORS)
+
+    def step(self, name: str):
+        """Time a setup step when tracing is enabled"""
+        return self.tracer.step(name) if self.tracer else contextlib.nullcontext()
+
+    @property
+    def access_token(self):
+        """Current access token (refreshed by the token provider before expiry)"""
+        return self.tokens.get_token() if self.tokens else None
+
+    @property
+    def headers(self):
+        if not self.tokens:
+            return {}
+        return {
+            'Authorization': f'Bearer {self.access_token}',
+            'Content-Type': 'application/json'
         }
 
     def authenticate(self):
-        """Get access token from Azure AD"""
+        """Get access token from Azure AD (or the local token cache)"""
         print("🔐 Authenticating with Azure AD...")
 
-        url = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
-        data = {
-            'client_id': CLIENT_ID,
-            'client_secret': CLIENT_SECRET,
-            'scope': 'https://graph.microsoft.com/.default',
-            'grant_type': 'client_credentials'
-        }
-
         try:
-            response = requests.post(url, data=data)
-            response.raise_for_status()
-            self.access_token = response.json().get('access_token')
-            self.headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
+            self.tokens = get_token_provider(self.tenant_id, self.client_id, self.client_secret)
+            self.tokens.get_token()
             print("✅ Authentication successful")
             return True
         except Exception as e:
+            self.tokens = None
             print(f"❌ Authentication failed: {e}")
             return False
 
     def get_site_info(self):
-        """Get SharePoint site ID and drive ID"""
+        """Get SharePoint site ID and drive ID (cached between runs)"""
         print("\n📍 Getting site information...")
 
-        # Parse site URL
-        from urllib.parse import urlparse
-        parsed = urlparse(SITE_URL)
-        hostname = parsed.netloc
-        site_path = parsed.path.lstrip('/')
-
-        # Get site ID
-        url = f"https://graph.microsoft.com/v1.0/sites/{hostname}:/{site_path}"
-
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            site_info = response.json()
-            self.site_id = site_info.get('id')
+            self.resolver = GraphResolver(self.site_url, self.tokens)
+            ids = self.resolver.resolve()
+            self.site_id = ids['site_id']
+            self.drive_id = ids['drive_id']
             print(f"✅ Site ID: {self.site_id}")
 
-            # Get default document library (drive)
-            drives_url = f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/drives"
-            response = requests.get(drives_url, headers=self.headers)
-            response.raise_for_status()
-
-            drives = response.json().get('value', [])
-            for drive in drives:
-                if drive.get('name') == 'Shared Documents' or 'Documents' in drive.get('name', ''):
-                    self.drive_id = drive.get('id')
-                    print(f"✅ Drive ID: {self.drive_id}")
-                    return True
-
-            # Use first drive if specific one not found
-            if drives:
-                self.drive_id = drives[0].get('id')
-                print(f"✅ Using default drive: {self.drive_id}")
-                return True
+            if not self.drive_id:
+                print("❌ No document library found on site")
+                return False
+
+            print(f"✅ Drive ID: {self.drive_id}")
+            return True
 
         except Exception as e:
             print(f"❌ Failed to get site info: {e}")
             return False
 
-    def create_folder_structure(self):
-        """Create the document library folder structure"""
+    def create_folder_structure(self, folders: List[str] = None):
+        """Create the document library folder structure
+
+        Uses Graph $batch by default, or concurrent per-folder requests when
+        a folder concurrency limit is set.
+        """
         print("\n📁 Creating folder structure...")
 
-        folders = [
-            "01_Policies",
-            "01_Policies/Core_Policies",
-            "01_Policies/Supporting_Policies",
-            "02_Procedures",
-            "02_Procedures/Operational",
-            "02_Procedures/Emergency",
-            "03_Training",
-            "03_Training/Staff_Training",
-            "03_Training/Contractor_Materials",
-            "03_Training/Assessments",
-            "04_Forms_Templates",
-            "04_Forms_Templates/Access_Requests",
-            "04_Forms_Templates/Incident_Reports",
-            "04_Forms_Templates/Change_Requests",
-            "05_Quick_Reference",
-            "05_Quick_Reference/FAQ",
-            "05_Quick_Reference/Contacts",
-            "06_Archive",
-            "06_Archive/Previous_Versions"
-        ]
-
-        created_count = 0
+        folders = expand_folder_tree(folders or self.folders)
+        if self.folder_concurrency > 0:
+            results = asyncio.run(self.create_folders_async(folders, self.folder_concurrency))
+        else:
+            results = self.create_folders_batch(folders)
+
+        counts = {'created': 0, 'exists': 0, 'throttled': 0, 'failed': 0}
         for folder_path in folders:
-            if self.create_folder(folder_path):
-                created_count += 1
+            status = results.get(folder_path, 'failed')
+            counts[status] += 1
+            if status == 'created':
                 print(f"  ✅ Created: {folder_path}")
+            elif status == 'exists':
+                print(f"  ⚠️  Exists: {folder_path}")
+            elif status == 'throttled':
+                print(f"  🚦 Throttled: {folder_path}")
             else:
-                print(f"  ⚠️  Exists or skipped: {folder_path}")
+                print(f"  ❌ Failed: {folder_path}")
 
-        print(f"✅ Created {created_count} folders")
-        return True
+        print(f"✅ Created {counts['created']} folders ({counts['exists']} existed, "
+              f"{counts['throttled']} throttled, {counts['failed']} failed)")
+        return counts['throttled'] == 0 and counts['failed'] == 0
+
+    def create_folders_batch(self, folders: List[str]) -> Dict[str, str]:
+        """Create folders in $batch envelopes, returning a status per path
+
+        Children depend on their parent through dependsOn. When a parent
+        already exists (409) Graph fails its dependents with 424, so those
+        are sent again in a second round without the dependency.
+        """
+        results = {}
+        pending = list(folders)
+
+        while pending:
+            ids = {folder_path: str(index + 1) for index, folder_path in enumerate(pending)}
+            batch_requests = []
+            for folder_path in pending:
+                request = self.folder_request(folder_path, ids[folder_path])
+                parent_path = folder_path.rpartition('/')[0]
+                if parent_path in ids:
+                    request['dependsOn'] = [ids[parent_path]]
+                batch_requests.append(request)
+
+            try:
+                responses = send_batch(batch_requests, self.headers)
+            except Exception as e:
+                print(f"  ❌ Batch request failed: {e}")
+                break
+
+            retry = []
+            for folder_path in pending:
+                status = responses.get(ids[folder_path], {}).get('status')
+                if status == 201:
+                    results[folder_path] = 'created'
+                elif status == 409:
+                    results[folder_path] = 'exists'
+                elif status == 424:
+                    retry.append(folder_path)
+                elif status in THROTTLE_STATUSES:
+                    results[folder_path] = 'throttled'
+                else:
+                    results[folder_path] = 'failed'
+
+            # Retry children whose parent now exists or is being retried with them
+            retrying = set(retry)
+            pending = [
+                folder_path for folder_path in retry
+                if results.get(folder_path.rpartition('/')[0]) in ('created', 'exists')
+                or folder_path.rpartition('/')[0] in retrying
+            ]
+            if len(pending) == len(ids):
+                break
+
+        return results
+
+    def folder_request(self, folder_path: str, request_id: str) -> Dict[str, Any]:
+        """Build a $batch request that creates a single folder"""
+        parent_path, _, folder_name = folder_path.rpartition('/')
+        if parent_path:
+            url = f"/drives/{self.drive_id}/root:/{parent_path}:/children"
+        else:
+            url = f"/drives/{self.drive_id}/root/children"
+
+        return {
+            "id": request_id,
+            "method": "POST",
+            "url": url,
+            "headers": {"Content-Type": "application/json"},
+            "body": {
+                "name": folder_name,
+                "folder": {},
+                "@microsoft.graph.conflictBehavior": "fail"
+            }
+        }
 
     def create_folder(self, folder_path: str):
         """Create a single folder in SharePoint"""
-        url = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/{folder_path}:/children"
+        return self.create_folder_status(folder_path) == 'created'
 
-        # For nested folders, ensure parent exists first
-        if '/' in folder_path:
-            parent_path = '/'.join(folder_path.split('/')[:-1])
-            folder_name = folder_path.split('/')[-1]
-            url = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/{parent_path}:/children"
+    def create_folder_status(self, folder_path: str) -> str:
+        """Create a single folder, returning created, exists, throttled or failed"""
+        parent_path, _, folder_name = folder_path.rpartition('/')
+        if parent_path:
+            url = f"{GRAPH_URL}/drives/{self.drive_id}/root:/{parent_path}:/children"
         else:
-            folder_name = folder_path
-            url = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root/children"
+            url = f"{GRAPH_URL}/drives/{self.drive_id}/root/children"
 
         data = {
             "name": folder_name,
@@ -178,74 +286,56 @@ class SharePointSetup:
         }
 
         try:
-            response = requests.post(url, headers=self.headers, json=data)
+            response = self.http.post(url, headers=self.headers, json=data)
             if response.status_code == 201:
-                return True
+                return 'created'
             elif response.status_code == 409:  # Already exists
-                return False
+                return 'exists'
+            elif response.status_code in THROTTLE_STATUSES:
+                return 'throttled'
             else:
-                return False
-        except:
-            return False
+                print(f"  ❌ {folder_path}: {error_detail(response)}")
+                return 'failed'
+        except Exception as e:
+            print(f"  ❌ {folder_path}: {e}")
+            return 'failed'
+
+    async def create_folders_async(self, folders: List[str], concurrency: int = FOLDER_CONCURRENCY) -> Dict[str, str]:
+        """Create folders concurrently, returning a status per path
+
+        Every folder waits only for its own parent, so independent subtrees
+        proceed in parallel and the run takes time proportional to tree
+        depth. At most `concurrency` requests are in flight at once.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = {}
+
+        async def create(folder_path: str) -> str:
+            parent_path = folder_path.rpartition('/')[0]
+            if parent_path in tasks and await tasks[parent_path] not in ('created', 'exists'):
+                return 'failed'
+            async with semaphore:
+                return await loop.run_in_executor(executor, self.create_folder_status, folder_path)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for folder_path in folders:
+                tasks[folder_path] = asyncio.ensure_future(create(folder_path))
+            statuses = await asyncio.gather(*tasks.values())
+
+        return dict(zip(tasks.keys(), statuses))
 
     def create_lists(self):
         """Create SharePoint lists for tracking"""
         print("\n📋 Creating SharePoint lists...")
 
         # Create Training Records list
-        list_definition = {
-            "displayName": "Training Records",
-            "description": "Track staff security training completion and compliance",
-            "list": {
-                "template": "genericList"
-            },
-            "columns": [
-                {
-                    "name": "StaffMember",
-                    "displayName": "Staff Member",
-                    "text": {}
-                },
-                {
-                    "name": "TrainingCourse",
-                    "displayName": "Training Course",
-                    "text": {}
-                },
-                {
-                    "name": "CompletionDate",
-                    "displayName": "Completion Date",
-                    "dateTime": {}
-                },
-                {
-                    "name": "NextReviewDate",
-                    "displayName": "Next Review Date",
-                    "dateTime": {}
-                },
-                {
-                    "name": "Score",
-                    "displayName": "Score (%)",
-                    "number": {}
-                },
-                {
-                    "name": "Status",
-                    "displayName": "Status",
-                    "choice": {
-                        "choices": ["Not Started", "In Progress", "Completed", "Expired"]
-                    }
-                },
-                {
-                    "name": "Notes",
-                    "displayName": "Notes",
-                    "text": {
-                        "allowMultipleLines": True
-                    }
-                }
-            ]
-        }
+        list_definition = TRAINING_RECORDS_LIST
 
         try:
             # Create the list
-            url = f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/lists"
-            response = requests.post(url, headers=self.headers, json=list_definition)
+            url = f"{GRAPH_URL}/sites/{self.site_id}/lists"
+            response = self.http.post(url, headers=self.headers, json=list_definition)
 
             if response.status_code == 201:
                 print("✅ Training Records list created")
@@ -254,7 +344,7 @@ class SharePointSetup:
                 print("⚠️  Training Records list already exists")
                 return True
             else:
-                print(f"❌ Failed to create list: {response.status_code}")
+                print(f"❌ Failed to create list: {error_detail(response)}")
                 return False
 
         except Exception as e:
@@ -265,6 +355,24 @@ class SharePointSetup:
         """Upload a welcome document to the Quick Reference folder"""
         print("\n📄 Creating welcome document...")
 
+        html_content = self.render_welcome_document()
+
+        try:
+            # Upload to Quick Reference folder
+            uploader = GraphUploader(self.drive_id, self.tokens, manifest=UploadManifest())
+            item = uploader.upload_bytes(html_content.encode('utf-8'), WELCOME_GUIDE_PATH, 'text/html')
+            if item.get('skipped'):
+                print("⏭️  Welcome guide unchanged, upload skipped")
+            else:
+                print("✅ Welcome guide uploaded")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error uploading welcome guide: {e}")
+            return False
+
+    def render_welcome_document(self) -> str:
+        """Build the HTML welcome guide"""
         welcome_content = f"""
 # ETHOS Information Security Management System
 ## Staff Portal User Guide
@@ -348,53 +456,20 @@ Your training completion is tracked in the Training Records list. You can:
 
 ---
 
-*Last Updated: {datetime.now().strftime('%B %d, %Y')}*
-*Version: 1.0*
+*Last Updated: {WELCOME_GUIDE_UPDATED}*
+*Version: {WELCOME_GUIDE_VERSION}*
 *Classification: Internal Use*
         """
 
         # Convert to HTML for better SharePoint rendering
-        html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>ISMS Portal Welcome Guide</title>
-    <style>
-        body {{ font-family: 'Segoe UI', sans-serif; color: {self.theme_colors['text_primary']}; }}
-        h1 {{ color: {self.theme_colors['primary']}; }}
-        h2 {{ color: {self.theme_colors['accent']}; }}
-        h3 {{ color: {self.theme_colors['text_primary']}; }}
-        .highlight {{ background: linear-gradient(135deg, rgba(0,120,212,0.1), rgba(80,230,255,0.1)); padding: 15px; border-left: 4px solid {self.theme_colors['primary']}; margin: 20px 0; }}
-        .footer {{ margin-top: 50px; padding-top: 20px; border-top: 1px solid {self.theme_colors['border']}; color: {self.theme_colors['text_secondary']}; }}
-    </style>
-</head>
-<body>
-    {welcome_content.replace('# ', '<h1>').replace('## ', '<h2>').replace('### ', '<h3>').replace('---', '<hr>')}
-</body>
-</html>
-        """
-
-        try:
-            # Upload to Quick Reference folder
-            url = f"https://graph.microsoft.com/v1.0/drives/{self.drive_id}/root:/05_Quick_Reference/Welcome_Guide.html:/content"
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'text/html'
-            }
+        html_content = render_document(welcome_content, 'ISMS Portal Welcome Guide', self.theme_colors)
+        return html_content
 
-            response = requests.put(url, headers=headers, data=html_content.encode('utf-8'))
-
-            if response.status_code in [200, 201]:
-                print("✅ Welcome guide uploaded")
-                return True
-            else:
-                print(f"⚠️  Welcome guide upload issue: {response.status_code}")
-                return False
-
-        except Exception as e:
-            print(f"❌ Error uploading welcome guide: {e}")
-            return False
+    def seed_documents(self) -> Dict[str, Any]:
+        """Documents the site should contain: remote path -> (content, content type)"""
+        return {
+            WELCOME_GUIDE_PATH: (self.render_welcome_document().encode('utf-8'), 'text/html')
+        }
 
     def create_sample_training_record(self):
         """Create a sample training record for demonstration"""
@@ -402,15 +477,7 @@ Your training completion is tracked in the Training Records list. You can:
 
         # First, get the Training Records list ID
         try:
-            url = f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/lists"
-            response = requests.get(url, headers=self.headers)
-            lists = response.json().get('value', [])
-
-            training_list_id = None
-            for lst in lists:
-                if lst.get('displayName') == 'Training Records':
-                    training_list_id = lst.get('id')
-                    break
+            training_list_id = self.resolver.list_id('Training Records')
 
             if not training_list_id:
                 print("⚠️  Training Records list not found")
@@ -430,59 +497,87 @@ Your training completion is tracked in the Training Records list. You can:
                 }
             }
 
-            url = f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/lists/{training_list_id}/items"
-            response = requests.post(url, headers=self.headers, json=sample_record)
+            url = f"{GRAPH_URL}/sites/{self.site_id}/lists/{training_list_id}/items"
+            response = self.http.post(url, headers=self.headers, json=sample_record)
 
             if response.status_code == 201:
                 print("✅ Sample training record created")
                 return True
             else:
-                print(f"⚠️  Could not create sample record: {response.status_code}")
+                print(f"⚠️  Could not create sample record: {error_detail(response)}")
                 return False
 
         except Exception as e:
             print(f"❌ Error creating sample record: {e}")
             return False
 
+    def plan_site(self, apply_changes: bool = False):
+        """Diff the site against the desired state, applying the plan if asked"""
+        if not self.authenticate() or not self.get_site_info():
+            return False
+
+        planner = ProvisionPlanner(self, expand_folder_tree(self.folders),
+                                   [TRAINING_RECORDS_LIST], self.seed_documents())
+
+        print("\n🔎 Reading current site state...")
+        operations = planner.plan()
+        planner.print_plan(operations)
+
+        if not apply_changes or not operations:
+            return True
+
+        print("\n🚀 Applying plan...")
+        counts = planner.apply(operations)
+        print(f"\n✅ Applied {counts['succeeded']} operation(s), {counts['failed']} failed")
+        print(f"🚦 Graph traffic: {self.http.stats.summary()}")
+        return counts['failed'] == 0
+
     def setup_site(self):
         """Main setup orchestration"""
         print("\n" + "="*50)
         print("   ETHOS ISMS SHAREPOINT SITE SETUP")
         print("="*50)
-        print(f"Site: {SITE_URL}")
+        print(f"Site: {self.site_url}")
         print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print("="*50 + "\n")
 
         # Step 1: Authenticate
-        if not self.authenticate():
-            return False
+        with self.step('auth'):
+            if not self.authenticate():
+                return False
 
         # Step 2: Get site information
-        if not self.get_site_info():
-            return False
+        with self.step('site_info'):
+            if not self.get_site_info():
+                return False
 
         # Step 3: Create folder structure
-        self.create_folder_structure()
+        with self.step('folders'):
+            self.create_folder_structure()
 
         # Step 4: Create lists
-        self.create_lists()
+        with self.step('lists'):
+            self.create_lists()
 
         # Step 5: Upload welcome document
-        self.upload_welcome_document()
+        with self.step('welcome_doc'):
+            self.upload_welcome_document()
 
         # Step 6: Create sample training record
-        self.create_sample_training_record()
+        with self.step('sample_record'):
+            self.create_sample_training_record()
 
         print("\n" + "="*50)
         print("✅ SHAREPOINT SETUP COMPLETE!")
         print("="*50)
+        print(f"🚦 Graph traffic: {self.http.stats.summary()}")
         print("\nNext steps:")
         print("1. Run sync_confluence_to_sharepoint.py to upload content")
         print("2. Configure Microsoft Forms for training quiz")
         print("3. Add staff members to appropriate security groups")
         print("4. Test the site with a few pilot users")
         print("5. Schedule staff training on using the portal")
-        print("\n📌 Site URL:", SITE_URL)
+        print("\n📌 Site URL:", self.site_url)
         print("📧 Support: security@ethos.co.im")
         print("\n" + "="*50 + "\n")
 
@@ -491,10 +586,40 @@ Your training completion is tracked in the Training Records list. You can:
 
 def main():
     """Main execution function"""
-    setup = SharePointSetup()
+    parser = argparse.ArgumentParser(description="Set up the ETHOS ISMS SharePoint site")
+    parser.add_argument('command', nargs='?', default='setup', choices=['setup', 'plan', 'apply'],
+                        help="setup: run every step; plan: show what differs; apply: converge the site")
+    parser.add_argument('--folders', help="file listing folder paths to create (one per line)")
+    parser.add_argument('--async-folders', action='store_true',
+                        help="create folders concurrently instead of through $batch")
+    parser.add_argument('--concurrency', type=int, default=FOLDER_CONCURRENCY,
+                        help=f"max in-flight folder requests with --async-folders (default {FOLDER_CONCURRENCY})")
+    parser.add_argument('--trace-log', default=TRACE_LOG, metavar='FILE',
+                        help="append one JSON line per Graph request to FILE (SHP_TRACE_LOG)")
+    parser.add_argument('--metrics', default=METRICS_FILE, metavar='FILE',
+                        help="write OpenMetrics request metrics to FILE at exit (SHP_METRICS_FILE)")
+    parser.add_argument('--timings', action='store_true', help="print a per-step timing summary")
+    args = parser.parse_args()
+
+    # Validate configuration
+    if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET, SITE_URL]):
+        print("❌ Missing SharePoint configuration in .env file")
+        sys.exit(1)
+
+    tracer = None
+    if args.trace_log or args.metrics or args.timings:
+        tracer = GraphTracer(args.trace_log, args.metrics).attach()
+
+    folders = load_folder_list(args.folders) if args.folders else None
+    setup = SharePointSetup(folders=folders,
+                            folder_concurrency=args.concurrency if args.async_folders else 0,
+                            tracer=tracer)
 
     try:
-        success = setup.setup_site()
+        if args.command == 'setup':
+            success = setup.setup_site()
+        else:
+            success = setup.plan_site(apply_changes=args.command == 'apply')
         sys.exit(0 if success else 1)
 
     except KeyboardInterrupt:
@@ -507,6 +632,12 @@ def main():
         traceback.print_exc()
         sys.exit(1)
 
+    finally:
+        if tracer:
+            if args.timings:
+                tracer.print_summary()
+            tracer.close()
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
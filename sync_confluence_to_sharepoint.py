@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Sync an exported ISMS document tree into the SharePoint library
+Walks a local export (e.g. from Confluence), files each document into the
+library folder tree by its ISMS_POL_/ISMS_PRO_/ISMS_TRN_ name, and uploads
+them through a bounded worker pool: a single PUT for small files, an upload
+session for large ones, and nothing for documents whose content is unchanged
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+from typing import Dict, List, Any, Optional, Tuple
+
+from graph_auth import get_token_provider
+from graph_manifest import UploadManifest
+from graph_resolver import GraphResolver
+from graph_upload import UPLOAD_THRESHOLD, UPLOAD_WORKERS, GraphUploader
+from isms_schema import DOCUMENT_RULES
+
+load_dotenv()
+
+# Configuration from .env
+TENANT_ID = os.getenv('SHP_TENANT_ID')
+CLIENT_ID = os.getenv('SHP_ID_APP')
+CLIENT_SECRET = os.getenv('SHP_ID_APP_SECRET')
+SITE_URL = os.getenv('SHP_SITE_URL')
+
+# Document types worth syncing; export artefacts (attachments indexes, styles) are not
+SYNC_EXTENSIONS = {'.html', '.htm', '.pdf', '.docx', '.doc', '.xlsx', '.xls', '.pptx', '.md', '.txt'}
+
+RULES = [(re.compile(pattern, re.I), folder) for pattern, folder in DOCUMENT_RULES]
+
+
+def library_folder(name: str) -> Optional[str]:
+    """Library folder for a document name, or None if no rule matches"""
+    for pattern, folder in RULES:
+        if pattern.search(name):
+            return folder
+    return None
+
+
+def plan_sync(source: Path, unmatched_folder: str = None) -> Tuple[List[Tuple[Path, str]], List[Path]]:
+    """Map the files under source to library paths
+
+    Returns (uploads, unmatched). When two files map to the same library
+    path (the same document exported twice), the newest one wins.
+    """
+    chosen: Dict[str, Path] = {}
+    unmatched = []
+    for path in sorted(source.rglob('*')):
+        relative = path.relative_to(source)
+        if not path.is_file() or path.suffix.lower() not in SYNC_EXTENSIONS:
+            continue
+        if any(part.startswith(('.', '~$')) for part in relative.parts):
+            continue
+
+        folder = library_folder(path.name) or unmatched_folder
+        if folder is None:
+            unmatched.append(relative)
+            continue
+        remote_path = f"{folder.strip('/')}/{path.name}"
+        current = chosen.get(remote_path)
+        if current is None or path.stat().st_mtime > current.stat().st_mtime:
+            chosen[remote_path] = path
+    return [(path, remote_path) for remote_path, path in sorted(chosen.items())], unmatched
+
+
+def format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size:,} bytes"
+    if size < 1024 * 1024:
+        return f"{size / 1024:,.1f} KB"
+    return f"{size / 1024 / 1024:,.1f} MB"
+
+
+class SyncProgress:
+    """Per-file progress lines and running throughput for upload_many"""
+
+    def __init__(self, uploads: List[Tuple[Path, str]], threshold: int = UPLOAD_THRESHOLD):
+        self.sizes = {remote_path: path.stat().st_size for path, remote_path in uploads}
+        self.total = len(uploads)
+        self.threshold = threshold
+        self.counts = {'uploaded': 0, 'chunked': 0, 'skipped': 0, 'failed': 0}
+        self.bytes_sent = 0
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def __call__(self, remote_path: str, result: Any):
+        self.done += 1
+        size = self.sizes[remote_path]
+        if isinstance(result, Exception):
+            self.counts['failed'] += 1
+            status = f"❌ {result}"
+        elif result.get('skipped'):
+            self.counts['skipped'] += 1
+            status = "⏭️  unchanged"
+        else:
+            self.counts['uploaded'] += 1
+            self.bytes_sent += size
+            chunked = size > self.threshold
+            self.counts['chunked'] += 1 if chunked else 0
+            status = f"✅ {format_size(size)}{' (upload session)' if chunked else ''}"
+
+        elapsed = max(time.perf_counter() - self.started, 1e-6)
+        print(f"  [{self.done}/{self.total}] {remote_path} {status} "
+              f"- {self.done / elapsed:.1f} files/s, {self.bytes_sent / elapsed / 1024 / 1024:.2f} MB/s")
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        rate = self.bytes_sent / elapsed / 1024 / 1024 if elapsed else 0.0
+        return (f"{self.counts['uploaded']} uploaded ({self.counts['chunked']} via upload sessions), "
+                f"{self.counts['skipped']} unchanged, {self.counts['failed']} failed in {elapsed:.1f}s "
+                f"({self.bytes_sent / 1024 / 1024:.2f} MB, {rate:.2f} MB/s)")
+
+
+def main():
+    """Sync a local export tree into the ISMS document library"""
+    parser = argparse.ArgumentParser(description="Sync exported ISMS documents into SharePoint")
+    parser.add_argument('source', help="root of the exported document tree")
+    parser.add_argument('--workers', type=int, default=UPLOAD_WORKERS,
+                        help=f"files uploaded in parallel (default {UPLOAD_WORKERS})")
+    parser.add_argument('--unmatched', metavar='FOLDER',
+                        help="library folder for files no naming rule matches (default: skip them)")
+    parser.add_argument('--force', action='store_true', help="upload even when the content is unchanged")
+    parser.add_argument('--dry-run', action='store_true', help="show where each file would go and stop")
+    args = parser.parse_args()
+
+    source = Path(args.source)
+    if not source.is_dir():
+        print(f"❌ {source} is not a directory")
+        sys.exit(1)
+
+    uploads, unmatched = plan_sync(source, args.unmatched)
+    print(f"📂 {len(uploads)} document(s) to sync from {source}, {len(unmatched)} unmatched")
+    for relative in unmatched:
+        print(f"  ⚠️  No library folder for {relative} (skipped)")
+
+    if args.dry_run:
+        for path, remote_path in uploads:
+            print(f"  {path.relative_to(source)} -> {remote_path}")
+        return
+    if not uploads:
+        return
+
+    if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET, SITE_URL]):
+        print("❌ Missing SharePoint configuration in .env file")
+        sys.exit(1)
+
+    tokens = get_token_provider(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
+    manifest = None if args.force else UploadManifest()
+    uploader = GraphUploader(GraphResolver(SITE_URL, tokens).drive_id, tokens, manifest=manifest)
+
+    print(f"\n📤 Uploading with {args.workers} worker(s)...")
+    progress = SyncProgress(uploads, uploader.threshold)
+    try:
+        uploader.upload_many(uploads, args.workers, progress=progress)
+    except KeyboardInterrupt:
+        print("\n\n⛔ Sync cancelled by user (large uploads resume on the next run)")
+        sys.exit(1)
+
+    print(f"\n✅ Sync complete: {progress.summary()}")
+    print(f"🚦 Graph traffic: {uploader.http.stats.summary()}")
+    sys.exit(1 if progress.counts['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
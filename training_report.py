@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Training compliance report over the Training Records list
+Keeps a columnar snapshot of the list (only the columns the report needs)
+under SHP_CACHE_DIR and refreshes it with a list-item delta query, so a
+re-run fetches only changed items. Overdue and expiring records and
+per-course figures are computed column-wise (with numpy when installed)
+and written as JSON, CSV and HTML
+"""
+
+import os
+import csv
+import sys
+import json
+import html
+import time
+import argparse
+from pathlib import Path
+from string import Template
+from datetime import date, datetime
+from dotenv import load_dotenv
+from typing import Dict, List, Any, Optional, Tuple
+
+from graph_auth import get_token_provider
+from graph_cache import CACHE_DIR, load_json, save_json
+from graph_resolver import GraphResolver
+from graph_transport import GRAPH_URL, get_transport
+from isms_schema import THEME_COLORS, TRAINING_RECORDS_LIST
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+load_dotenv()
+
+# Configuration from .env
+TENANT_ID = os.getenv('SHP_TENANT_ID')
+CLIENT_ID = os.getenv('SHP_ID_APP')
+CLIENT_SECRET = os.getenv('SHP_ID_APP_SECRET')
+SITE_URL = os.getenv('SHP_SITE_URL')
+
+SNAPSHOT_DIR = CACHE_DIR / 'training_report'
+REPORT_DIR = Path(__file__).resolve().parent / 'build' / 'training_report'
+
+# Records due for review within this many days count as expiring
+EXPIRY_WINDOW = int(os.getenv('SHP_TRAINING_EXPIRY_DAYS', '30'))
+DELTA_PAGE_SIZE = 999
+
+TEXT_COLUMNS = ['StaffMember', 'TrainingCourse', 'Status']
+DATE_COLUMNS = ['CompletionDate', 'NextReviewDate']
+NUMBER_COLUMNS = ['Score']
+REPORT_FIELDS = TEXT_COLUMNS + DATE_COLUMNS + NUMBER_COLUMNS
+NO_COURSE = '(no course)'
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Training Compliance Report</title>
+    <style>
+        body { font-family: 'Segoe UI', sans-serif; color: $text_primary; background: $background; margin: 30px; }
+        h1 { color: $primary; }
+        h2 { color: $accent; margin-top: 35px; }
+        .summary { display: flex; gap: 20px; flex-wrap: wrap; }
+        .figure { background: $card; border-left: 4px solid $primary; padding: 15px 25px; border-radius: 6px; }
+        .figure strong { display: block; font-size: 2em; }
+        .figure.danger { border-color: $danger; }
+        .figure.warning { border-color: $warning; }
+        table { border-collapse: collapse; background: $card; width: 100%; }
+        th, td { text-align: left; padding: 8px 12px; border-bottom: 1px solid $border; }
+        th { background: $primary; color: white; }
+        .muted { color: $text_secondary; }
+    </style>
+</head>
+<body>
+$body
+</body>
+</html>
+"""
+
+
+def parse_date(value: Any) -> int:
+    """Day ordinal of a Graph dateTime value, or 0 when empty"""
+    if not value:
+        return 0
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return 0
+
+
+def format_date(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat() if ordinal else ''
+
+
+class TrainingSnapshot:
+    """Columnar copy of the Training Records list, kept current with delta queries
+
+    Each column is a plain list indexed by row; `index` maps item IDs to
+    rows. Dates are day ordinals (0 when empty) and a missing score is
+    None, so the columns convert straight to arrays.
+    """
+
+    def __init__(self, site_id: str, list_id: str, tokens, snapshot_file: Path = None):
+        self.site_id = site_id
+        self.list_id = list_id
+        self.tokens = tokens
+        self.snapshot_file = Path(snapshot_file or SNAPSHOT_DIR / f"{list_id}.json")
+        self.http = get_transport()
+
+        state = load_json(self.snapshot_file, {})
+        self.delta_link: Optional[str] = state.get('delta_link')
+        self.synced_at: Optional[str] = state.get('synced_at')
+        self.ids: List[str] = state.get('ids', [])
+        self.columns: Dict[str, List[Any]] = {name: state.get('columns', {}).get(name, [None] * len(self.ids))
+                                              for name in REPORT_FIELDS}
+        self.index = {item_id: row for row, item_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def reset(self):
+        """Forget the snapshot so the next sync reads the whole list"""
+        self.delta_link = None
+        self.ids = []
+        self.columns = {name: [] for name in REPORT_FIELDS}
+        self.index = {}
+
+    def _set(self, item_id: str, fields: Dict[str, Any]):
+        row = self.index.get(item_id)
+        if row is None:
+            row = self.index[item_id] = len(self.ids)
+            self.ids.append(item_id)
+            for column in self.columns.values():
+                column.append(None)
+        for name in TEXT_COLUMNS:
+            self.columns[name][row] = str(fields.get(name) or '').strip()
+        for name in DATE_COLUMNS:
+            self.columns[name][row] = parse_date(fields.get(name))
+        for name in NUMBER_COLUMNS:
+            value = fields.get(name)
+            self.columns[name][row] = float(value) if value not in (None, '') else None
+
+    def _remove(self, item_id: str) -> bool:
+        """Drop a row by moving the last row into its place"""
+        row = self.index.pop(item_id, None)
+        if row is None:
+            return False
+        last = len(self.ids) - 1
+        if row != last:
+            self.ids[row] = self.ids[last]
+            self.index[self.ids[row]] = row
+            for column in self.columns.values():
+                column[row] = column[last]
+        self.ids.pop()
+        for column in self.columns.values():
+            column.pop()
+        return True
+
+    def sync(self) -> Dict[str, int]:
+        """Apply the changes since the last sync and save the snapshot"""
+        stats = {'pages': 0, 'updated': 0, 'deleted': 0}
+        url = self.delta_link or (
+            f"{GRAPH_URL}/sites/{self.site_id}/lists/{self.list_id}/items/delta"
+            f"?$select=id&$expand=fields($select={','.join(REPORT_FIELDS)})&$top={DELTA_PAGE_SIZE}"
+        )
+        if self.delta_link is None:
+            self.reset()
+
+        while url:
+            response = self.http.get(url, headers=self.tokens.auth_headers())
+            if response.status_code == 410:
+                # Delta token expired: Graph requires a full resync
+                print("⚠️  Delta token expired, rereading the whole list")
+                self.reset()
+                return self.sync()
+            response.raise_for_status()
+            page = response.json()
+            stats['pages'] += 1
+
+            for item in page.get('value', []):
+                if 'deleted' in item:
+                    stats['deleted'] += 1 if self._remove(item['id']) else 0
+                else:
+                    self._set(item['id'], item.get('fields') or {})
+                    stats['updated'] += 1
+
+            url = page.get('@odata.nextLink')
+            if not url:
+                self.delta_link = page.get('@odata.deltaLink')
+                self.synced_at = datetime.now().isoformat(timespec='seconds')
+
+        self.save()
+        return stats
+
+    def save(self):
+        try:
+            save_json(self.snapshot_file, {'delta_link': self.delta_link, 'synced_at': self.synced_at,
+                                           'ids': self.ids, 'columns': self.columns})
+        except OSError as e:
+            print(f"⚠️  Could not write training report snapshot: {e}")
+
+
+def _flags_numpy(columns: Dict[str, List[Any]], today: int, window: int) -> Tuple[List[bool], List[bool], Dict[str, Dict[str, Any]]]:
+    review = np.asarray(columns['NextReviewDate'], dtype=np.int64)
+    status = np.asarray(columns['Status'], dtype=object)
+    score = np.asarray([np.nan if value is None else value for value in columns['Score']], dtype=np.float64)
+    courses = np.asarray([course or NO_COURSE for course in columns['TrainingCourse']], dtype=object)
+
+    scheduled = review > 0
+    overdue = (scheduled & (review < today)) | (status == 'Expired')
+    expiring = scheduled & (review >= today) & (review <= today + window) & ~overdue
+    completed = status == 'Completed'
+    scored = ~np.isnan(score)
+
+    names, course_index = np.unique(courses.astype(str), return_inverse=True)
+    size = len(names)
+    records = np.bincount(course_index, minlength=size)
+    score_count = np.bincount(course_index[scored], minlength=size)
+    score_total = np.bincount(course_index[scored], weights=score[scored], minlength=size)
+    totals = {
+        'completed': np.bincount(course_index, weights=completed, minlength=size),
+        'overdue': np.bincount(course_index, weights=overdue, minlength=size),
+        'expiring': np.bincount(course_index, weights=expiring, minlength=size)
+    }
+
+    per_course = {}
+    for position, name in enumerate(names):
+        per_course[str(name)] = {
+            'records': int(records[position]),
+            'completed': int(totals['completed'][position]),
+            'overdue': int(totals['overdue'][position]),
+            'expiring': int(totals['expiring'][position]),
+            'scored': int(score_count[position]),
+            'score_total': float(score_total[position])
+        }
+    return overdue.tolist(), expiring.tolist(), per_course
+
+
+def _flags_python(columns: Dict[str, List[Any]], today: int, window: int) -> Tuple[List[bool], List[bool], Dict[str, Dict[str, Any]]]:
+    review, status = columns['NextReviewDate'], columns['Status']
+    overdue = [(0 < due < today) or state == 'Expired' for due, state in zip(review, status)]
+    expiring = [0 < due and today <= due <= today + window and not late
+                for due, late in zip(review, overdue)]
+
+    per_course: Dict[str, Dict[str, Any]] = {}
+    for course, state, score, late, soon in zip(columns['TrainingCourse'], status, columns['Score'],
+                                                overdue, expiring):
+        entry = per_course.setdefault(course or NO_COURSE, {'records': 0, 'completed': 0, 'overdue': 0,
+                                                            'expiring': 0, 'scored': 0, 'score_total': 0.0})
+        entry['records'] += 1
+        entry['completed'] += state == 'Completed'
+        entry['overdue'] += late
+        entry['expiring'] += soon
+        if score is not None:
+            entry['scored'] += 1
+            entry['score_total'] += score
+    return overdue, expiring, dict(sorted(per_course.items()))
+
+
+def compliance_report(snapshot: TrainingSnapshot, as_of: date = None, window: int = EXPIRY_WINDOW) -> Dict[str, Any]:
+    """Overdue and expiring records plus per-course figures for one snapshot"""
+    as_of = as_of or date.today()
+    today = as_of.toordinal()
+    columns = snapshot.columns
+    flags = _flags_numpy if np is not None else _flags_python
+    overdue, expiring, per_course = flags(columns, today, window) if len(snapshot) else ([], [], {})
+
+    def record(row: int) -> Dict[str, Any]:
+        due = columns['NextReviewDate'][row]
+        return {
+            'id': snapshot.ids[row],
+            'staff_member': columns['StaffMember'][row],
+            'course': columns['TrainingCourse'][row],
+            'status': columns['Status'][row],
+            'completion_date': format_date(columns['CompletionDate'][row]),
+            'next_review_date': format_date(due),
+            'days': due - today if due else None,
+            'score': columns['Score'][row]
+        }
+
+    courses = []
+    for name, entry in per_course.items():
+        courses.append({
+            'course': name,
+            'records': entry['records'],
+            'completed': entry['completed'],
+            'completion_rate': round(100 * entry['completed'] / entry['records'], 1),
+            'overdue': entry['overdue'],
+            'expiring': entry['expiring'],
+            'average_score': round(entry['score_total'] / entry['scored'], 1) if entry['scored'] else None
+        })
+
+    scored = sum(entry['scored'] for entry in per_course.values())
+    return {
+        'as_of': as_of.isoformat(),
+        'expiry_window_days': window,
+        'synced_at': snapshot.synced_at,
+        'summary': {
+            'records': len(snapshot),
+            'completed': sum(entry['completed'] for entry in per_course.values()),
+            'overdue': sum(overdue),
+            'expiring': sum(expiring),
+            'average_score': (round(sum(entry['score_total'] for entry in per_course.values()) / scored, 1)
+                              if scored else None)
+        },
+        'courses': courses,
+        'overdue': sorted((record(row) for row, late in enumerate(overdue) if late),
+                          key=lambda entry: (entry['days'] is None, entry['days'] or 0, entry['staff_member'])),
+        'expiring': sorted((record(row) for row, soon in enumerate(expiring) if soon),
+                           key=lambda entry: (entry['days'], entry['staff_member']))
+    }
+
+
+def _html_table(headers: List[str], rows: List[List[Any]]) -> str:
+    if not rows:
+        return '<p class="muted">None</p>'
+    head = ''.join(f"<th>{html.escape(header)}</th>" for header in headers)
+    body = '\n'.join('<tr>' + ''.join(f"<td>{html.escape('' if cell is None else str(cell))}</td>"
+                                      for cell in row) + '</tr>' for row in rows)
+    return f"<table>\n<tr>{head}</tr>\n{body}\n</table>"
+
+
+def render_html(report: Dict[str, Any]) -> str:
+    summary = report['summary']
+    average = summary['average_score']
+    figures = [('Records', summary['records'], ''), ('Completed', summary['completed'], ''),
+               ('Overdue', summary['overdue'], 'danger'),
+               (f"Due within {report['expiry_window_days']} days", summary['expiring'], 'warning'),
+               ('Average score', f"{average}%" if average is not None else '-', '')]
+    record_headers = ['Staff member', 'Course', 'Status', 'Next review', 'Days', 'Score']
+
+    def record_rows(entries):
+        return [[entry['staff_member'], entry['course'], entry['status'], entry['next_review_date'],
+                 entry['days'], entry['score']] for entry in entries]
+
+    body = '\n'.join([
+        "<h1>🎓 Training Compliance Report</h1>",
+        f"<p class=\"muted\">As of {html.escape(report['as_of'])}"
+        + (f" (list synced {html.escape(report['synced_at'])})" if report.get('synced_at') else '') + "</p>",
+        '<div class="summary">' + ''.join(
+            f"<div class=\"figure {css}\"><strong>{html.escape(str(value))}</strong>{html.escape(label)}</div>"
+            for label, value, css in figures) + '</div>',
+        "<h2>Courses</h2>",
+        _html_table(['Course', 'Records', 'Completed', 'Completion %', 'Overdue', 'Expiring', 'Average score'],
+                    [[course['course'], course['records'], course['completed'], course['completion_rate'],
+                      course['overdue'], course['expiring'], course['average_score']]
+                     for course in report['courses']]),
+        "<h2>Overdue</h2>",
+        _html_table(record_headers, record_rows(report['overdue'])),
+        f"<h2>Due within {report['expiry_window_days']} days</h2>",
+        _html_table(record_headers, record_rows(report['expiring']))
+    ])
+    return Template(PAGE_TEMPLATE).substitute(THEME_COLORS, body=body)
+
+
+def write_report(report: Dict[str, Any], output_dir: Path, formats: List[str]) -> List[Path]:
+    """Write the report files; returns their paths"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    if 'json' in formats:
+        path = output_dir / 'training_report.json'
+        path.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        written.append(path)
+    if 'csv' in formats:
+        path = output_dir / 'training_courses.csv'
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(report['courses'][0]) if report['courses'] else ['course'])
+            writer.writeheader()
+            writer.writerows(report['courses'])
+        written.append(path)
+
+        path = output_dir / 'training_attention.csv'
+        fieldnames = ['state', 'id', 'staff_member', 'course', 'status', 'completion_date',
+                      'next_review_date', 'days', 'score']
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for state in ('overdue', 'expiring'):
+                writer.writerows(dict(entry, state=state) for entry in report[state])
+        written.append(path)
+    if 'html' in formats:
+        path = output_dir / 'training_report.html'
+        path.write_text(render_html(report), encoding='utf-8')
+        written.append(path)
+    return written
+
+
+def main():
+    """Sync the Training Records snapshot and write the compliance report"""
+    parser = argparse.ArgumentParser(description="Training compliance report over the Training Records list")
+    parser.add_argument('--output', type=Path, default=REPORT_DIR, help="directory for the report files")
+    parser.add_argument('--format', dest='formats', action='append', choices=['json', 'csv', 'html'],
+                        help="report format (repeatable; default all)")
+    parser.add_argument('--window', type=int, default=EXPIRY_WINDOW,
+                        help=f"days ahead that count as expiring (default {EXPIRY_WINDOW})")
+    parser.add_argument('--as-of', type=date.fromisoformat, help="report date, YYYY-MM-DD (default today)")
+    parser.add_argument('--full', action='store_true', help="discard the snapshot and reread the whole list")
+    parser.add_argument('--offline', action='store_true', help="report from the saved snapshot without syncing")
+    args = parser.parse_args()
+
+    if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET, SITE_URL]):
+        print("❌ Missing SharePoint configuration in .env file")
+        sys.exit(1)
+
+    tokens = get_token_provider(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
+    resolver = GraphResolver(SITE_URL, tokens)
+    list_id = resolver.list_id(TRAINING_RECORDS_LIST['displayName'])
+    if not list_id:
+        print(f"❌ List not found: {TRAINING_RECORDS_LIST['displayName']} - run setup_sharepoint_graph.py first")
+        sys.exit(1)
+
+    snapshot = TrainingSnapshot(resolver.site_id, list_id, tokens)
+    if args.full:
+        snapshot.reset()
+
+    started = time.perf_counter()
+    if not args.offline:
+        print("🔄 Syncing Training Records snapshot...")
+        stats = snapshot.sync()
+        print(f"✅ {stats['updated']} changed, {stats['deleted']} removed in {stats['pages']} page(s); "
+              f"{len(snapshot):,} record(s) in the snapshot")
+    synced = time.perf_counter()
+
+    report = compliance_report(snapshot, args.as_of, args.window)
+    paths = write_report(report, args.output, args.formats or ['json', 'csv', 'html'])
+    summary = report['summary']
+    average = summary['average_score']
+    print(f"📊 {summary['records']:,} record(s): {summary['overdue']:,} overdue, "
+          f"{summary['expiring']:,} due within {args.window} days, "
+          f"average score {f'{average}%' if average is not None else '-'} "
+          f"({time.perf_counter() - synced:.2f}s{'' if np is not None else ', numpy not installed'})")
+    for path in paths:
+        print(f"   {path}")
+    print(f"⏱️  Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()